@@ -1,107 +1,125 @@
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Optional
 
 
-def extract_flight_numbers(
-    offer: Dict,
-) -> Tuple[List[str], Optional[List[str]]]:
+def count_stops(offer: Dict[str, Any]) -> int:
     """
-    Returns:
-      outbound_flight_numbers: ["TS342"] or ["AZ651", "AZ1165"]
-      inbound_flight_numbers: same format, or None
+    Stops on the longest itinerary. Only takes segment counts, so it's
+    cheap enough to filter on before parsing the offer.
     """
-    itineraries = offer.get("itineraries", [])
-
-    def extract(itinerary: Dict) -> List[str]:
-        nums: List[str] = []
-        for segment in itinerary.get("segments", []):
-            carrier = segment.get("carrierCode")
-            number = segment.get("number")
-            if carrier and number:
-                nums.append(f"{carrier}{number}")
-        return nums
-
-    outbound = extract(itineraries[0]) if len(itineraries) >= 1 else []
-
-    inbound = (
-        extract(itineraries[1])
-        if len(itineraries) >= 2
-        else None
-    )
-
-    return outbound, inbound
-
-
-def count_stops(offer: Dict[str, Any]) -> int:
     max_stops = 0
     for it in offer.get("itineraries", []):
         max_stops = max(max_stops, len(it.get("segments", [])) - 1)
     return max_stops
 
 
-def extract_stops_by_itinerary(offer: dict) -> dict:
+class ParsedOffer:
     """
-    Returns stop airports split by outbound and inbound itineraries.
+    The fields of one Amadeus flight offer that the app keeps, pulled out
+    in a single walk over its itineraries and segments.
     """
-    itineraries = offer.get("itineraries", [])
-
-    def stops_for_itinerary(itinerary):
-        segments = itinerary.get("segments", [])
-        # stops are arrivals of all segments except the last
-        return [
-            seg["arrival"]["iataCode"]
-            for seg in segments[:-1]
-            if "arrival" in seg and "iataCode" in seg["arrival"]
-        ]
-
-    outbound_stops = stops_for_itinerary(itineraries[0]) if len(itineraries) >= 1 else []
-    inbound_stops = stops_for_itinerary(itineraries[1]) if len(itineraries) >= 2 else None
-
-    return {
-        "stop_airports_outbound": outbound_stops,
-        "stop_airports_inbound": inbound_stops,
-    }
-
-
-def get_total_duration(offer: dict) -> str:
-    return offer["itineraries"][0]["duration"]
 
+    __slots__ = (
+        "total_price",
+        "base_price",
+        "currency",
+        "carrier",
+        "outbound_flight_numbers",
+        "inbound_flight_numbers",
+        "fare_brand",
+        "num_stops",
+        "total_duration",
+        "stop_airports_outbound",
+        "stop_airports_inbound",
+        "outbound",
+        "inbound",
+        "checked_bags",
+        "cabin_bags",
+        "seats_left",
+    )
 
-def extract_itinerary_times(offer: dict) -> dict:
-    """
-    Returns outbound/inbound timing blocks.
-    """
-    itineraries = offer.get("itineraries", [])
+    def __init__(self, offer: Dict[str, Any], carrier: str, num_stops: int):
+        price = offer["price"]
+        self.total_price = float(price["total"])
+        self.base_price = float(price["base"])
+        self.currency = price["currency"]
+        self.carrier = carrier
+        self.num_stops = num_stops
+        self.seats_left = offer.get("numberOfBookableSeats", 0)
+
+        itineraries = offer.get("itineraries", [])
+        self.total_duration = itineraries[0]["duration"]
+        self.outbound_flight_numbers, self.stop_airports_outbound, self.outbound = _walk_itinerary(itineraries[0])
+        if len(itineraries) >= 2:
+            self.inbound_flight_numbers, self.stop_airports_inbound, self.inbound = _walk_itinerary(itineraries[1])
+        else:
+            self.inbound_flight_numbers = self.stop_airports_inbound = self.inbound = None
+
+        # Bags and brand come from the first traveler's first segment
+        pricings = offer.get("travelerPricings") or [{}]
+        fares = pricings[0].get("fareDetailsBySegment")
+        if fares:
+            fare = fares[0]
+            self.checked_bags = fare.get("includedCheckedBags", {}).get("quantity", 0)
+            self.cabin_bags = fare.get("includedCabinBags", {}).get("quantity", 0)
+            self.fare_brand = fare.get("brandedFareLabel", "UNKNOWN")
+        else:
+            self.checked_bags = self.cabin_bags = 0
+            self.fare_brand = "UNKNOWN"
+
+    def as_dict(self, rule_name: str) -> dict:
+        return {
+            "rule_name": rule_name,
 
-    def block(itinerary):
-        segments = itinerary.get("segments", [])
-        if not segments:
-            return None
+            "total_price": self.total_price,
+            "base_price": self.base_price,
+            "currency": self.currency,
 
-        return {
-            "depart_time": segments[0]["departure"]["at"],
-            "arrive_time": segments[-1]["arrival"]["at"],
-            "duration": itinerary.get("duration"),
-        }
+            "carrier": self.carrier,
+            "outbound_flight_numbers": self.outbound_flight_numbers,
+            "inbound_flight_numbers": self.inbound_flight_numbers,
+            "fare_brand": self.fare_brand,
 
-    outbound = block(itineraries[0]) if len(itineraries) >= 1 else None
-    inbound = block(itineraries[1]) if len(itineraries) >= 2 else None
+            "num_stops": self.num_stops,
+            "total_duration": self.total_duration,
+            "stop_airports_outbound": self.stop_airports_outbound,
+            "stop_airports_inbound": self.stop_airports_inbound,
 
-    return {
-        "outbound": outbound,
-        "inbound": inbound,
-    }
+            "outbound": self.outbound,
+            "inbound": self.inbound,
 
+            "checked_bags": self.checked_bags,
+            "cabin_bags": self.cabin_bags,
 
-def get_baggage_info(offer: dict) -> tuple[int, int]:
-    fares = offer.get("travelerPricings", [{}])[0].get("fareDetailsBySegment", [])
-    if not fares:
-        return 0, 0
-    return (
-        fares[0].get("includedCheckedBags", {}).get("quantity", 0),
-        fares[0].get("includedCabinBags", {}).get("quantity", 0),
-    )
+            "seats_left": self.seats_left,
+        }
 
 
-def get_fare_brand(offer: dict) -> str:
-    fares = offer.get("travelerPricings", [{}])[0].get("fareDetailsBySegment", [])
-    return fares[0].get("brandedFareLabel", "UNKNOWN") if fares else "UNKNOWN"
+def _walk_itinerary(itinerary: Dict) -> tuple[List[str], List[str], Optional[dict]]:
+    """
+    Returns:
+      flight numbers: ["TS342"] or ["AZ651", "AZ1165"]
+      stop airports: arrivals of all segments except the last
+      timing block: depart/arrive time and duration, or None without segments
+    """
+    segments = itinerary.get("segments", [])
+    numbers: List[str] = []
+    stops: List[str] = []
+    last = len(segments) - 1
+    for i, segment in enumerate(segments):
+        carrier = segment.get("carrierCode")
+        number = segment.get("number")
+        if carrier and number:
+            numbers.append(carrier + number)
+        if i < last:
+            arrival = segment.get("arrival")
+            if arrival and "iataCode" in arrival:
+                stops.append(arrival["iataCode"])
+
+    if not segments:
+        return numbers, stops, None
+
+    return numbers, stops, {
+        "depart_time": segments[0]["departure"]["at"],
+        "arrive_time": segments[-1]["arrival"]["at"],
+        "duration": itinerary.get("duration"),
+    }
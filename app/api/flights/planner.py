@@ -0,0 +1,171 @@
+from concurrent.futures import Future
+from typing import Iterable, NamedTuple, Optional
+
+from app.core.amadeus import client, submit
+from app.core.cache import offer_cache, offer_query_key
+from app.utils.dates import generate_date_pairs
+from app.utils.formatting import parse_valid_carriers
+from app.core.config import MERGE_RULE_QUERIES
+
+# Amadeus default and hard cap for `max`
+MAX_RESULTS_PER_RULE = 50
+AMADEUS_MAX_RESULTS = 250
+
+
+class SearchQuery(NamedTuple):
+    """
+    One Amadeus flight-offers call. Normalized, so equal queries from
+    different searches or watches compare (and hash) equal.
+    """
+    origin: str
+    destination: str
+    depart_date: str
+    return_date: Optional[str]
+    adults: int
+    travel_class: str
+    non_stop: bool
+    included_airline_codes: Optional[str]
+    currency: str
+    max_results: int = 50
+
+
+class PlannedCell(NamedTuple):
+    """
+    One (date pair, rule) cell of a search and the query that serves it.
+    """
+    depart_date: str
+    return_date: Optional[str]
+    rule: dict
+    query: SearchQuery
+
+
+def make_query(req, depart_date, return_date, rules: list[dict]) -> SearchQuery:
+    """
+    Builds the query serving `rules`. For several merged rules the airline
+    codes are unioned (no restriction if any rule has none), nonStop is only
+    sent if every rule requires it, and `max` grows with the group so each
+    rule still has enough offers left after local filtering.
+    """
+    carriers = set()
+    for rule in rules:
+        rule_carriers = parse_valid_carriers(rule["included_airline_codes"])
+        if not rule_carriers:
+            carriers = set()
+            break
+        carriers |= rule_carriers
+
+    return SearchQuery(
+        origin=req.origin.strip().upper(),
+        destination=req.destination.strip().upper(),
+        depart_date=depart_date,
+        return_date=return_date,
+        adults=req.adults,
+        travel_class=req.travel_class.strip().upper(),
+        non_stop=all(rule["non_stop"] == 1 for rule in rules),
+        included_airline_codes=",".join(sorted(carriers)) or None,
+        currency=req.currency.strip().upper(),
+        max_results=min(MAX_RESULTS_PER_RULE * len(rules), AMADEUS_MAX_RESULTS),
+    )
+
+
+def group_rules(rules: list[dict], merge: bool) -> list[list[dict]]:
+    """
+    Groups rules that can share one query. Airline-restricted rules merge
+    with each other and unrestricted rules with each other; mixing them
+    would let other carriers crowd the restricted ones out of the response.
+    """
+    if not merge:
+        return [[rule] for rule in rules]
+
+    restricted = [r for r in rules if parse_valid_carriers(r["included_airline_codes"])]
+    unrestricted = [r for r in rules if not parse_valid_carriers(r["included_airline_codes"])]
+    return [group for group in (restricted, unrestricted) if group]
+
+
+def plan_search(req, rules: list[dict], merge: bool = MERGE_RULE_QUERIES) -> list[PlannedCell]:
+    """
+    Expands a search into its cells, in date pair x rule order. With
+    `merge`, compatible rules share a query per date pair and are told
+    apart by the local filter.
+    """
+    date_pairs = generate_date_pairs(
+        req.depart,
+        req.return_date,
+        req.flex_days,
+    )
+    groups = group_rules(rules, merge)
+
+    cells = []
+    for depart_date, return_date in date_pairs:
+        query_for = {}
+        for group in groups:
+            query = make_query(req, depart_date, return_date, group)
+            for rule in group:
+                query_for[id(rule)] = query
+
+        cells.extend(
+            PlannedCell(depart_date, return_date, rule, query_for[id(rule)])
+            for rule in rules
+        )
+    return cells
+
+
+def unique_queries(cells: Iterable[PlannedCell]) -> list[SearchQuery]:
+    # dict keeps first-seen order, so calls go out in cell order
+    return list(dict.fromkeys(cell.query for cell in cells))
+
+
+def query_key(query: SearchQuery) -> str:
+    return offer_query_key(*query)
+
+
+def cached_responses(queries: Iterable[SearchQuery], max_age: Optional[float] = None) -> dict[SearchQuery, Future]:
+    """
+    Completed futures for the queries whose response is in `offer_cache`
+    and no older than `max_age` seconds (default: the cache TTL), so only
+    the other queries need sending. When a search's flex window is widened,
+    the cells it already had are answered here and just the new date pairs
+    cost Amadeus calls.
+    """
+    found = {}
+    for query in queries:
+        data = offer_cache.lookup(query_key(query), max_age)
+        if data is not None:
+            future = Future()
+            future.set_result(data)
+            found[query] = future
+    return found
+
+
+def execute_queries(
+    token: str,
+    queries: Iterable[SearchQuery],
+    max_age: Optional[float] = None,
+) -> dict[SearchQuery, Future]:
+    """
+    Starts one Amadeus call per query on the client's event loop. All calls
+    are in flight at once; the client's connection pool and the shared rate
+    limiter keep them within the Amadeus quota.
+    """
+    return {
+        query: submit(client.flight_offers_search(
+            token=token,
+            origin=query.origin,
+            destination=query.destination,
+            depart_date=query.depart_date,
+            return_date=query.return_date,
+            adults=query.adults,
+            travel_class=query.travel_class,
+            non_stop=True if query.non_stop else None,
+            included_airline_codes=query.included_airline_codes,
+            currency=query.currency,
+            max_results=query.max_results,
+            max_age=max_age,
+        ))
+        for query in queries
+    }
+
+
+def cancel_pending(futures: dict[SearchQuery, Future]) -> None:
+    for future in futures.values():
+        future.cancel()
@@ -1,9 +1,46 @@
 from fastapi import APIRouter
-from .schemas import FlightSearchRequest, FlightSearchResponse
-from .service import search_flights_service
+from fastapi.responses import StreamingResponse
+from app.core.cache import offer_cache
+from app.core.responses import FastJSONResponse, dumps
+from app.core.amadeus import rate_limiter
+from app.core.profiling import ProfiledRoute
+from .schemas import FlightSearchRequest, FlightSearchResponse, CacheStats, RateLimiterStats
+from .service import search_flights_service, iter_search_events
 
-router = APIRouter(prefix="/flights", tags=["flights"])
+router = APIRouter(prefix="/flights", tags=["flights"], route_class=ProfiledRoute)
 
 @router.post("/search", response_model=FlightSearchResponse)
 def search_flights(req: FlightSearchRequest):
-    return search_flights_service(req)
+    # Offers come out of ParsedOffer already in FlightOffer's shape
+    return FastJSONResponse(search_flights_service(req))
+
+@router.post("/search/stream")
+def search_flights_stream(req: FlightSearchRequest):
+    """
+    Same search as /flights/search, streamed as NDJSON: one "offers" line per
+    (date pair, rule) as it completes, then a "summary" line.
+    """
+    def lines():
+        try:
+            for event in iter_search_events(req):
+                yield dumps(event) + b"\n"
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield dumps({"type": "error", "detail": str(e)}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/cache", response_model=CacheStats)
+def get_cache_stats():
+    # hits are Amadeus calls saved
+    return offer_cache.stats()
+
+@router.get("/rate", response_model=RateLimiterStats)
+def get_rate_stats():
+    # Adaptive Amadeus call rate and the 429s that shaped it
+    return rate_limiter.stats()
+
+@router.delete("/cache")
+def clear_cache():
+    offer_cache.clear()
+    return {"status": "ok"}
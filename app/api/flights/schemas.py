@@ -16,6 +16,9 @@ class FlightSearchRequest(BaseModel):
     adults: int = 1
     travel_class: str = "ECONOMY"
     currency: str = "CAD"
+    # Reuse (date pair, rule) results fetched at most this many seconds ago
+    # (default SEARCH_REUSE_MAX_AGE_SECONDS); 0 queries every cell afresh
+    max_age_seconds: Optional[int] = None
 
 
 class FlightOffer(BaseModel):
@@ -40,3 +43,34 @@ class FlightOffer(BaseModel):
 
 class FlightSearchResponse(BaseModel):
     offers: List[FlightOffer]
+
+
+class CacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    ttl_seconds: int
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class RateChange(BaseModel):
+    at: float
+    rate: float
+    event: str
+
+
+class RateLimiterStats(BaseModel):
+    adaptive: bool
+    # Amadeus calls per second currently allowed
+    rate: float
+    # Moving average of the rates that drew a 429: the observed quota
+    ceiling: Optional[float] = None
+    min_rate: Optional[float] = None
+    max_rate: Optional[float] = None
+    successes: int = 0
+    throttles: int = 0
+    paused_for_seconds: float = 0.0
+    history: List[RateChange] = []
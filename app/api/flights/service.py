@@ -1,97 +1,132 @@
 import time
-from app.core.amadeus import get_token, flight_offers_search
-from app.utils.dates import generate_date_pairs
+from collections import defaultdict
+from concurrent.futures import Future, as_completed
+from typing import Iterator
+from app.core.amadeus import get_token
 from app.utils.formatting import parse_valid_carriers
-from app.core.config import API_CALL_DELAY_SECONDS
 from app.api.rules.helpers import fetch_active_rules
-
-from .helpers import (
-    extract_flight_numbers,
-    count_stops,
-    extract_stops_by_itinerary,
-    get_total_duration,
-    extract_itinerary_times,
-    get_baggage_info,
-    get_fare_brand,
+from app.core.metrics import OFFER_EXTRACT_SECONDS, OFFERS
+from app.core.config import SEARCH_REUSE_MAX_AGE_SECONDS
+
+from .planner import (
+    PlannedCell,
+    SearchQuery,
+    plan_search,
+    cached_responses,
+    execute_queries,
+    cancel_pending,
 )
+from .helpers import ParsedOffer, count_stops
+
+def _filter_offers(data, rule) -> list[dict]:
+    with OFFER_EXTRACT_SECONDS.time():
+        results = _extract_offers(data, rule)
+    OFFERS.inc(len(results), result="kept")
+    OFFERS.inc(len(data.get("data", ())) - len(results), result="filtered")
+    return results
+
+
+def _extract_offers(data, rule) -> list[dict]:
+    valid_carriers = parse_valid_carriers(
+        rule["included_airline_codes"]
+    )
+    rule_name = rule["rule_name"]
+    max_stops = rule["max_allowed_stops"]
+    non_stop = rule["non_stop"] == 1
 
-def search_flights_service(req):
-    token = get_token()
     results = []
+    for offer in data.get("data", []):
+        carrier = offer["validatingAirlineCodes"][0]
+
+        # Airline filter
+        if valid_carriers and carrier not in valid_carriers:
+            continue
+
+        # Stop filter; merged queries may not have sent nonStop for this rule
+        num_stops = count_stops(offer)
+        if num_stops > max_stops or (non_stop and num_stops > 0):
+            continue
+
+        # Only offers that pass get the full walk
+        results.append(ParsedOffer(offer, carrier, num_stops).as_dict(rule_name))
+
+    return results
+
+
+def collect_offers(cells: list[PlannedCell], responses: dict[SearchQuery, Future]) -> list[dict]:
+    """
+    Applies each cell's rule to its query's response, in cell order, so
+    offers come out as a serial walk of the date pairs and rules would.
+    """
+    results = []
+    for cell in cells:
+        results.extend(_filter_offers(responses[cell.query].result(), cell.rule))
+    return results
+
+
+def iter_search_events(req) -> Iterator[dict]:
+    """
+    Runs a search and yields one "offers" event per (date pair, rule) cell
+    as soon as its Amadeus call returns, then a final "summary" event.
+
+    Events arrive in completion order; `index` is the cell's position in
+    date pair x rule order, for callers that need the serial ordering.
+    Cells with a fresh enough cached result (`reused`) come first, so a
+    search re-run with a wider flex window shows the dates it already had
+    straight away and only queries the new ones.
+    """
+    started = time.perf_counter()
+    max_age = req.max_age_seconds if req.max_age_seconds is not None else SEARCH_REUSE_MAX_AGE_SECONDS
 
     # Load enabled rules
     rules = fetch_active_rules()
-    if not rules:
-        return {"offers": []}
+    cells = plan_search(req, rules) if rules else []
+
+    cells_for = defaultdict(list)
+    for index, cell in enumerate(cells):
+        cells_for[cell.query].append((index, cell))
+
+    responses = cached_responses(cells_for, max_age)
+    reused = set(responses)
+    stale = [query for query in cells_for if query not in reused]
+    if stale:
+        responses.update(execute_queries(get_token(), stale, max_age))
+    query_for = {future: query for query, future in responses.items()}
+
+    total = 0
+    try:
+        for future in as_completed(query_for):
+            data = future.result()
+            for index, cell in cells_for[query_for[future]]:
+                offers = _filter_offers(data, cell.rule)
+                total += len(offers)
+                yield {
+                    "type": "offers",
+                    "index": index,
+                    "depart_date": cell.depart_date,
+                    "return_date": cell.return_date,
+                    "rule_name": cell.rule["rule_name"],
+                    "reused": query_for[future] in reused,
+                    "offers": offers,
+                }
+    finally:
+        cancel_pending(responses)
+
+    yield {
+        "type": "summary",
+        "cells": len(cells),
+        "calls": len(stale),
+        "reused_calls": len(reused),
+        "offers": total,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
 
-    date_pairs = generate_date_pairs(
-        req.depart,
-        req.return_date,
-        req.flex_days,
-    )
 
-    for depart_date, return_date in date_pairs:
-        for rule in rules:
-            data = flight_offers_search(
-                token=token,
-                origin=req.origin,
-                destination=req.destination,
-                depart_date=depart_date,
-                return_date=return_date,
-                adults=req.adults,
-                travel_class=req.travel_class,
-                non_stop=True if rule["non_stop"] == 1 else None,
-                included_airline_codes=rule["included_airline_codes"],
-                currency=req.currency,
-            )
-
-            time.sleep(API_CALL_DELAY_SECONDS)
-
-            valid_carriers = parse_valid_carriers(
-                rule["included_airline_codes"]
-            )
-
-            for offer in data.get("data", []):
-                carrier = offer["validatingAirlineCodes"][0]
-                num_stops = count_stops(offer)
-
-                # Airline filter
-                if valid_carriers and carrier not in valid_carriers:
-                    continue
-
-                # Stop filter
-                if num_stops > rule["max_allowed_stops"]:
-                    continue
-
-                outbound_flight_numbers, inbound_flight_numbers = extract_flight_numbers(offer)
-                stops = extract_stops_by_itinerary(offer)
-                timing = extract_itinerary_times(offer)
-                checked_bags, cabin_bags = get_baggage_info(offer)
-
-                results.append({
-                    "rule_name": rule["rule_name"],
-
-                    "total_price": float(offer["price"]["total"]),
-                    "base_price": float(offer["price"]["base"]),
-                    "currency": offer["price"]["currency"],
-
-                    "carrier": carrier,
-                    "outbound_flight_numbers": outbound_flight_numbers,
-                    "inbound_flight_numbers": inbound_flight_numbers,
-                    "fare_brand": get_fare_brand(offer),
-
-                    "num_stops": num_stops,
-                    "total_duration": get_total_duration(offer),
-                    "stop_airports_outbound": stops["stop_airports_outbound"],
-                    "stop_airports_inbound": stops["stop_airports_inbound"],
-
-                    "outbound": timing["outbound"],
-                    "inbound": timing["inbound"],
-
-                    "checked_bags": checked_bags,
-                    "cabin_bags": cabin_bags,
-
-                    "seats_left": offer.get("numberOfBookableSeats", 0),
-                })
-
-    return {"offers": results}
+def search_flights_service(req):
+    batches = {}
+    for event in iter_search_events(req):
+        if event["type"] == "offers":
+            batches[event["index"]] = event["offers"]
+
+    # Back to date pair x rule order, as a serial walk would produce
+    return {"offers": [offer for index in sorted(batches) for offer in batches[index]]}
@@ -0,0 +1,46 @@
+from typing import List, Literal
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from app.core.profiling import list_profiles, get_profile, profile_stats_text
+from .schemas import ProfileInfo
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+# Download types by profiler
+MEDIA_TYPES = {
+    "cprofile": "application/octet-stream",
+    "pyinstrument": "text/html",
+}
+
+@router.get("", response_model=List[ProfileInfo])
+def get_profiles():
+    # Most recent first
+    return list_profiles()
+
+@router.get("/{name}")
+def download_profile(name: str):
+    profile = get_profile(name)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        profile["path"],
+        media_type=MEDIA_TYPES[profile["profiler"]],
+        filename=profile["file"],
+    )
+
+@router.get("/{name}/stats", response_class=PlainTextResponse)
+def get_profile_stats(
+    name: str,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    A cProfile profile's top functions as text; pyinstrument profiles are
+    readable as downloaded.
+    """
+    profile = get_profile(name)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if profile["profiler"] != "cprofile":
+        raise HTTPException(status_code=400, detail="Only cProfile profiles have stats")
+    return profile_stats_text(profile["path"], sort=sort, limit=limit)
@@ -0,0 +1,18 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ProfileInfo(BaseModel):
+    # <started>-<kind>-<run id>; GET /profiles/{name} downloads it
+    name: str
+    # "request" or "watch-run"
+    kind: str
+    # Request id, or the watch run's watch_runs id
+    run_id: str
+    # "GET /flights/..." for requests
+    label: str
+    profiler: str
+    file: str
+    size_bytes: int
+    started_at: datetime
+    elapsed_seconds: float | None = None
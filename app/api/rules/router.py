@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from typing import List
+from app.core.profiling import ProfiledRoute
 from .schemas import RuleCreate, RuleOut, RuleUpdate
 from .service import list_rules, create_rule, set_rule_enabled, delete_rule
 
-router = APIRouter(prefix="/rules", tags=["rules"])
+router = APIRouter(prefix="/rules", tags=["rules"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=List[RuleOut])
@@ -1,49 +1,47 @@
 import sqlite3
+from collections import defaultdict
 from typing import List, Dict, Any, Optional
+import hashlib
 import json
-from app.core.config import TOKEN_DB
+from app.core.config import RESULT_RUN_MAX_GAP_INTERVALS, RESULT_RUN_MAX_GAP_SECONDS
+from app.core.database import get_connection, transaction
+from app.core.write_behind import WriteBehindQueue
+from app.core.metrics import WATCHED_RESULT_WRITE_SECONDS, WATCHED_RESULTS_WRITTEN
 
 def insert_watch(data) -> int:
-    conn = sqlite3.connect(TOKEN_DB)
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        INSERT INTO watched_searches (
-            rule_id,
-            origin,
-            destination,
-            depart_date,
-            return_date,
-            flex_days,
-            adults,
-            travel_class,
-            currency
+    with transaction() as cur:
+        cur.execute(
+            """
+            INSERT INTO watched_searches (
+                rule_id,
+                origin,
+                destination,
+                depart_date,
+                return_date,
+                flex_days,
+                adults,
+                travel_class,
+                currency
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                data.rule_id,
+                data.origin,
+                data.destination,
+                data.depart_date,
+                data.return_date,
+                data.flex_days,
+                data.adults,
+                data.travel_class,
+                data.currency,
+            ),
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            data.rule_id,
-            data.origin,
-            data.destination,
-            data.depart_date,
-            data.return_date,
-            data.flex_days,
-            data.adults,
-            data.travel_class,
-            data.currency,
-        ),
-    )
 
-    watch_id = cur.lastrowid
-    conn.commit()
-    conn.close()
-    return watch_id
+        return cur.lastrowid
 
 def fetch_watches() -> List[sqlite3.Row]:
-    conn = sqlite3.connect(TOKEN_DB)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    cur = get_connection().cursor()
 
     cur.execute(
         """
@@ -67,134 +65,480 @@ def fetch_watches() -> List[sqlite3.Row]:
         """
     )
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 def fetch_watch(watch_id: int) -> Optional[sqlite3.Row]:
-    conn = sqlite3.connect(TOKEN_DB)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    cur = get_connection().cursor()
 
     cur.execute(
         "SELECT * FROM watched_searches WHERE id = ?",
         (watch_id,),
     )
 
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return cur.fetchone()
 
-def update_watch_enabled(watch_id: int, enabled: bool) -> None:
-    conn = sqlite3.connect(TOKEN_DB)
-    cur = conn.cursor()
+def fetch_enabled_watches(watch_ids: Optional[list[int]] = None) -> List[sqlite3.Row]:
+    cur = get_connection().cursor()
+
+    sql = """
+        SELECT w.*
+        FROM watched_searches w
+        JOIN flight_rules r ON r.id = w.rule_id
+        WHERE w.enabled = 1
+    """
+    params: list = []
+    if watch_ids is not None:
+        sql += f" AND w.id IN ({','.join('?' * len(watch_ids))})"
+        params.extend(watch_ids)
 
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+def fetch_schedulable_watches() -> List[sqlite3.Row]:
+    """
+    Enabled watches with their adaptive schedule; interval_seconds and
+    next_run_at are NULL for watches not scheduled yet.
+    """
+    cur = get_connection().cursor()
     cur.execute(
         """
-        UPDATE watched_searches
-        SET enabled = ?
-        WHERE id = ?
+        SELECT w.*, s.interval_seconds, s.next_run_at, s.last_run_at
+        FROM watched_searches w
+        JOIN flight_rules r ON r.id = w.rule_id
+        LEFT JOIN watch_schedule s ON s.watch_id = w.id
+        WHERE w.enabled = 1
+        """
+    )
+    return cur.fetchall()
+
+def upsert_watch_schedule(rows: list[tuple[int, int, float, Optional[float]]]) -> None:
+    # (watch_id, interval_seconds, next_run_at, last_run_at)
+    with transaction() as cur:
+        cur.executemany(
+            """
+            INSERT INTO watch_schedule (watch_id, interval_seconds, next_run_at, last_run_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(watch_id) DO UPDATE SET
+                interval_seconds = excluded.interval_seconds,
+                next_run_at = excluded.next_run_at,
+                last_run_at = COALESCE(excluded.last_run_at, last_run_at)
+            """,
+            rows,
+        )
+
+def fetch_change_counts(watch_ids: list[int], since: str) -> List[sqlite3.Row]:
+    """
+    Per watch, how many distinct results (rows) and how many runs
+    (seen_count) overlap [since, now). A row whose run started before
+    `since` only counts its runs since then, assuming they were evenly
+    spaced between captured_at and last_seen_at.
+    """
+    if not watch_ids:
+        return []
+
+    cur = get_connection().cursor()
+    cur.execute(
+        f"""
+        SELECT watch_id, COUNT(*) AS results, CAST(ROUND(SUM(
+            CASE WHEN captured_at >= :since THEN seen_count
+            ELSE 1 + (seen_count - 1)
+                * (julianday(last_seen_at) - julianday(:since))
+                / (julianday(last_seen_at) - julianday(captured_at))
+            END
+        )) AS INTEGER) AS runs
+        FROM watched_results
+        WHERE watch_id IN ({','.join(f':w{i}' for i in range(len(watch_ids)))})
+          AND last_seen_at >= :since
+        GROUP BY watch_id
         """,
-        (1 if enabled else 0, watch_id),
+        {"since": since, **{f"w{i}": watch_id for i, watch_id in enumerate(watch_ids)}},
     )
+    return cur.fetchall()
 
-    if cur.rowcount == 0:
-        conn.close()
-        raise ValueError("Watch not found")
+def update_watch_enabled(watch_id: int, enabled: bool) -> None:
+    with transaction() as cur:
+        cur.execute(
+            """
+            UPDATE watched_searches
+            SET enabled = ?
+            WHERE id = ?
+            """,
+            (1 if enabled else 0, watch_id),
+        )
 
-    conn.commit()
-    conn.close()
+        if cur.rowcount == 0:
+            raise ValueError("Watch not found")
 
 def delete_watch(watch_id: int) -> None:
-    conn = sqlite3.connect(TOKEN_DB)
-    cur = conn.cursor()
+    with transaction() as cur:
+        # Foreign keys aren't enforced, and a reused id mustn't inherit the
+        # old watch's schedule
+        cur.execute("DELETE FROM watch_schedule WHERE watch_id = ?", (watch_id,))
+        cur.execute(
+            "DELETE FROM watched_searches WHERE id = ?",
+            (watch_id,),
+        )
 
-    cur.execute(
-        "DELETE FROM watched_searches WHERE id = ?",
-        (watch_id,),
+        if cur.rowcount == 0:
+            raise ValueError("Watch not found")
+
+_INSERT_WATCHED_RESULT = """
+    INSERT INTO watched_results (
+        watch_id,
+        total_price,
+        base_price,
+        currency,
+        carrier,
+        fare_brand,
+        outbound_flight_numbers,
+        inbound_flight_numbers,
+        num_stops,
+        stop_airports_outbound,
+        stop_airports_inbound,
+        outbound_depart_time,
+        outbound_arrive_time,
+        outbound_duration,
+        inbound_depart_time,
+        inbound_arrive_time,
+        inbound_duration,
+        checked_bags,
+        cabin_bags,
+        seats_left,
+        fingerprint,
+        seen_count,
+        last_seen_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+def _watched_result_params(watch_id: int, offer: dict) -> tuple:
+    return (
+        watch_id,
+        offer["total_price"],
+        offer["base_price"],
+        offer["currency"],
+        offer["carrier"],
+        offer["fare_brand"],
+        json.dumps(offer["outbound_flight_numbers"]),
+        json.dumps(offer["inbound_flight_numbers"]) if offer["inbound_flight_numbers"] else None,
+        offer["num_stops"],
+        json.dumps(offer["stop_airports_outbound"]),
+        json.dumps(offer["stop_airports_inbound"]) if offer["stop_airports_inbound"] else None,
+        offer["outbound"]["depart_time"],
+        offer["outbound"]["arrive_time"],
+        offer["outbound"].get("duration"),
+        offer["inbound"]["depart_time"] if offer["inbound"] else None,
+        offer["inbound"]["arrive_time"] if offer["inbound"] else None,
+        offer["inbound"].get("duration") if offer["inbound"] else None,
+        offer["checked_bags"],
+        offer["cabin_bags"],
+        offer["seats_left"],
     )
 
-    if cur.rowcount == 0:
-        conn.close()
-        raise ValueError("Watch not found")
+def _fingerprint(params: tuple) -> str:
+    # Every stored field except watch_id
+    return hashlib.blake2b(json.dumps(params[1:]).encode(), digest_size=8).hexdigest()
 
-    conn.commit()
-    conn.close()
+def _latest_runs(cur: sqlite3.Cursor, watch_ids: set[int]) -> dict[int, tuple[int, str]]:
+    # watch_id -> (id, fingerprint) of its latest row, if it can still be
+    # extended. Only the newest row counts: once a run has ended (NULL
+    # fingerprint) or gone stale, an older row must not be picked up again.
+    # Stale means not seen for a few of the watch's polling intervals, so
+    # watches polled daily still extend their runs
+    latest = {}
+    for watch_id in watch_ids:
+        cur.execute(
+            """
+            SELECT r.id, r.fingerprint,
+                   r.last_seen_at >= datetime(
+                       'now',
+                       -MAX(:min_gap, COALESCE(s.interval_seconds, 0) * :intervals) || ' seconds'
+                   ) AS recent
+            FROM watched_results r
+            LEFT JOIN watch_schedule s ON s.watch_id = r.watch_id
+            WHERE r.watch_id = :watch_id
+            ORDER BY r.captured_at DESC, r.id DESC
+            LIMIT 1
+            """,
+            {
+                "min_gap": RESULT_RUN_MAX_GAP_SECONDS,
+                "intervals": RESULT_RUN_MAX_GAP_INTERVALS,
+                "watch_id": watch_id,
+            },
+        )
+        row = cur.fetchone()
+        if row and row["fingerprint"] is not None and row["recent"]:
+            latest[watch_id] = (row["id"], row["fingerprint"])
+    return latest
 
-def insert_watched_result(watch_id: int, offer: dict) -> int:
-    conn = sqlite3.connect(TOKEN_DB)
-    cur = conn.cursor()
+def insert_watched_result(watch_id: int, offer: Optional[dict]) -> Optional[int]:
+    return insert_watched_results([(watch_id, offer)])[0]
 
-    cur.execute(
-        """
-        INSERT INTO watched_results (
-            watch_id,
-            total_price,
-            base_price,
-            currency,
-            carrier,
-            fare_brand,
-            outbound_flight_numbers,
-            inbound_flight_numbers,
-            num_stops,
-            stop_airports_outbound,
-            stop_airports_inbound,
-            outbound_depart_time,
-            outbound_arrive_time,
-            outbound_duration,
-            inbound_depart_time,
-            inbound_arrive_time,
-            inbound_duration,
-            checked_bags,
-            cabin_bags,
-            seats_left
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            watch_id,
-            offer["total_price"],
-            offer["base_price"],
-            offer["currency"],
-            offer["carrier"],
-            offer["fare_brand"],
-            json.dumps(offer["outbound_flight_numbers"]),
-            json.dumps(offer["inbound_flight_numbers"]) if offer["inbound_flight_numbers"] else None,
-            offer["num_stops"],
-            json.dumps(offer["stop_airports_outbound"]),
-            json.dumps(offer["stop_airports_inbound"]) if offer["stop_airports_inbound"] else None,
-            offer["outbound"]["depart_time"],
-            offer["outbound"]["arrive_time"],
-            offer["outbound"].get("duration"),
-            offer["inbound"]["depart_time"] if offer["inbound"] else None,
-            offer["inbound"]["arrive_time"] if offer["inbound"] else None,
-            offer["inbound"].get("duration") if offer["inbound"] else None,
-            offer["checked_bags"],
-            offer["cabin_bags"],
-            offer["seats_left"],
-        ),
-    )
+def insert_watched_results(items: list[tuple[int, Optional[dict]]]) -> list[Optional[int]]:
+    """
+    Records one run's cheapest offer per (watch_id, offer) pair, in order,
+    in one transaction, and returns the id of the row holding each.
 
-    conn.commit()
-    return cur.lastrowid
+    Rows are run-length encoded: an offer identical to the watch's latest
+    row only bumps that row's last_seen_at and seen_count. A None offer (the
+    run found nothing) ends the latest row's run so a later identical offer
+    starts a new row rather than bridging the gap.
+    """
+    if not items:
+        return []
 
-def fetch_watched_results(watch_id: int):
-    conn = sqlite3.connect(TOKEN_DB)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    with WATCHED_RESULT_WRITE_SECONDS.time(), transaction() as cur:
+        # Take the write lock before reading the latest runs, so a
+        # concurrent writer can't extend or end them in between
+        cur.execute("BEGIN IMMEDIATE")
+        latest = _latest_runs(cur, {watch_id for watch_id, _ in items})
 
-    cur.execute(
-        """
+        # A run is ("row", id) for an existing row or ("new", i) for the
+        # i-th pending insert
+        refs: list[Optional[tuple[str, int]]] = []
+        inserts: list[list] = []
+        extended: dict[int, int] = defaultdict(int)
+        ended: set[int] = set()
+        runs: dict[int, tuple[tuple[str, int], str]] = {
+            watch_id: (("row", row_id), fingerprint)
+            for watch_id, (row_id, fingerprint) in latest.items()
+        }
+
+        for watch_id, offer in items:
+            if offer is None:
+                run = runs.pop(watch_id, None)
+                if run and run[0][0] == "row":
+                    ended.add(run[0][1])
+                elif run:
+                    # Started earlier in this batch: insert it already ended
+                    inserts[run[0][1]][-2] = None
+                refs.append(None)
+                continue
+
+            params = _watched_result_params(watch_id, offer)
+            fingerprint = _fingerprint(params)
+            run = runs.get(watch_id)
+            if run and run[1] == fingerprint:
+                kind, ref = run[0]
+                if kind == "row":
+                    extended[ref] += 1
+                else:
+                    inserts[ref][-1] += 1
+                refs.append(run[0])
+            else:
+                ref = ("new", len(inserts))
+                inserts.append([*params, fingerprint, 1])
+                runs[watch_id] = (ref, fingerprint)
+                refs.append(ref)
+
+        if extended:
+            cur.executemany(
+                """
+                UPDATE watched_results
+                SET last_seen_at = CURRENT_TIMESTAMP,
+                    seen_count = seen_count + ?
+                WHERE id = ?
+                """,
+                [(count, row_id) for row_id, count in extended.items()],
+            )
+        if ended:
+            cur.executemany(
+                "UPDATE watched_results SET fingerprint = NULL WHERE id = ?",
+                [(row_id,) for row_id in ended],
+            )
+
+        new_ids: list[int] = []
+        for params in inserts:
+            cur.execute(_INSERT_WATCHED_RESULT, params)
+            new_ids.append(cur.lastrowid)
+    WATCHED_RESULTS_WRITTEN.inc(len(items))
+
+    return [
+        None if ref is None else new_ids[ref[1]] if ref[0] == "new" else ref[1]
+        for ref in refs
+    ]
+
+# Write-behind for scheduled runs; see run_all_watches_service
+result_writer = WriteBehindQueue(insert_watched_results, name="watched-results")
+
+def _history_filters(
+    watch_id: int,
+    since: Optional[str],
+    until: Optional[str],
+    prefix: str = "",
+) -> tuple[str, list]:
+    # WHERE clause over watched_results rows whose run overlaps
+    # [since, until); `prefix` is the table alias + "."
+    clauses = [f"{prefix}watch_id = ?"]
+    params: list = [watch_id]
+    if since:
+        clauses.append(f"{prefix}last_seen_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append(f"{prefix}captured_at < ?")
+        params.append(until)
+    return " AND ".join(clauses), params
+
+def _observations(
+    watch_id: int,
+    since: Optional[str],
+    until: Optional[str],
+) -> tuple[str, list]:
+    """
+    Recursive CTEs ending in `observations(id, observed_at, total_price,
+    currency)`: the run-length encoded rows expanded back into one row per
+    run, spread evenly from captured_at to last_seen_at, within
+    [since, until).
+    """
+    where, params = _history_filters(watch_id, since, until)
+
+    bounds = []
+    if since:
+        bounds.append("observed_at >= ?")
+        params.append(since)
+    if until:
+        bounds.append("observed_at < ?")
+        params.append(until)
+
+    sql = f"""
+        runs AS (
+            SELECT
+                id,
+                total_price,
+                currency,
+                seen_count,
+                CAST(strftime('%s', captured_at) AS INTEGER) AS first_seen,
+                CAST(strftime('%s', last_seen_at) AS INTEGER) AS last_seen
+            FROM watched_results
+            WHERE {where}
+        ),
+        expanded AS (
+            SELECT runs.*, 0 AS k FROM runs
+            UNION ALL
+            SELECT id, total_price, currency, seen_count, first_seen, last_seen, k + 1
+            FROM expanded
+            WHERE k + 1 < seen_count
+        ),
+        observations AS (
+            SELECT * FROM (
+                SELECT
+                    id,
+                    datetime(
+                        first_seen + CASE
+                            WHEN seen_count > 1 THEN k * (last_seen - first_seen) / (seen_count - 1)
+                            ELSE 0
+                        END,
+                        'unixepoch'
+                    ) AS observed_at,
+                    total_price,
+                    currency
+                FROM expanded
+            )
+            {"WHERE " + " AND ".join(bounds) if bounds else ""}
+        )
+    """
+    return sql, params
+
+def fetch_watched_results(
+    watch_id: int,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before: Optional[tuple[str, int]] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Newest first. `before` is a (captured_at, id) keyset cursor: only rows
+    strictly older than it are returned.
+    """
+    where, params = _history_filters(watch_id, since, until, "wr.")
+    if before:
+        where += " AND (wr.captured_at, wr.id) < (?, ?)"
+        params.extend(before)
+
+    sql = f"""
         SELECT
             wr.*,
             ws.adults
         FROM watched_results wr
         JOIN watched_searches ws ON ws.id = wr.watch_id
-        WHERE wr.watch_id = ?
-        ORDER BY wr.captured_at DESC
+        WHERE {where}
+        ORDER BY wr.captured_at DESC, wr.id DESC
+    """
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    cur = get_connection().cursor()
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+def fetch_price_history_by_time(
+    watch_id: int,
+    bucket_format: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Min/avg/max price per calendar bucket; `bucket_format` is an SQLite
+    strftime format such as "%Y-%m-%d".
+    """
+    observations, params = _observations(watch_id, since, until)
+
+    cur = get_connection().cursor()
+    cur.execute(
+        f"""
+        WITH RECURSIVE {observations}
+        SELECT
+            strftime(?, observed_at) AS bucket_start,
+            MIN(total_price) AS min_price,
+            AVG(total_price) AS avg_price,
+            MAX(total_price) AS max_price,
+            COUNT(*) AS samples,
+            MAX(currency) AS currency
+        FROM observations
+        GROUP BY bucket_start
+        ORDER BY bucket_start
         """,
-        (watch_id,),
+        [*params, bucket_format],
     )
+    return cur.fetchall()
+
+def fetch_price_history_by_points(
+    watch_id: int,
+    points: int,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Min/avg/max price over `points` buckets holding equal numbers of
+    consecutive runs. Keeping each bucket's extremes, not just its mean,
+    preserves the spikes a chart needs to show.
+    """
+    observations, params = _observations(watch_id, since, until)
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
\ No newline at end of file
+    cur = get_connection().cursor()
+    cur.execute(
+        f"""
+        WITH RECURSIVE {observations},
+        ranked AS (
+            SELECT
+                observed_at,
+                total_price,
+                currency,
+                ROW_NUMBER() OVER (ORDER BY observed_at, id) - 1 AS rn,
+                COUNT(*) OVER () AS n
+            FROM observations
+        )
+        SELECT
+            MIN(observed_at) AS bucket_start,
+            MIN(total_price) AS min_price,
+            AVG(total_price) AS avg_price,
+            MAX(total_price) AS max_price,
+            COUNT(*) AS samples,
+            MAX(currency) AS currency
+        FROM ranked
+        GROUP BY (rn * ?) / n
+        ORDER BY bucket_start
+        """,
+        [*params, points],
+    )
+    return cur.fetchall()
@@ -0,0 +1,184 @@
+import logging
+import sqlite3
+import time
+from typing import Optional
+
+from app.core.config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_DELAY_SECONDS,
+    JOB_RETENTION_SECONDS,
+)
+from app.core.database import get_connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle: queued -> leased -> done | failed. A leased job whose
+# lease expires (its worker died or hung) goes back to queued, or to
+# failed once it has used up JOB_MAX_ATTEMPTS.
+
+
+def enqueue_watch_jobs(watch_ids: list[int], delay: float = 0.0) -> int:
+    """
+    Queues a run of each watch and returns how many were queued; watches
+    that already have a pending job are skipped.
+    """
+    if not watch_ids:
+        return 0
+
+    now = time.time()
+    with transaction() as cur:
+        cur.executemany(
+            """
+            INSERT OR IGNORE INTO watch_jobs (watch_id, enqueued_at, available_at)
+            VALUES (?, ?, ?)
+            """,
+            [(watch_id, now, now + delay) for watch_id in watch_ids],
+        )
+        return cur.rowcount
+
+
+def recover_expired_leases(now: Optional[float] = None) -> int:
+    """
+    Requeues jobs whose lease has expired, fails those out of attempts and
+    purges old finished jobs. Returns how many leases were recovered.
+    """
+    now = time.time() if now is None else now
+    with transaction() as cur:
+        cur.execute(
+            """
+            UPDATE watch_jobs
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= ? THEN ? END,
+                error = 'lease expired (held by ' || leased_by || ')',
+                leased_by = NULL,
+                lease_expires_at = NULL
+            WHERE status = 'leased' AND lease_expires_at < ?
+            """,
+            (JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now, now),
+        )
+        recovered = cur.rowcount
+
+        cur.execute(
+            "DELETE FROM watch_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (now - JOB_RETENTION_SECONDS,),
+        )
+
+    if recovered:
+        logger.warning("Recovered %d watch job(s) with expired leases", recovered)
+    return recovered
+
+
+def claim_jobs(worker_id: str, limit: int, lease_seconds: int = JOB_LEASE_SECONDS) -> list[sqlite3.Row]:
+    """
+    Leases up to `limit` available jobs to `worker_id`, oldest first. The
+    single UPDATE ... RETURNING is atomic, so two workers can never claim
+    the same job.
+    """
+    now = time.time()
+    with transaction() as cur:
+        cur.execute(
+            """
+            UPDATE watch_jobs
+            SET status = 'leased',
+                leased_by = ?,
+                lease_expires_at = ?,
+                attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM watch_jobs
+                WHERE status = 'queued' AND available_at <= ?
+                ORDER BY available_at, id
+                LIMIT ?
+            )
+            RETURNING id, watch_id, attempts
+            """,
+            (worker_id, now + lease_seconds, now, limit),
+        )
+        return cur.fetchall()
+
+
+def renew_leases(worker_id: str, job_ids: list[int], lease_seconds: int = JOB_LEASE_SECONDS) -> int:
+    """
+    Heartbeat: extends the leases `worker_id` still holds; returns how many.
+    """
+    if not job_ids:
+        return 0
+
+    with transaction() as cur:
+        cur.execute(
+            f"""
+            UPDATE watch_jobs
+            SET lease_expires_at = ?
+            WHERE status = 'leased' AND leased_by = ?
+              AND id IN ({','.join('?' * len(job_ids))})
+            """,
+            [time.time() + lease_seconds, worker_id, *job_ids],
+        )
+        return cur.rowcount
+
+
+def complete_job(job_id: int, worker_id: str, result_id: Optional[int]) -> bool:
+    """
+    Marks a job done, keeping leased_by as the worker that ran it. Returns
+    False if the worker had lost its lease, in which case the job was
+    already requeued for someone else.
+    """
+    with transaction() as cur:
+        cur.execute(
+            """
+            UPDATE watch_jobs
+            SET status = 'done', finished_at = ?, result_id = ?,
+                error = NULL, lease_expires_at = NULL
+            WHERE id = ? AND status = 'leased' AND leased_by = ?
+            """,
+            (time.time(), result_id, job_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+
+def fail_job(job_id: int, worker_id: str, error: str) -> bool:
+    """
+    Requeues a failed job after JOB_RETRY_DELAY_SECONDS, or fails it for
+    good once it has used up JOB_MAX_ATTEMPTS.
+    """
+    now = time.time()
+    with transaction() as cur:
+        cur.execute(
+            """
+            UPDATE watch_jobs
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= ? THEN ? END,
+                available_at = ?,
+                error = ?,
+                leased_by = NULL,
+                lease_expires_at = NULL
+            WHERE id = ? AND status = 'leased' AND leased_by = ?
+            """,
+            (
+                JOB_MAX_ATTEMPTS,
+                JOB_MAX_ATTEMPTS,
+                now,
+                now + JOB_RETRY_DELAY_SECONDS,
+                error,
+                job_id,
+                worker_id,
+            ),
+        )
+        return cur.rowcount == 1
+
+
+def job_queue_stats() -> dict:
+    cur = get_connection().cursor()
+    cur.execute("SELECT status, COUNT(*) AS jobs FROM watch_jobs GROUP BY status")
+    counts = {row["status"]: row["jobs"] for row in cur.fetchall()}
+    cur.execute(
+        "SELECT COUNT(*) FROM watch_jobs WHERE status = 'leased' AND lease_expires_at < ?",
+        (time.time(),),
+    )
+    return {
+        "queued": counts.get("queued", 0),
+        "leased": counts.get("leased", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "expired_leases": cur.fetchone()[0],
+    }
@@ -1,6 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.api.watches.schemas import WatchCreate, Watch, WatchUpdate, WatchedResultResponse, WatchedResult
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Literal, Optional
+from datetime import datetime
+from app.api.watches.schemas import (
+    WatchCreate,
+    Watch,
+    WatchUpdate,
+    WatchedResultResponse,
+    WatchedResult,
+    WatchedResultPage,
+    PricePoint,
+    SnapshotRunSummary,
+    SnapshotRun,
+    SnapshotStorage,
+    SlotTiming,
+    JobQueueStats,
+    SchedulerStatus,
+    WatchRun,
+)
 from app.api.watches.service import (
     create_watch,
     list_watches,
@@ -9,10 +25,21 @@ from app.api.watches.service import (
     remove_watch,
     run_watch_service,
     list_watched_results,
+    list_watched_results_page,
+    get_price_history,
+    list_snapshot_runs,
+    get_snapshot_run,
+    get_snapshot_storage,
+    get_slot_timings,
+    get_job_queue_stats,
+    list_watch_runs,
     run_all_watches_service
 )
+from app.core.scheduler import scheduler_status
+from app.core.responses import FastJSONResponse
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/watches", tags=["watches"])
+router = APIRouter(prefix="/watches", tags=["watches"], route_class=ProfiledRoute)
 
 @router.post("", response_model=int)
 def create(data: WatchCreate):
@@ -22,6 +49,30 @@ def create(data: WatchCreate):
 def list_all():
     return list_watches()
 
+@router.get("/snapshots/storage", response_model=SnapshotStorage)
+def get_snapshots_storage():
+    return get_snapshot_storage()
+
+@router.get("/schedule/slots", response_model=list[SlotTiming])
+def get_schedule_slots():
+    return get_slot_timings()
+
+@router.get("/schedule/status", response_model=SchedulerStatus)
+def get_schedule_status():
+    return scheduler_status()
+
+@router.get("/jobs/stats", response_model=JobQueueStats)
+def get_jobs_stats():
+    return get_job_queue_stats()
+
+@router.get("/runs", response_model=list[WatchRun])
+def get_runs(
+    limit: int = Query(100, ge=1, le=1000),
+    kind: Optional[Literal["single", "batch"]] = None,
+):
+    # Most recent first, from every process sharing the database
+    return list_watch_runs(limit=limit, kind=kind)
+
 @router.get("/{watch_id}", response_model=Watch)
 def get_one(watch_id: int):
     try:
@@ -53,8 +104,54 @@ def run_watch(watch_id: int):
         raise HTTPException(status_code=404, detail=str(e))
     
 @router.get("/{watch_id}/results", response_model=list[WatchedResult])
-def get_results(watch_id: int):
-    return list_watched_results(watch_id)
+def get_results(
+    watch_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    return FastJSONResponse(list_watched_results(watch_id, since=since, until=until, limit=limit))
+
+@router.get("/{watch_id}/results/page", response_model=WatchedResultPage)
+def get_results_page(
+    watch_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    try:
+        return list_watched_results_page(
+            watch_id, limit=limit, cursor=cursor, since=since, until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{watch_id}/price-history", response_model=list[PricePoint])
+def get_price_history_endpoint(
+    watch_id: int,
+    bucket: Literal["hour", "day"] = "day",
+    points: Optional[int] = Query(None, ge=1, le=5000),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    try:
+        return get_price_history(
+            watch_id, bucket=bucket, points=points, since=since, until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{watch_id}/snapshots", response_model=list[SnapshotRunSummary])
+def get_snapshots(watch_id: int, limit: int = Query(100, ge=1, le=1000)):
+    return list_snapshot_runs(watch_id, limit=limit)
+
+@router.get("/{watch_id}/snapshots/{run_id}", response_model=SnapshotRun)
+def get_snapshot(watch_id: int, run_id: int):
+    try:
+        return get_snapshot_run(watch_id, run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 @router.post("/watches/all/run")
 def run_all_watches():
@@ -0,0 +1,66 @@
+import os
+import socket
+import sqlite3
+import time
+from typing import Optional
+
+from app.core.config import WATCH_RUN_RETENTION_SECONDS
+from app.core.database import get_connection, transaction
+
+# Which process ran a watch run: API workers and app.worker processes all
+# write to the same table
+PROCESS = f"{socket.gethostname()}:{os.getpid()}"
+
+WATCH_RUN_FIELDS = (
+    "kind",
+    "started_at",
+    "elapsed_seconds",
+    "watches",
+    "ran",
+    "failed",
+    "planned_calls",
+    "issued_calls",
+    "plan_seconds",
+    "fetch_seconds",
+    "collect_seconds",
+    "store_seconds",
+)
+
+
+def insert_watch_run(run: dict) -> int:
+    """
+    Records one watch run's summary (WATCH_RUN_FIELDS; timings of stages
+    that don't apply may be None) and purges runs older than
+    WATCH_RUN_RETENTION_SECONDS.
+    """
+    with transaction() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO watch_runs (process, {', '.join(WATCH_RUN_FIELDS)})
+            VALUES (?, {', '.join('?' * len(WATCH_RUN_FIELDS))})
+            """,
+            (PROCESS, *(run.get(field) for field in WATCH_RUN_FIELDS)),
+        )
+        run_id = cur.lastrowid
+        cur.execute(
+            "DELETE FROM watch_runs WHERE started_at < ?",
+            (time.time() - WATCH_RUN_RETENTION_SECONDS,),
+        )
+        return run_id
+
+
+def fetch_watch_runs(limit: int = 100, kind: Optional[str] = None) -> list[sqlite3.Row]:
+    """
+    Most recent runs first.
+    """
+    cur = get_connection().cursor()
+    sql = "SELECT * FROM watch_runs"
+    params: list = []
+    if kind is not None:
+        sql += " WHERE kind = ?"
+        params.append(kind)
+    sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+    params.append(limit)
+
+    cur.execute(sql, params)
+    return cur.fetchall()
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from app.api.flights.schemas import FlightOffer
 
 
 class WatchCreate(BaseModel):
@@ -77,3 +78,106 @@ class WatchedResult(BaseModel):
     cabin_bags: int
     seats_left: int
     captured_at: str
+    # The same offer was cheapest on every run from captured_at through
+    # last_seen_at (seen_count runs)
+    last_seen_at: str | None = None
+    seen_count: int = 1
+
+
+class WatchedResultPage(BaseModel):
+    results: list[WatchedResult]
+    # Pass back as `cursor` for the next (older) page; None on the last page
+    next_cursor: str | None = None
+
+
+class PricePoint(BaseModel):
+    bucket_start: str
+    min_price: float
+    avg_price: float
+    max_price: float
+    samples: int
+    currency: str
+
+
+class SnapshotRunSummary(BaseModel):
+    id: int
+    watch_id: int
+    captured_at: datetime
+    offer_count: int
+
+
+class SnapshotRun(BaseModel):
+    run_id: int
+    watch_id: int
+    # Cheapest first
+    offers: list[FlightOffer]
+
+
+class SnapshotStorage(BaseModel):
+    runs: int
+    offers: int
+    # None when SQLite was built without the dbstat table
+    total_bytes: int | None = None
+    bytes_per_run: float | None = None
+    bytes_per_offer: float | None = None
+
+
+class SlotTiming(BaseModel):
+    slot: int
+    # Offset of the slot's window within the hour
+    starts_at_second: int
+    window_seconds: float
+    assigned_watches: int
+    # What the seconds below time: "run" for watches run in this process,
+    # "enqueue" with WATCH_EXECUTION=queue, where the workers run them
+    # later (see /watches/runs for their timings)
+    measures: str
+    runs: int
+    # Runs that took longer than window_seconds
+    overruns: int
+    last_started_at: datetime | None = None
+    last_seconds: float | None = None
+    last_watches: int | None = None
+    last_calls: int | None = None
+    avg_seconds: float | None = None
+    max_seconds: float | None = None
+
+
+class JobQueueStats(BaseModel):
+    queued: int
+    leased: int
+    done: int
+    failed: int
+    # Leased jobs whose worker stopped renewing; requeued on the next claim
+    expired_leases: int
+
+
+class SchedulerStatus(BaseModel):
+    mode: str
+    # Holder id (host:pid:nonce) of the process running scheduled runs
+    leader: str | None = None
+    leader_since: datetime | None = None
+    lease_expires_at: datetime | None = None
+    this_process: str
+    is_leader: bool
+
+
+class WatchRun(BaseModel):
+    id: int
+    # "single" (POST /watches/{id}/run) or "batch" (scheduled and worker runs)
+    kind: str
+    # host:pid of the API worker or app.worker process that ran it
+    process: str
+    started_at: datetime
+    elapsed_seconds: float
+    watches: int
+    ran: int
+    failed: int
+    planned_calls: int | None = None
+    issued_calls: int | None = None
+    # Stage timings; a single run's search is all fetch, and a batch's
+    # collect overlaps its fetch as responses arrive
+    plan_seconds: float | None = None
+    fetch_seconds: float | None = None
+    collect_seconds: float | None = None
+    store_seconds: float | None = None
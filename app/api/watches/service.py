@@ -1,20 +1,98 @@
-from typing import List
-import sqlite3
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+import base64
 import json
+import logging
+import time
 from fastapi import HTTPException
-from app.api.flights.service import search_flights_service
+from app.api.flights.service import search_flights_service, collect_offers
+from app.api.flights.planner import plan_search, unique_queries, execute_queries, cancel_pending
+from app.api.rules.helpers import fetch_active_rules
+from app.core.amadeus import get_token
 from app.api.flights.schemas import FlightSearchRequest
-from app.api.watches.schemas import WatchCreate, Watch, WatchedResultResponse, WatchedResult
+from app.api.watches.schemas import (
+    WatchCreate,
+    Watch,
+    WatchedResultResponse,
+    WatchedResult,
+    WatchedResultPage,
+    PricePoint,
+    SnapshotRunSummary,
+    SnapshotRun,
+    SnapshotStorage,
+    SlotTiming,
+    JobQueueStats,
+    WatchRun,
+)
 from app.api.watches.helpers import (
     insert_watch,
     fetch_watches,
     fetch_watch,
+    fetch_enabled_watches,
+    fetch_schedulable_watches,
+    upsert_watch_schedule,
+    fetch_change_counts,
     update_watch_enabled,
     delete_watch,
     insert_watched_result,
-    fetch_watched_results
+    result_writer,
+    fetch_watched_results,
+    fetch_price_history_by_time,
+    fetch_price_history_by_points,
+)
+from app.api.watches.snapshots import (
+    insert_snapshot,
+    snapshot_writer,
+    fetch_snapshot_runs,
+    fetch_snapshot_offers,
+    snapshot_storage,
+)
+from app.core.config import (
+    SNAPSHOT_ALL_OFFERS,
+    SCHEDULER_CALLS_PER_HOUR,
+    SCHEDULER_VOLATILITY_DAYS,
+    SCHEDULER_SLOTS,
+    WATCH_EXECUTION,
+    METRICS_ENABLED,
+    PROFILE_WATCH_RUN_SAMPLE_RATE,
+)
+from app.core.scheduling import (
+    CallBudget,
+    HashRing,
+    SlotTimings,
+    polling_interval,
+    phase_offset,
 )
-from app.core.config import TOKEN_DB
+from app.api.watches.jobs import enqueue_watch_jobs, job_queue_stats
+from app.api.watches.runs import insert_watch_run, fetch_watch_runs
+from app.core.database import get_connection
+from app.core.metrics import WATCH_RUN_SECONDS, WATCH_RUN_STAGE_SECONDS, WATCHES_RUN
+from app.core.profiling import start_profile, sampled
+
+logger = logging.getLogger(__name__)
+
+# Amadeus calls made by the adaptive scheduler in the last hour
+call_budget = CallBudget(SCHEDULER_CALLS_PER_HOUR)
+
+# Spread mode: each watch's slot within the hour, and how long slots take
+slot_ring = HashRing(SCHEDULER_SLOTS)
+slot_timings = SlotTimings()
+SLOT_SECONDS = 3600 / SCHEDULER_SLOTS
+
+# Runs of history needed before a watch's price volatility counts
+MIN_RUNS_FOR_VOLATILITY = 4
+
+# Columns of a watched_results row (joined with adults) the API returns
+WATCHED_RESULT_FIELDS = tuple(WatchedResult.model_fields)
+
+# Stages of a watch run, timed into watch_runs
+RUN_STAGES = ("plan", "fetch", "collect", "store")
+
+# SQLite strftime formats for calendar price-history buckets
+PRICE_HISTORY_BUCKETS = {
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d",
+}
 
 def create_watch(data: WatchCreate) -> int:
     return insert_watch(data)
@@ -36,9 +114,7 @@ def remove_watch(watch_id: int) -> None:
     delete_watch(watch_id)
 
 def run_watch_service(watch_id: int):
-    conn = sqlite3.connect(TOKEN_DB)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    cur = get_connection().cursor()
 
     # Load watch + rule
     cur.execute(
@@ -56,8 +132,67 @@ def run_watch_service(watch_id: int):
 
     watch = dict(row)
 
-    # Execute search using watch params
-    search_request = FlightSearchRequest(
+    if not watch["enabled"]:
+        raise HTTPException(status_code=400, detail="Watch is disabled")
+
+    started_at, started = time.time(), time.perf_counter()
+    searched = None
+    try:
+        result = search_flights_service(_watch_search_request(watch))
+        searched = time.perf_counter()
+        stored = _store_cheapest(watch_id, result["offers"])
+    except Exception:
+        _record_watch_run("single", started_at, started, ran=0, failed=1, searched=searched)
+        raise
+    _record_watch_run("single", started_at, started, ran=1, failed=0, searched=searched)
+    return stored
+
+def _record_watch_run(
+    kind: str,
+    started_at: float,
+    started: float,
+    ran: int,
+    failed: int,
+    searched: Optional[float] = None,
+    **summary,
+) -> Optional[int]:
+    """
+    Feeds a finished run into the metrics and the watch_runs table, and
+    returns its watch_runs id. `started` and `searched` are perf_counter
+    readings; a single run's search (plan, fetch and parse together) is
+    recorded as its fetch stage, the rest as store.
+    """
+    if not METRICS_ENABLED:
+        return None
+
+    elapsed = time.perf_counter() - started
+    WATCH_RUN_SECONDS.observe(elapsed, kind=kind)
+    WATCHES_RUN.inc(ran, outcome="ok")
+    WATCHES_RUN.inc(failed, outcome="failed")
+    if searched is not None:
+        summary["fetch_seconds"] = searched - started
+        summary["store_seconds"] = elapsed - summary["fetch_seconds"]
+    for stage in RUN_STAGES:
+        if summary.get(f"{stage}_seconds") is not None:
+            WATCH_RUN_STAGE_SECONDS.observe(summary[f"{stage}_seconds"], stage=stage)
+
+    try:
+        return insert_watch_run({
+            **summary,
+            "kind": kind,
+            "started_at": started_at,
+            "elapsed_seconds": elapsed,
+            "watches": summary.get("watches", ran + failed),
+            "ran": ran,
+            "failed": failed,
+        })
+    except Exception:
+        # Losing a summary shouldn't fail the run it describes
+        logger.exception("Could not record %s watch run", kind)
+        return None
+
+def _watch_search_request(watch: dict) -> FlightSearchRequest:
+    return FlightSearchRequest(
         origin=watch["origin"],
         destination=watch["destination"],
         depart=watch["depart_date"],
@@ -68,12 +203,14 @@ def run_watch_service(watch_id: int):
         currency=watch["currency"],
     )
 
-    if not watch["enabled"]:
-        raise HTTPException(status_code=400, detail="Watch is disabled")
-    result = search_flights_service(search_request)
+def _store_cheapest(watch_id: int, offers: list[dict]):
+    # Empty runs are recorded too, so gaps in availability show up
+    if SNAPSHOT_ALL_OFFERS:
+        insert_snapshot(watch_id, offers)
 
-    offers = result["offers"]
     if not offers:
+        # Ends the watch's current run of identical results
+        insert_watched_result(watch_id, None)
         return None
 
     # Pick cheapest
@@ -100,56 +237,244 @@ def run_watch_service(watch_id: int):
         ),
     )
 
-def list_watched_results(watch_id: int):
-    rows = fetch_watched_results(watch_id)
+def _to_snapshot_summary(row) -> SnapshotRunSummary:
+    data = dict(row)
+    data["captured_at"] = datetime.fromtimestamp(data["captured_at"], timezone.utc)
+    return SnapshotRunSummary(**data)
 
-    results = []
-    for row in rows:
-        data = dict(row)
-
-        # JSON fields
-        data["outbound_flight_numbers"] = json.loads(data["outbound_flight_numbers"])
-        data["inbound_flight_numbers"] = (
-            json.loads(data["inbound_flight_numbers"])
-            if data["inbound_flight_numbers"]
-            else None
-        )
-        data["stop_airports_outbound"] = json.loads(data["stop_airports_outbound"])
-        data["stop_airports_inbound"] = (
-            json.loads(data["stop_airports_inbound"])
-            if data["stop_airports_inbound"]
-            else None
-        )
+def list_snapshot_runs(watch_id: int, limit: int = 100) -> list[SnapshotRunSummary]:
+    return [_to_snapshot_summary(row) for row in fetch_snapshot_runs(watch_id, limit)]
 
-        results.append(WatchedResult(**data))
+def get_snapshot_run(watch_id: int, run_id: int) -> SnapshotRun:
+    offers = fetch_snapshot_offers(watch_id, run_id)
+    if offers is None:
+        raise ValueError("Snapshot not found")
+    return SnapshotRun(run_id=run_id, watch_id=watch_id, offers=offers)
 
-    return results
+def get_snapshot_storage() -> SnapshotStorage:
+    return SnapshotStorage(**snapshot_storage())
+
+def _watched_result_dict(row) -> dict:
+    data = {field: row[field] for field in WATCHED_RESULT_FIELDS}
+
+    # JSON fields
+    data["outbound_flight_numbers"] = json.loads(data["outbound_flight_numbers"])
+    data["inbound_flight_numbers"] = (
+        json.loads(data["inbound_flight_numbers"])
+        if data["inbound_flight_numbers"]
+        else None
+    )
+    data["stop_airports_outbound"] = json.loads(data["stop_airports_outbound"])
+    data["stop_airports_inbound"] = (
+        json.loads(data["stop_airports_inbound"])
+        if data["stop_airports_inbound"]
+        else None
+    )
+
+    return data
+
+def _to_watched_result(row) -> WatchedResult:
+    return WatchedResult(**_watched_result_dict(row))
+
+def _to_db_timestamp(value: Optional[datetime]) -> Optional[str]:
+    # captured_at is SQLite CURRENT_TIMESTAMP: UTC, "YYYY-MM-DD HH:MM:SS"
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+def _encode_cursor(captured_at: str, result_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{captured_at}|{result_id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        captured_at, result_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return captured_at, int(result_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def list_watched_results(
+    watch_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+):
+    rows = fetch_watched_results(
+        watch_id,
+        since=_to_db_timestamp(since),
+        until=_to_db_timestamp(until),
+        limit=limit,
+    )
+    # Plain dicts in WatchedResult's shape, for FastJSONResponse
+    return [_watched_result_dict(row) for row in rows]
+
+def list_watched_results_page(
+    watch_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> WatchedResultPage:
+    # One extra row tells us whether another page exists
+    rows = fetch_watched_results(
+        watch_id,
+        since=_to_db_timestamp(since),
+        until=_to_db_timestamp(until),
+        before=_decode_cursor(cursor) if cursor else None,
+        limit=limit + 1,
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["captured_at"], rows[-1]["id"])
+
+    return WatchedResultPage(
+        results=[_to_watched_result(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+def get_price_history(
+    watch_id: int,
+    bucket: str = "day",
+    points: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[PricePoint]:
+    """
+    Downsampled price series, aggregated in SQL. With `points`, results are
+    split into that many equal-count buckets; otherwise into calendar
+    buckets (`bucket` = "hour" or "day").
+    """
+    since_ts, until_ts = _to_db_timestamp(since), _to_db_timestamp(until)
+
+    if points is not None:
+        if points < 1:
+            raise ValueError("points must be at least 1")
+        rows = fetch_price_history_by_points(watch_id, points, since_ts, until_ts)
+    else:
+        if bucket not in PRICE_HISTORY_BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(PRICE_HISTORY_BUCKETS)}")
+        rows = fetch_price_history_by_time(
+            watch_id, PRICE_HISTORY_BUCKETS[bucket], since_ts, until_ts
+        )
+
+    return [PricePoint(**dict(row)) for row in rows]
 
 def run_all_watches_service():
-    conn = sqlite3.connect(TOKEN_DB)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    if WATCH_EXECUTION == "queue":
+        return {"queued": enqueue_watch_jobs([w["id"] for w in fetch_enabled_watches()])}
+    return run_watches_service()
 
-    cur.execute(
-        """
-        SELECT id
-        FROM watched_searches
-        WHERE enabled = 1
-        """
+def dispatch_watches(watch_ids: list[int]):
+    """
+    Runs the watches here, or with WATCH_EXECUTION=queue hands them to the
+    workers and returns a run summary with nothing run yet.
+    """
+    if WATCH_EXECUTION != "queue":
+        return run_watches_service(watch_ids)
+
+    return {
+        "queued": enqueue_watch_jobs(watch_ids),
+        "ran": 0,
+        "failed": 0,
+        "planned_calls": 0,
+        "issued_calls": 0,
+        "run_id": None,
+        "results": [],
+        "failures": [],
+    }
+
+def run_watches_service(watch_ids: Optional[list[int]] = None):
+    """
+    Runs the given enabled watches (all of them by default) in three
+    stages: plan each watch's (date pair, rule) cells, issue each distinct
+    Amadeus query once across all watches, then filter the shared responses
+    back out to each watch. Each run is timed by stage into watch_runs,
+    and PROFILE_WATCH_RUN_SAMPLE_RATE of them are profiled under their
+    watch_runs id.
+    """
+    started_at, started = time.time(), time.perf_counter()
+    watches = fetch_enabled_watches(watch_ids)
+    profile = (
+        start_profile("watch-run", f"run of {len(watches)} watches")
+        if sampled(PROFILE_WATCH_RUN_SAMPLE_RATE) else None
     )
-    rows = cur.fetchall()
-    conn.close()
+    run_id = None
+    try:
+        result = _run_watches(watches, started_at, started)
+        run_id = result["run_id"]
+        return result
+    except Exception:
+        run_id = _record_watch_run("batch", started_at, started, ran=0, failed=len(watches))
+        raise
+    finally:
+        if profile is not None:
+            profile.finish(run_id)
+
+def _run_watches(watches, started_at: float, started: float):
+    rules = fetch_active_rules()
 
     results = []
     failures = []
+    plans = {}
 
-    for row in rows:
+    for row in watches:
         watch_id = row["id"]
         try:
-            result = run_watch_service(watch_id)
+            plans[watch_id] = plan_search(_watch_search_request(dict(row)), rules)
+        except Exception as e:
+            failures.append({
+                "watch_id": watch_id,
+                "error": str(e),
+            })
+
+    queries = unique_queries(
+        cell for cells in plans.values() for cell in cells
+    )
+    planned = time.perf_counter()
+    responses = execute_queries(get_token(), queries) if queries else {}
+
+    # Collecting starts on the first response, so fetching ends when the
+    # last one arrives rather than when collecting does
+    arrivals = [planned]
+    for future in responses.values():
+        future.add_done_callback(lambda _: arrivals.append(time.perf_counter()))
+
+    # Writes go to the write-behind threads so collecting the next watch
+    # never waits on disk; all results land in one transaction at the end
+    collected = {}
+    snapshots = {}
+    try:
+        for watch_id, cells in plans.items():
+            try:
+                offers = collect_offers(cells, responses)
+            except Exception as e:
+                failures.append({
+                    "watch_id": watch_id,
+                    "error": str(e),
+                })
+                continue
+
+            if SNAPSHOT_ALL_OFFERS:
+                snapshots[watch_id] = snapshot_writer.submit((watch_id, offers))
+            collected[watch_id] = (
+                min(offers, key=lambda o: o["total_price"]) if offers else None
+            )
+    finally:
+        cancel_pending(responses)
+    collected_at = time.perf_counter()
+
+    stored = dict(zip(collected, result_writer.submit_many(list(collected.items()))))
+
+    for watch_id in collected:
+        try:
+            if watch_id in snapshots:
+                snapshots[watch_id].result()
             results.append({
                 "watch_id": watch_id,
-                "result_id": result.id if result else None,
+                "result_id": stored[watch_id].result(),
             })
         except Exception as e:
             failures.append({
@@ -157,9 +482,217 @@ def run_all_watches_service():
                 "error": str(e),
             })
 
-    return {
+    summary = {
         "ran": len(results),
         "failed": len(failures),
-        "results": results,
-        "failures": failures,
+        "planned_calls": sum(len(cells) for cells in plans.values()),
+        "issued_calls": len(queries),
+    }
+    run_id = _record_watch_run(
+        "batch",
+        started_at,
+        started,
+        **summary,
+        watches=len(watches),
+        plan_seconds=planned - started,
+        fetch_seconds=max(arrivals) - planned,
+        collect_seconds=collected_at - planned,
+        store_seconds=time.perf_counter() - collected_at,
+    )
+    return {**summary, "run_id": run_id, "results": results, "failures": failures}
+
+def _days_to_departure(watch, now: float) -> float:
+    # Days until the earliest departure in the flex window (midnight UTC);
+    # 0 once the window has started, negative once it has passed
+    depart = datetime.fromisoformat(watch["depart_date"]).replace(tzinfo=timezone.utc)
+    flex = timedelta(days=watch["flex_days"] or 0)
+    if (depart + flex).timestamp() < now:
+        return ((depart + flex).timestamp() - now) / 86400
+    return max(((depart - flex).timestamp() - now) / 86400, 0.0)
+
+def _change_rates(watch_ids: list[int], now: float) -> dict[int, Optional[float]]:
+    # Share of recent runs whose cheapest offer differed from the run
+    # before; unknown until a watch has a few runs of history
+    since = datetime.fromtimestamp(now - SCHEDULER_VOLATILITY_DAYS * 86400, timezone.utc)
+    return {
+        row["watch_id"]: (row["results"] - 1) / (row["runs"] - 1)
+        for row in fetch_change_counts(watch_ids, _to_db_timestamp(since))
+        if row["runs"] >= MIN_RUNS_FOR_VOLATILITY
     }
+
+def _planned_calls(watch, rules: list[dict]) -> int:
+    try:
+        return len(unique_queries(plan_search(_watch_search_request(dict(watch)), rules)))
+    except Exception:
+        # run_watches_service reports the failure
+        return 0
+
+def run_due_watches_service(now: Optional[float] = None):
+    """
+    One adaptive scheduler tick. New watches are scheduled at a stable
+    offset within their first interval; watches that are due run together,
+    most overdue first, as long as each fits in what is left of the hourly
+    call budget (the rest stay due for the next tick); each one is then
+    rescheduled from its polling interval. A watch planning more calls
+    than the whole budget only runs on a tick where the budget is
+    untouched.
+    """
+    now = time.time() if now is None else now
+    watches = fetch_schedulable_watches()
+    rates = _change_rates([w["id"] for w in watches], now)
+
+    scheduled = []
+    due = []
+    for w in watches:
+        if w["next_run_at"] is None:
+            interval = polling_interval(_days_to_departure(w, now), rates.get(w["id"]))
+            scheduled.append((w["id"], interval, now + phase_offset(w["id"], interval), None))
+        elif w["next_run_at"] <= now:
+            due.append(w)
+    if scheduled:
+        upsert_watch_schedule(scheduled)
+
+    due.sort(key=lambda w: w["next_run_at"])
+    rules = fetch_active_rules()
+    remaining = call_budget.remaining(now)
+    selected = []
+    planned = 0
+    for w in due:
+        if remaining is not None:
+            calls = _planned_calls(w, rules)
+            if calls > call_budget.limit and remaining == call_budget.limit and not selected:
+                # Can never fit; run it alone while nothing else is
+                # charged to the window rather than never
+                logger.warning(
+                    "Watch %s plans %d calls, more than the hourly budget of %d",
+                    w["id"], calls, call_budget.limit,
+                )
+            elif calls > remaining:
+                # Smaller watches behind it may still fit
+                continue
+            remaining = max(remaining - calls, 0)
+            planned += calls
+        selected.append(w)
+
+    result = dispatch_watches([w["id"] for w in selected]) if selected else None
+    if result:
+        # Queued runs haven't issued anything yet; charge their plan
+        call_budget.spend(result["issued_calls"] if WATCH_EXECUTION != "queue" else planned, now)
+
+    # Failed watches are rescheduled too, rather than retried every tick
+    rates = _change_rates([w["id"] for w in selected], now)
+    rescheduled = []
+    for w in selected:
+        interval = polling_interval(_days_to_departure(w, now), rates.get(w["id"]))
+        # Keep the watch's phase unless it fell more than an interval behind
+        next_run_at = w["next_run_at"] + interval
+        if next_run_at <= now:
+            next_run_at = now + interval
+        rescheduled.append((w["id"], interval, next_run_at, now))
+    if rescheduled:
+        upsert_watch_schedule(rescheduled)
+
+    if len(selected) < len(due):
+        logger.warning(
+            "Call budget reached: deferred %d of %d due watches", len(due) - len(selected), len(due)
+        )
+
+    return {
+        "scheduled": len(scheduled),
+        "due": len(due),
+        "ran": result["ran"] if result else 0,
+        "queued": result.get("queued", 0) if result else 0,
+        "deferred": len(due) - len(selected),
+        "issued_calls": result["issued_calls"] if result else 0,
+        "budget_remaining": call_budget.remaining(now),
+        "failures": result["failures"] if result else [],
+    }
+
+def current_slot(now: Optional[float] = None) -> int:
+    now = time.time() if now is None else now
+    return int(now % 3600 // SLOT_SECONDS)
+
+def run_slot_service(slot: Optional[int] = None):
+    """
+    Runs the enabled watches hashed to `slot` (the slot of the current time
+    by default) and records how long that took against the slot's window.
+    With WATCH_EXECUTION=queue that only times handing them to the workers.
+    """
+    started_at = time.time()
+    if slot is None:
+        slot = current_slot(started_at)
+    if not 0 <= slot < SCHEDULER_SLOTS:
+        raise ValueError(f"slot must be between 0 and {SCHEDULER_SLOTS - 1}")
+
+    watch_ids = [w["id"] for w in fetch_enabled_watches() if slot_ring.slot_for(w["id"]) == slot]
+
+    started = time.perf_counter()
+    result = dispatch_watches(watch_ids) if watch_ids else None
+    elapsed = time.perf_counter() - started
+
+    overran = elapsed > SLOT_SECONDS
+    slot_timings.record(
+        slot,
+        started_at=started_at,
+        seconds=elapsed,
+        watches=len(watch_ids),
+        calls=result["issued_calls"] if result else 0,
+        overran=overran,
+    )
+    if overran:
+        logger.warning(
+            "Slot %d took %.1fs for %d watches, over its %.0fs window",
+            slot, elapsed, len(watch_ids), SLOT_SECONDS,
+        )
+
+    return {
+        "slot": slot,
+        "watches": len(watch_ids),
+        "elapsed_seconds": elapsed,
+        "ran": result["ran"] if result else 0,
+        "queued": result.get("queued", 0) if result else 0,
+        "failed": result["failed"] if result else 0,
+        "issued_calls": result["issued_calls"] if result else 0,
+        "failures": result["failures"] if result else [],
+    }
+
+def _to_watch_run(row) -> WatchRun:
+    data = dict(row)
+    data["started_at"] = datetime.fromtimestamp(data["started_at"], timezone.utc)
+    return WatchRun(**data)
+
+def list_watch_runs(limit: int = 100, kind: Optional[str] = None) -> List[WatchRun]:
+    return [_to_watch_run(row) for row in fetch_watch_runs(limit, kind)]
+
+def get_job_queue_stats() -> JobQueueStats:
+    return JobQueueStats(**job_queue_stats())
+
+def get_slot_timings() -> List[SlotTiming]:
+    assigned = [0] * SCHEDULER_SLOTS
+    for w in fetch_enabled_watches():
+        assigned[slot_ring.slot_for(w["id"])] += 1
+
+    timings = slot_timings.snapshot()
+    slots = []
+    for slot in range(SCHEDULER_SLOTS):
+        stats = timings.get(slot, {})
+        runs = stats.get("runs", 0)
+        slots.append(SlotTiming(
+            slot=slot,
+            starts_at_second=int(slot * SLOT_SECONDS),
+            window_seconds=SLOT_SECONDS,
+            assigned_watches=assigned[slot],
+            measures="enqueue" if WATCH_EXECUTION == "queue" else "run",
+            runs=runs,
+            overruns=stats.get("overruns", 0),
+            last_started_at=(
+                datetime.fromtimestamp(stats["last_started_at"], timezone.utc)
+                if runs else None
+            ),
+            last_seconds=stats.get("last_seconds"),
+            last_watches=stats.get("last_watches"),
+            last_calls=stats.get("last_calls"),
+            avg_seconds=stats["total_seconds"] / runs if runs else None,
+            max_seconds=stats.get("max_seconds") if runs else None,
+        ))
+    return slots
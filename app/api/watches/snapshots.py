@@ -0,0 +1,356 @@
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from app.core.config import SNAPSHOT_RETENTION_SECONDS
+from app.core.database import get_connection, transaction
+from app.core.write_behind import WriteBehindQueue
+
+_DURATION = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$")
+
+_OFFER_COLUMNS = (
+    "run_id",
+    "ordinal",
+    "rule_name_id",
+    "total_cents",
+    "base_cents",
+    "currency_id",
+    "carrier_id",
+    "fare_brand_id",
+    "outbound_flights_id",
+    "inbound_flights_id",
+    "num_stops",
+    "outbound_stops_id",
+    "inbound_stops_id",
+    "outbound_depart",
+    "outbound_arrive",
+    "outbound_minutes",
+    "inbound_depart",
+    "inbound_arrive",
+    "inbound_minutes",
+    "checked_bags",
+    "cabin_bags",
+    "seats_left",
+)
+
+SNAPSHOT_TABLES = ("snapshot_runs", "snapshot_offers", "snapshot_strings")
+
+
+def duration_to_minutes(iso_duration: Optional[str]) -> Optional[int]:
+    """
+    PT11H30M -> 690. None for missing or unparseable durations.
+    """
+    m = _DURATION.match(iso_duration or "")
+    if not m:
+        return None
+    days, hours, minutes = (int(g) if g else 0 for g in m.groups())
+    return (days * 24 + hours) * 60 + minutes
+
+
+def minutes_to_duration(minutes: Optional[int]) -> Optional[str]:
+    """
+    690 -> PT11H30M (days are folded into hours).
+    """
+    if minutes is None:
+        return None
+    h, m = divmod(minutes, 60)
+    return "PT" + (f"{h}H" if h else "") + (f"{m}M" if m or not h else "")
+
+
+def _to_epoch(local_time: Optional[str]) -> Optional[int]:
+    # Amadeus times are airport-local without an offset; store the wall
+    # clock as if it were UTC so it round-trips exactly
+    if not local_time:
+        return None
+    return int(datetime.fromisoformat(local_time).replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_epoch(value: Optional[int]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _join(values: Optional[list[str]]) -> Optional[str]:
+    return ",".join(values) if values is not None else None
+
+
+def _split(value: Optional[str]) -> Optional[list[str]]:
+    if value is None:
+        return None
+    return value.split(",") if value else []
+
+
+class _StringDictionary:
+    """
+    Process-local cache over the snapshot_strings table.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._values: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def encode(self, cur: sqlite3.Cursor, values: Iterable[Optional[str]]) -> dict[str, int]:
+        """
+        Returns ids for `values`, inserting new strings with `cur`. New ids
+        only reach the shared cache via `remember` once the caller's
+        transaction has committed, so a rollback can't leave stale ids.
+        """
+        wanted = {v for v in values if v is not None}
+        with self._lock:
+            ids = {v: self._ids[v] for v in wanted if v in self._ids}
+
+        for value in wanted - ids.keys():
+            cur.execute("INSERT OR IGNORE INTO snapshot_strings (value) VALUES (?)", (value,))
+            cur.execute("SELECT id FROM snapshot_strings WHERE value = ?", (value,))
+            ids[value] = cur.fetchone()[0]
+        return ids
+
+    def remember(self, ids: dict[str, int]) -> None:
+        with self._lock:
+            self._ids.update(ids)
+            self._values.update((i, v) for v, i in ids.items())
+
+    def decode(self, ids: Iterable[Optional[int]]) -> dict[int, str]:
+        wanted = {i for i in ids if i is not None}
+        with self._lock:
+            values = {i: self._values[i] for i in wanted if i in self._values}
+
+        missing = list(wanted - values.keys())
+        if missing:
+            cur = get_connection().cursor()
+            placeholders = ",".join("?" * len(missing))
+            cur.execute(
+                f"SELECT id, value FROM snapshot_strings WHERE id IN ({placeholders})",
+                missing,
+            )
+            found = {row["id"]: row["value"] for row in cur.fetchall()}
+            self.remember({v: i for i, v in found.items()})
+            values.update(found)
+        return values
+
+
+strings = _StringDictionary()
+
+
+def _purge_runs(cur: sqlite3.Cursor, before: int) -> None:
+    # Runs are inserted in captured_at order, so everything before the
+    # first run still kept can go. Walking the ids up to it stops right
+    # away once old runs are gone, where a captured_at filter would scan
+    # the whole table on every write. Strings are shared and left alone
+    cur.execute(
+        "SELECT id FROM snapshot_runs WHERE captured_at >= ? ORDER BY id LIMIT 1",
+        (before,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return
+    cur.execute("DELETE FROM snapshot_offers WHERE run_id < ?", (row["id"],))
+    cur.execute("DELETE FROM snapshot_runs WHERE id < ?", (row["id"],))
+
+
+def insert_snapshot(watch_id: int, offers: list[dict]) -> int:
+    return insert_snapshots([(watch_id, offers)])[0]
+
+
+def insert_snapshots(runs: list[tuple[int, list[dict]]]) -> list[int]:
+    """
+    Stores every offer of each (watch_id, offers) run, cheapest first, in a
+    single transaction and returns the run ids. Runs older than
+    SNAPSHOT_RETENTION_SECONDS are purged with their offers.
+    """
+    runs = [
+        (watch_id, sorted(offers, key=lambda o: o["total_price"]))
+        for watch_id, offers in runs
+    ]
+    captured_at = int(time.time())
+
+    with transaction() as cur:
+        ids = strings.encode(cur, (
+            value
+            for _, offers in runs
+            for offer in offers
+            for value in (
+                offer["rule_name"],
+                offer["currency"],
+                offer["carrier"],
+                offer["fare_brand"],
+                _join(offer["outbound_flight_numbers"]),
+                _join(offer["inbound_flight_numbers"]),
+                _join(offer["stop_airports_outbound"]),
+                _join(offer["stop_airports_inbound"]),
+            )
+        ))
+
+        def ref(value: Optional[str]) -> Optional[int]:
+            return ids[value] if value is not None else None
+
+        run_ids = []
+        rows = []
+        for watch_id, offers in runs:
+            cur.execute(
+                "INSERT INTO snapshot_runs (watch_id, captured_at, offer_count) VALUES (?, ?, ?)",
+                (watch_id, captured_at, len(offers)),
+            )
+            run_id = cur.lastrowid
+            run_ids.append(run_id)
+
+            for ordinal, offer in enumerate(offers):
+                outbound, inbound = offer["outbound"], offer["inbound"] or {}
+                rows.append((
+                    run_id,
+                    ordinal,
+                    ids[offer["rule_name"]],
+                    round(offer["total_price"] * 100),
+                    round(offer["base_price"] * 100),
+                    ids[offer["currency"]],
+                    ids[offer["carrier"]],
+                    ids[offer["fare_brand"]],
+                    ids[_join(offer["outbound_flight_numbers"])],
+                    ref(_join(offer["inbound_flight_numbers"])),
+                    offer["num_stops"],
+                    ids[_join(offer["stop_airports_outbound"])],
+                    ref(_join(offer["stop_airports_inbound"])),
+                    _to_epoch(outbound["depart_time"]),
+                    _to_epoch(outbound["arrive_time"]),
+                    duration_to_minutes(outbound.get("duration") or offer["total_duration"]),
+                    _to_epoch(inbound.get("depart_time")),
+                    _to_epoch(inbound.get("arrive_time")),
+                    duration_to_minutes(inbound.get("duration")),
+                    offer["checked_bags"],
+                    offer["cabin_bags"],
+                    offer["seats_left"],
+                ))
+
+        cur.executemany(
+            f"""
+            INSERT INTO snapshot_offers ({", ".join(_OFFER_COLUMNS)})
+            VALUES ({", ".join("?" * len(_OFFER_COLUMNS))})
+            """,
+            rows,
+        )
+        _purge_runs(cur, captured_at - SNAPSHOT_RETENTION_SECONDS)
+
+    strings.remember(ids)
+    return run_ids
+
+
+# Write-behind for scheduled runs; see run_all_watches_service
+snapshot_writer = WriteBehindQueue(insert_snapshots, name="snapshots")
+
+
+def fetch_snapshot_runs(watch_id: int, limit: int = 100):
+    cur = get_connection().cursor()
+    cur.execute(
+        """
+        SELECT id, watch_id, captured_at, offer_count
+        FROM snapshot_runs
+        WHERE watch_id = ?
+        ORDER BY captured_at DESC, id DESC
+        LIMIT ?
+        """,
+        (watch_id, limit),
+    )
+    return cur.fetchall()
+
+
+def fetch_snapshot_offers(watch_id: int, run_id: int) -> Optional[list[dict]]:
+    """
+    Decodes a run back into FlightOffer-shaped dicts, cheapest first, or
+    returns None if the run doesn't belong to the watch.
+    """
+    cur = get_connection().cursor()
+    cur.execute(
+        "SELECT 1 FROM snapshot_runs WHERE id = ? AND watch_id = ?",
+        (run_id, watch_id),
+    )
+    if not cur.fetchone():
+        return None
+
+    cur.execute(
+        "SELECT * FROM snapshot_offers WHERE run_id = ? ORDER BY ordinal",
+        (run_id,),
+    )
+    rows = cur.fetchall()
+
+    values = strings.decode(
+        row[column]
+        for row in rows
+        for column in _OFFER_COLUMNS
+        if column.endswith("_id") and column != "run_id"
+    )
+
+    def text(value_id: Optional[int]) -> Optional[str]:
+        return values[value_id] if value_id is not None else None
+
+    offers = []
+    for row in rows:
+        inbound = None
+        if row["inbound_depart"] is not None:
+            inbound = {
+                "depart_time": _from_epoch(row["inbound_depart"]),
+                "arrive_time": _from_epoch(row["inbound_arrive"]),
+                "duration": minutes_to_duration(row["inbound_minutes"]),
+            }
+
+        offers.append({
+            "rule_name": text(row["rule_name_id"]),
+            "total_price": row["total_cents"] / 100,
+            "base_price": row["base_cents"] / 100,
+            "currency": text(row["currency_id"]),
+            "carrier": text(row["carrier_id"]),
+            "outbound_flight_numbers": _split(text(row["outbound_flights_id"])),
+            "inbound_flight_numbers": _split(text(row["inbound_flights_id"])),
+            "fare_brand": text(row["fare_brand_id"]),
+            "num_stops": row["num_stops"],
+            "total_duration": minutes_to_duration(row["outbound_minutes"]),
+            "stop_airports_outbound": _split(text(row["outbound_stops_id"])),
+            "stop_airports_inbound": _split(text(row["inbound_stops_id"])),
+            "outbound": {
+                "depart_time": _from_epoch(row["outbound_depart"]),
+                "arrive_time": _from_epoch(row["outbound_arrive"]),
+                "duration": minutes_to_duration(row["outbound_minutes"]),
+            },
+            "inbound": inbound,
+            "checked_bags": row["checked_bags"],
+            "cabin_bags": row["cabin_bags"],
+            "seats_left": row["seats_left"],
+        })
+    return offers
+
+
+def snapshot_storage() -> dict:
+    """
+    On-disk size of the snapshot tables (and their indexes) plus bytes per
+    run and per offer, from SQLite's dbstat table.
+    """
+    cur = get_connection().cursor()
+    cur.execute("SELECT COUNT(*), COALESCE(SUM(offer_count), 0) FROM snapshot_runs")
+    runs, offers = cur.fetchone()
+
+    try:
+        cur.execute(
+            """
+            SELECT COALESCE(SUM(s.pgsize), 0)
+            FROM dbstat s
+            JOIN sqlite_schema m ON m.name = s.name
+            WHERE m.tbl_name IN (?, ?, ?)
+            """,
+            SNAPSHOT_TABLES,
+        )
+        total_bytes = cur.fetchone()[0]
+    except sqlite3.OperationalError:
+        # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+        total_bytes = None
+
+    return {
+        "runs": runs,
+        "offers": offers,
+        "total_bytes": total_bytes,
+        "bytes_per_run": total_bytes / runs if total_bytes is not None and runs else None,
+        "bytes_per_offer": total_bytes / offers if total_bytes is not None and offers else None,
+    }
@@ -1,59 +1,407 @@
-import sqlite3
+import asyncio
+import importlib.util
+import logging
+import random
+import threading
 import time
-import requests
-from typing import Optional, Dict, Any
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Coroutine
+
+import httpx
 
 from app.core.config import (
     AMADEUS_BASE,
     CLIENT_ID,
     CLIENT_SECRET,
-    TOKEN_DB,
     TOKEN_SAFETY_MARGIN,
+    TOKEN_REFRESH_AHEAD,
+    API_MAX_CALLS_PER_SECOND,
+    API_BURST,
+    API_ADAPTIVE_RATE,
+    API_MIN_CALLS_PER_SECOND,
+    API_RATE_CEILING,
+    API_RATE_INCREASE,
+    API_RATE_DECREASE,
+    API_MAX_RETRIES,
+    API_BACKOFF_BASE_SECONDS,
+    API_BACKOFF_MAX_SECONDS,
+    AMADEUS_POOL_SIZE,
+    AMADEUS_KEEPALIVE_EXPIRY,
+    AMADEUS_CONNECT_TIMEOUT,
+    AMADEUS_TIMEOUT,
+    AMADEUS_HTTP2,
+)
+from app.core.cache import offer_cache, offer_query_key
+from app.core.database import get_connection, transaction
+from app.core.decoding import decode_offers
+from app.core.ratelimit import TokenBucket, AdaptiveRateLimiter
+from app.core.metrics import (
+    Gauge,
+    AMADEUS_TOKEN_SECONDS,
+    AMADEUS_TOKEN_REFRESHES,
+    AMADEUS_SEARCH_SECONDS,
+    AMADEUS_WAIT_SECONDS,
+    AMADEUS_REQUEST_SECONDS,
+    AMADEUS_RETRIES,
+    AMADEUS_DECODE_SECONDS,
 )
 
-def get_token() -> str:
-    now = int(time.time())
-    conn = sqlite3.connect(TOKEN_DB)
-    cur = conn.cursor()
+logger = logging.getLogger(__name__)
+
+# Shared by every caller in the process so the quota holds no matter how
+# many searches run concurrently
+if API_ADAPTIVE_RATE:
+    rate_limiter = AdaptiveRateLimiter(
+        API_MAX_CALLS_PER_SECOND,
+        API_BURST,
+        min_rate=API_MIN_CALLS_PER_SECOND,
+        max_rate=API_RATE_CEILING,
+        increase=API_RATE_INCREASE,
+        decrease=API_RATE_DECREASE,
+    )
+else:
+    rate_limiter = TokenBucket(API_MAX_CALLS_PER_SECOND, API_BURST)
+
+Gauge(
+    "amadeus_calls_per_second",
+    "Current Amadeus call rate of the rate limiter.",
+    lambda: rate_limiter.rate,
+)
+
+# Worth retrying: throttled, or a server-side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header: delay in seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int) -> float:
+    # Full jitter: anywhere up to the exponential step, so retries of calls
+    # throttled together don't come back together
+    return random.uniform(0, min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _load_token() -> tuple[Optional[str], int]:
+    cur = get_connection().cursor()
 
     cur.execute("SELECT access_token, expires_at FROM amadeus_token WHERE id = 1")
     row = cur.fetchone()
-    if row:
-        token, expires_at = row
-        if now < expires_at - TOKEN_SAFETY_MARGIN:
-            conn.close()
-            return token
-
-    r = requests.post(
-        f"{AMADEUS_BASE}/v1/security/oauth2/token",
-        data={
-            "grant_type": "client_credentials",
-            "client_id": CLIENT_ID,
-            "client_secret": CLIENT_SECRET,
-        },
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-        timeout=30,
-    )
-    r.raise_for_status()
-    data = r.json()
+    return tuple(row) if row else (None, 0)
+
 
-    token = data["access_token"]
-    expires_at = now + int(data["expires_in"])
+def _store_token(token: str, expires_at: int) -> None:
+    with transaction() as cur:
+        cur.execute(
+            """
+            INSERT INTO amadeus_token (id, access_token, expires_at)
+            VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                access_token = excluded.access_token,
+                expires_at = excluded.expires_at
+            """,
+            (token, expires_at),
+        )
 
-    cur.execute(
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    # Background refreshes have no awaiting caller to surface errors to
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Amadeus token refresh failed: %s", task.exception())
+
+
+class AmadeusClient:
+    """
+    Async Amadeus client over a keep-alive connection pool.
+
+    The underlying httpx client is created lazily on first use and is bound
+    to the event loop it was created on, so all calls must be awaited on the
+    same loop. Sync code should go through `submit` / `run` below, which use
+    a dedicated background loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str = AMADEUS_BASE,
+        pool_size: int = AMADEUS_POOL_SIZE,
+        keepalive_expiry: float = AMADEUS_KEEPALIVE_EXPIRY,
+        connect_timeout: float = AMADEUS_CONNECT_TIMEOUT,
+        timeout: float = AMADEUS_TIMEOUT,
+        http2: bool = AMADEUS_HTTP2,
+    ):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        # HTTP/2 needs the optional h2 package
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self._token: Optional[str] = None
+        self._expires_at = 0
+        self._token_loaded = False
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                # Callers queue on the semaphore, not on the pool
+                timeout=httpx.Timeout(
+                    self.timeout,
+                    connect=self.connect_timeout,
+                    pool=None,
+                ),
+            )
+            self._slots = asyncio.Semaphore(self.pool_size)
+        return self._client
+
+    async def get_token(self, force: bool = False, stale: Optional[str] = None) -> str:
         """
-        INSERT INTO amadeus_token (id, access_token, expires_at)
-        VALUES (1, ?, ?)
-        ON CONFLICT(id) DO UPDATE SET
-            access_token = excluded.access_token,
-            expires_at = excluded.expires_at
-        """,
-        (token, expires_at),
-    )
-    conn.commit()
-    conn.close()
+        Returns a valid access token from memory.
+
+        Refreshes happen once no matter how many callers need one: they all
+        await the same in-flight request. Within TOKEN_REFRESH_AHEAD of the
+        safety margin the current token is still served while a refresh runs
+        in the background. `force` skips the cache, unless `stale` is given
+        and another caller already replaced that token.
+        """
+        if not self._token_loaded:
+            self._token, self._expires_at = await asyncio.to_thread(_load_token)
+            self._token_loaded = True
+
+        if force:
+            if stale is not None and self._token and self._token != stale:
+                return self._token
+            return await asyncio.shield(self._refresh_token())
+
+        now = time.time()
+        if self._token and now < self._expires_at - TOKEN_SAFETY_MARGIN:
+            if now >= self._expires_at - TOKEN_SAFETY_MARGIN - TOKEN_REFRESH_AHEAD:
+                self._refresh_token()
+            return self._token
+
+        return await asyncio.shield(self._refresh_token())
+
+    def _refresh_token(self) -> asyncio.Task:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._fetch_token())
+            self._refreshing.add_done_callback(_log_refresh_failure)
+        return self._refreshing
+
+    async def _fetch_token(self) -> str:
+        now = int(time.time())
+        try:
+            r = await self._http().post(
+                "/v1/security/oauth2/token",
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": CLIENT_ID,
+                    "client_secret": CLIENT_SECRET,
+                },
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+            r.raise_for_status()
+        except httpx.HTTPError:
+            AMADEUS_TOKEN_REFRESHES.inc(outcome="failed")
+            raise
+        AMADEUS_TOKEN_REFRESHES.inc(outcome="ok")
+        data = r.json()
 
-    return token
+        token = data["access_token"]
+        expires_at = now + int(data["expires_in"])
+        self._token, self._expires_at = token, expires_at
+
+        # Only read back after a restart
+        await asyncio.to_thread(_store_token, token, expires_at)
+        return token
+
+    async def flight_offers_search(
+        self,
+        token: str,
+        origin: str,
+        destination: str,
+        depart_date: str,
+        return_date: Optional[str],
+        adults: int,
+        travel_class: str,
+        non_stop: Optional[bool],
+        included_airline_codes: Optional[str],
+        currency: str,
+        max_results: int = 50,
+        max_age: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Identical queries within OFFER_CACHE_TTL_SECONDS (or `max_age`
+        seconds, if shorter) are served from `offer_cache` without touching
+        the network or the rate limiter. The returned dict may be shared,
+        so callers must not mutate it.
+        """
+        key = offer_query_key(
+            origin, destination, depart_date, return_date, adults,
+            travel_class, non_stop, included_airline_codes, currency,
+            max_results,
+        )
+        started = time.perf_counter()
+        cached = await asyncio.to_thread(offer_cache.get, key, max_age)
+        if cached is not None:
+            AMADEUS_SEARCH_SECONDS.observe(time.perf_counter() - started, cache="hit")
+            return cached
+
+        params = {
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": depart_date,
+            "adults": adults,
+            "travelClass": travel_class,
+            "currencyCode": currency,
+            "max": str(max_results),
+        }
+
+        if return_date:
+            params["returnDate"] = return_date
+        if non_stop:
+            params["nonStop"] = "true"
+        if included_airline_codes:
+            params["includedAirlineCodes"] = included_airline_codes
+
+        r = await self._get_with_retries("/v2/shopping/flight-offers", token, params)
+
+        # Token revoked or expired early: refresh once and retry
+        if r.status_code == 401:
+            token = await self.get_token(force=True, stale=token)
+            r = await self._get_with_retries("/v2/shopping/flight-offers", token, params)
+
+        r.raise_for_status()
+        with AMADEUS_DECODE_SECONDS.time():
+            data = decode_offers(r.content)
+
+        await asyncio.to_thread(offer_cache.set, key, data)
+        AMADEUS_SEARCH_SECONDS.observe(time.perf_counter() - started, cache="miss")
+        return data
+
+    async def _get_with_retries(self, path: str, token: str, params: dict) -> httpx.Response:
+        """
+        GETs are idempotent, so 429s, 5xx and dropped connections are retried
+        up to API_MAX_RETRIES times. Each 429 feeds the rate limiter, which
+        also holds every caller back for its Retry-After. The last response
+        is returned whatever its status.
+        """
+        for attempt in range(API_MAX_RETRIES + 1):
+            last = attempt == API_MAX_RETRIES
+            try:
+                r = await self._get(path, token, params)
+            except httpx.TransportError as e:
+                if last:
+                    raise
+                logger.warning("Amadeus call failed (%s), retry %d", e, attempt + 1)
+                AMADEUS_RETRIES.inc(reason="transport")
+                await asyncio.sleep(backoff_seconds(attempt))
+                continue
+
+            if r.status_code == 429:
+                rate_limiter.throttled(retry_after_seconds(r.headers.get("Retry-After")))
+            elif r.is_success:
+                # Other errors say nothing about the quota
+                rate_limiter.succeeded()
+            if r.status_code not in RETRY_STATUSES or last:
+                return r
+
+            logger.warning("Amadeus answered %d, retry %d", r.status_code, attempt + 1)
+            AMADEUS_RETRIES.inc(reason=str(r.status_code))
+            await asyncio.sleep(backoff_seconds(attempt))
+
+    async def _get(self, path: str, token: str, params: dict) -> httpx.Response:
+        http = self._http()
+        queued = time.perf_counter()
+        async with self._slots:
+            await rate_limiter.acquire_async()
+            started = time.perf_counter()
+            AMADEUS_WAIT_SECONDS.observe(started - queued)
+            try:
+                r = await http.get(
+                    path,
+                    headers={"Authorization": f"Bearer {token}"},
+                    params=params,
+                )
+            except httpx.TransportError:
+                AMADEUS_REQUEST_SECONDS.observe(time.perf_counter() - started, status="error")
+                raise
+            AMADEUS_REQUEST_SECONDS.observe(time.perf_counter() - started, status=str(r.status_code))
+            return r
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+client = AmadeusClient()
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever,
+                name="amadeus-client",
+                daemon=True,
+            ).start()
+        return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    """
+    Schedules a client coroutine on the background loop and returns a
+    concurrent.futures.Future for it.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+
+def run(coro: Coroutine):
+    return submit(coro).result()
+
+
+def close_client() -> None:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), _loop).result()
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
+
+
+def get_token() -> str:
+    with AMADEUS_TOKEN_SECONDS.time():
+        return run(client.get_token())
 
 
 def flight_offers_search(
@@ -68,30 +416,19 @@ def flight_offers_search(
     included_airline_codes: Optional[str],
     currency: str,
     max_results: int = 50,
+    max_age: Optional[float] = None,
 ) -> Dict[str, Any]:
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {
-        "originLocationCode": origin,
-        "destinationLocationCode": destination,
-        "departureDate": depart_date,
-        "adults": adults,
-        "travelClass": travel_class,
-        "currencyCode": currency,
-        "max": str(max_results),
-    }
-
-    if return_date:
-        params["returnDate"] = return_date
-    if non_stop:
-        params["nonStop"] = "true"
-    if included_airline_codes:
-        params["includedAirlineCodes"] = included_airline_codes
-
-    r = requests.get(
-        f"{AMADEUS_BASE}/v2/shopping/flight-offers",
-        headers=headers,
-        params=params,
-        timeout=30,
-    )
-    r.raise_for_status()
-    return r.json()
\ No newline at end of file
+    return run(client.flight_offers_search(
+        token=token,
+        origin=origin,
+        destination=destination,
+        depart_date=depart_date,
+        return_date=return_date,
+        adults=adults,
+        travel_class=travel_class,
+        non_stop=non_stop,
+        included_airline_codes=included_airline_codes,
+        currency=currency,
+        max_results=max_results,
+        max_age=max_age,
+    ))
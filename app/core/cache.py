@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import (
+    OFFER_CACHE_TTL_SECONDS,
+    OFFER_CACHE_MAX_ENTRIES,
+    OFFER_CACHE_PERSIST,
+)
+from app.core.database import get_connection, transaction
+from app.utils.formatting import parse_valid_carriers
+
+
+def offer_query_key(
+    origin: str,
+    destination: str,
+    depart_date: str,
+    return_date: Optional[str],
+    adults: int,
+    travel_class: str,
+    non_stop: Optional[bool],
+    included_airline_codes: Optional[str],
+    currency: str,
+    max_results: int,
+) -> str:
+    """
+    Normalizes flight-offers parameters into a cache key, so "ac, az" and
+    "AZ,AC" or nonStop None and False hit the same entry.
+    """
+    carriers = sorted(parse_valid_carriers(included_airline_codes))
+    return json.dumps([
+        origin.strip().upper(),
+        destination.strip().upper(),
+        depart_date,
+        return_date or None,
+        int(adults),
+        travel_class.strip().upper(),
+        bool(non_stop),
+        ",".join(carriers) or None,
+        currency.strip().upper(),
+        int(max_results),
+    ])
+
+
+class ResponseCache:
+    """
+    TTL cache with a size-bounded LRU in memory and an optional SQLite tier
+    (the `offer_cache` table) that survives restarts.
+    """
+
+    def __init__(
+        self,
+        ttl: int = OFFER_CACHE_TTL_SECONDS,
+        max_entries: int = OFFER_CACHE_MAX_ENTRIES,
+        persist: bool = OFFER_CACHE_PERSIST,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        The value stored under `key` if it's younger than the TTL, and than
+        `max_age` seconds when given.
+        """
+        value = self.lookup(key, max_age)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    def lookup(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Like `get`, but a miss isn't counted: for checking ahead of calls
+        that will `get` themselves.
+        """
+        now = time.time()
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at < max_age:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                if now - stored_at >= self.ttl:
+                    del self._entries[key]
+
+        if self.persist:
+            row = self._load(key, now, max_age)
+            if row is not None:
+                stored_at, value = row
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, stored_at, value)
+                return value
+
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+
+        if self.persist:
+            self._store(key, now, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.persist:
+            with transaction() as cur:
+                cur.execute("DELETE FROM offer_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    def _remember(self, key: str, stored_at: float, value: Any) -> None:
+        # Caller holds the lock
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str, now: float, max_age: float) -> Optional[tuple[float, Any]]:
+        cur = get_connection().cursor()
+        cur.execute(
+            "SELECT stored_at, payload FROM offer_cache WHERE cache_key = ? AND stored_at > ?",
+            (key, now - max_age),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _store(self, key: str, now: float, value: Any) -> None:
+        with transaction() as cur:
+            cur.execute(
+                """
+                INSERT INTO offer_cache (cache_key, payload, stored_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    payload = excluded.payload,
+                    stored_at = excluded.stored_at
+                """,
+                (key, json.dumps(value), now),
+            )
+
+            # Expired rows are never read again; sweep them once per TTL
+            if now - self._last_purge > self.ttl:
+                cur.execute("DELETE FROM offer_cache WHERE stored_at <= ?", (now - self.ttl,))
+                self._last_purge = now
+
+
+offer_cache = ResponseCache()
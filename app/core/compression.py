@@ -0,0 +1,83 @@
+import importlib.util
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import (
+    RESPONSE_COMPRESSION_MIN_BYTES,
+    GZIP_LEVEL,
+    BROTLI_QUALITY,
+)
+
+# Brotli needs the optional brotli package
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Compress bodies at least this large off the event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = BROTLI_QUALITY):
+        super().__init__(app, minimum_size)
+        self.quality = quality
+        self._compressor = None
+
+    @property
+    def compressor(self):
+        if self._compressor is None:
+            import brotli
+
+            self._compressor = brotli.Compressor(quality=self.quality)
+        return self._compressor
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        # Flushing each chunk keeps streamed responses (NDJSON search)
+        # arriving as they're produced
+        if more_body:
+            return self.compressor.process(body) + self.compressor.flush()
+        return self.compressor.process(body) + self.compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that prefers Brotli for clients accepting it, when the
+    brotli package is installed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = RESPONSE_COMPRESSION_MIN_BYTES,
+        compresslevel: int = GZIP_LEVEL,
+        quality: int = BROTLI_QUALITY,
+    ):
+        super().__init__(
+            app,
+            minimum_size=minimum_size,
+            compresslevel=compresslevel,
+            thread_minimum_size=THREAD_MINIMUM_SIZE,
+        )
+        self.quality = quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and BROTLI_AVAILABLE and "br" in accepted_encodings(Headers(scope=scope)):
+            await BrotliResponder(self.app, self.minimum_size, self.quality)(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+def accepted_encodings(headers: Headers) -> set[str]:
+    return {
+        encoding.partition(";")[0].strip().lower()
+        for encoding in headers.get("Accept-Encoding", "").split(",")
+    }
+
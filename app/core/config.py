@@ -9,4 +9,128 @@ CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 
 TOKEN_DB = "flights.db"
 TOKEN_SAFETY_MARGIN = 60
-API_CALL_DELAY_SECONDS = 1.1
\ No newline at end of file
+# Start a background token refresh this many seconds before the safety margin
+TOKEN_REFRESH_AHEAD = int(os.getenv("TOKEN_REFRESH_AHEAD", "300"))
+
+# SQLite connection tuning (see app.core.database)
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "20000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+# Amadeus quota: calls per second across the whole process, and how many
+# calls may be issued back to back before the rate kicks in
+API_MAX_CALLS_PER_SECOND = float(os.getenv("API_MAX_CALLS_PER_SECOND", "10"))
+API_BURST = int(os.getenv("API_BURST", "1"))
+# Adaptive rate (AIMD): API_MAX_CALLS_PER_SECOND is only where it starts.
+# It roughly doubles every second until the first 429, then grows by
+# API_RATE_INCREASE calls/s every second without one, and is multiplied by
+# API_RATE_DECREASE on one, within the min/max bounds
+API_ADAPTIVE_RATE = os.getenv("API_ADAPTIVE_RATE", "1") == "1"
+API_MIN_CALLS_PER_SECOND = float(os.getenv("API_MIN_CALLS_PER_SECOND", "0.5"))
+API_RATE_CEILING = float(os.getenv("API_RATE_CEILING", "50"))
+API_RATE_INCREASE = float(os.getenv("API_RATE_INCREASE", "0.5"))
+API_RATE_DECREASE = float(os.getenv("API_RATE_DECREASE", "0.5"))
+# Throttled (429), failed (5xx) or dropped flight-offers calls are retried
+# with jittered exponential backoff, honouring Retry-After
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "4"))
+API_BACKOFF_BASE_SECONDS = float(os.getenv("API_BACKOFF_BASE_SECONDS", "0.5"))
+API_BACKOFF_MAX_SECONDS = float(os.getenv("API_BACKOFF_MAX_SECONDS", "30"))
+
+# Amadeus HTTP client: pooled keep-alive connections, also the cap on
+# concurrent in-flight calls
+AMADEUS_POOL_SIZE = int(os.getenv("AMADEUS_POOL_SIZE", "8"))
+AMADEUS_KEEPALIVE_EXPIRY = float(os.getenv("AMADEUS_KEEPALIVE_EXPIRY", "60"))
+AMADEUS_CONNECT_TIMEOUT = float(os.getenv("AMADEUS_CONNECT_TIMEOUT", "10"))
+AMADEUS_TIMEOUT = float(os.getenv("AMADEUS_TIMEOUT", "30"))
+AMADEUS_HTTP2 = os.getenv("AMADEUS_HTTP2", "1") == "1"
+# Flight-offers response decoding: "msgspec", "orjson" or "json"; "auto"
+# uses the fastest one installed
+JSON_DECODER = os.getenv("JSON_DECODER", "auto")
+
+# API response compression: Brotli for clients that accept it (needs the
+# optional brotli package), gzip otherwise; smaller bodies are sent as is
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1") == "1"
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Flight-offers response cache
+OFFER_CACHE_TTL_SECONDS = int(os.getenv("OFFER_CACHE_TTL_SECONDS", "1800"))
+OFFER_CACHE_MAX_ENTRIES = int(os.getenv("OFFER_CACHE_MAX_ENTRIES", "256"))
+OFFER_CACHE_PERSIST = os.getenv("OFFER_CACHE_PERSIST", "1") == "1"
+# Searches reuse cached results of cells (date pair, rule) at most this
+# old and only query the rest, e.g. the new dates of a widened flex window;
+# capped by OFFER_CACHE_TTL_SECONDS
+SEARCH_REUSE_MAX_AGE_SECONDS = int(os.getenv("SEARCH_REUSE_MAX_AGE_SECONDS", str(OFFER_CACHE_TTL_SECONDS)))
+
+# Serve compatible rules from one Amadeus call per date pair and filter
+# each rule locally
+MERGE_RULE_QUERIES = os.getenv("MERGE_RULE_QUERIES", "0") == "1"
+
+# Keep every qualifying offer of a watch run in the snapshot tables, not
+# only the cheapest in watched_results, for SNAPSHOT_RETENTION_SECONDS
+SNAPSHOT_ALL_OFFERS = os.getenv("SNAPSHOT_ALL_OFFERS", "1") == "1"
+SNAPSHOT_RETENTION_SECONDS = int(os.getenv("SNAPSHOT_RETENTION_SECONDS", str(30 * 86400)))
+
+# Most rows a write-behind thread flushes in one transaction
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "1000"))
+
+# An unchanged cheapest offer extends the watch's latest watched_results
+# row instead of adding one, unless that row was last seen longer ago than
+# RESULT_RUN_MAX_GAP_INTERVALS of the watch's adaptive polling interval, or
+# RESULT_RUN_MAX_GAP_SECONDS if longer (the scheduler was down, so the gap
+# shouldn't be bridged)
+RESULT_RUN_MAX_GAP_SECONDS = int(os.getenv("RESULT_RUN_MAX_GAP_SECONDS", "10800"))
+RESULT_RUN_MAX_GAP_INTERVALS = float(os.getenv("RESULT_RUN_MAX_GAP_INTERVALS", "2"))
+
+# Watch scheduling: "hourly" runs every enabled watch at minute 0;
+# "spread" runs each watch once an hour in its own slot (SCHEDULER_SLOTS
+# slots, which must divide 60 minutes); "adaptive" gives each watch its own
+# interval from days to departure and price volatility (see
+# app.core.scheduling), checked every tick
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "hourly")
+SCHEDULER_SLOTS = int(os.getenv("SCHEDULER_SLOTS", "12"))
+SCHEDULER_TICK_SECONDS = int(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+SCHEDULER_MIN_INTERVAL_SECONDS = int(os.getenv("SCHEDULER_MIN_INTERVAL_SECONDS", "1800"))
+SCHEDULER_MAX_INTERVAL_SECONDS = int(os.getenv("SCHEDULER_MAX_INTERVAL_SECONDS", "86400"))
+# Amadeus calls the adaptive scheduler may issue per rolling hour; 0 means
+# no limit
+SCHEDULER_CALLS_PER_HOUR = int(os.getenv("SCHEDULER_CALLS_PER_HOUR", "0"))
+# History used to measure a watch's price volatility
+SCHEDULER_VOLATILITY_DAYS = int(os.getenv("SCHEDULER_VOLATILITY_DAYS", "7"))
+
+# Where scheduled watch runs execute: "inline" in the API process, or
+# "queue" to enqueue them in watch_jobs for `python -m app.worker`
+WATCH_EXECUTION = os.getenv("WATCH_EXECUTION", "inline")
+# A worker must renew its lease on a job within this many seconds or the
+# job goes back to the queue for another worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY_SECONDS = int(os.getenv("JOB_RETRY_DELAY_SECONDS", "60"))
+# Finished jobs are kept this long for inspection
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+WORKER_BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", "20"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+
+# Only the process holding the scheduler lease runs scheduled watch runs;
+# if it dies, another takes over within this many seconds
+LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", "30"))
+
+# Timing metrics of the hot paths, served per process on /metrics, and a
+# watch_runs row per watch run (kept WATCH_RUN_RETENTION_SECONDS); when off
+# the instrumented code skips both
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+WATCH_RUN_RETENTION_SECONDS = int(os.getenv("WATCH_RUN_RETENTION_SECONDS", str(30 * 86400)))
+
+# Profiling (see app.core.profiling): "cprofile", "pyinstrument" (needs the
+# optional pyinstrument package) or "auto". With PROFILE_REQUESTS a request
+# asks for a profile with an X-Profile: 1 header or ?profile=1; the sample
+# rates (0 to 1) profile that share of requests and watch runs unasked.
+# Profiles are saved to PROFILE_DIR, keeping the PROFILE_KEEP most recent
+PROFILER = os.getenv("PROFILER", "auto")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "1") == "1"
+PROFILE_REQUEST_SAMPLE_RATE = float(os.getenv("PROFILE_REQUEST_SAMPLE_RATE", "0"))
+PROFILE_WATCH_RUN_SAMPLE_RATE = float(os.getenv("PROFILE_WATCH_RUN_SAMPLE_RATE", "0"))
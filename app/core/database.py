@@ -1,95 +1,102 @@
 import sqlite3
-from app.core.config import TOKEN_DB
-
-def init_db() -> None:
-    conn = sqlite3.connect(TOKEN_DB)
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS amadeus_token (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            access_token TEXT NOT NULL,
-            expires_at INTEGER NOT NULL
-        )
-        """
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.config import (
+    TOKEN_DB,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+    DB_STATEMENT_CACHE,
+)
+
+_local = threading.local()
+# Open connections by thread id. close_connections() closes them all and
+# bumps the generation, so each thread opens a new one on its next use
+_connections: dict[int, sqlite3.Connection] = {}
+_connections_lock = threading.Lock()
+_generation = 0
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        TOKEN_DB,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=DB_STATEMENT_CACHE,
+        # Each connection stays on the thread that opened it; this only
+        # lets close_connections() close them all at shutdown
+        check_same_thread=False,
     )
+    conn.row_factory = sqlite3.Row
+
+    # WAL lets readers run while the scheduler writes; NORMAL is durable
+    # across app crashes in WAL mode, only an OS crash can lose the last
+    # commits
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns this thread's connection to TOKEN_DB, opening it on first use.
+
+    Connections are kept for the life of the thread so the pragmas and
+    sqlite3's prepared statement cache are only paid for once. Rows come
+    back as sqlite3.Row. Don't close the connection; use `transaction()`
+    for writes. After `close_connections()` the next call opens a new one.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        conn = _connect()
+        with _connections_lock:
+            # A thread id is reused once its thread has exited, whose
+            # connection nothing else will close
+            stale = _connections.get(threading.get_ident())
+            _connections[threading.get_ident()] = conn
+            _local.conn, _local.generation = conn, _generation
+        if stale is not None:
+            stale.close()
+    return conn
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Cursor]:
+    """
+    Yields a cursor on this thread's connection and commits when the block
+    exits, or rolls back if it raises.
+    """
+    conn = get_connection()
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def close_connections() -> None:
+    """
+    Closes every thread's connection; threads that carry on get a new one
+    from `get_connection()`.
+    """
+    global _generation
+    with _connections_lock:
+        for conn in _connections.values():
+            conn.close()
+        _connections.clear()
+        _generation += 1
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS flight_rules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rule_name TEXT NOT NULL,
-            included_airline_codes TEXT,
-            non_stop INTEGER,
-            max_allowed_stops INTEGER NOT NULL,
-            enabled INTEGER NOT NULL DEFAULT 1
-        )
-        """
-    )
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS watched_searches (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-
-            rule_id INTEGER NOT NULL,
-            origin TEXT NOT NULL,
-            destination TEXT NOT NULL,
-            depart_date TEXT NOT NULL,
-            return_date TEXT,
-            flex_days INTEGER NOT NULL,
-            adults INTEGER NOT NULL,
-            travel_class TEXT NOT NULL,
-            currency TEXT NOT NULL,
-
-            enabled INTEGER NOT NULL DEFAULT 1,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-
-            FOREIGN KEY (rule_id) REFERENCES flight_rules(id)
-        )
-        """
-    )
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS watched_results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-
-            watch_id INTEGER NOT NULL,
 
-            total_price REAL NOT NULL,
-            base_price REAL NOT NULL,
-            currency TEXT NOT NULL,
-
-            carrier TEXT NOT NULL,
-            fare_brand TEXT NOT NULL,
-
-            outbound_flight_numbers TEXT NOT NULL,
-            inbound_flight_numbers TEXT,
-
-            num_stops INTEGER NOT NULL,
-            stop_airports_outbound TEXT NOT NULL,
-            stop_airports_inbound TEXT,
-
-            outbound_depart_time TEXT NOT NULL,
-            outbound_arrive_time TEXT NOT NULL,
-            outbound_duration TEXT,
-
-            inbound_depart_time TEXT,
-            inbound_arrive_time TEXT,
-            inbound_duration TEXT,
-
-            checked_bags INTEGER NOT NULL,
-            cabin_bags INTEGER NOT NULL,
-            seats_left INTEGER NOT NULL,
-
-            captured_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-
-            FOREIGN KEY (watch_id) REFERENCES watched_searches(id)
-        )
-        """
-    )
+def init_db() -> None:
+    """
+    Brings the database schema up to date (see app.core.migrations).
+    """
+    from app.core.migrations import migrate
 
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    migrate()
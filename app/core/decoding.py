@@ -0,0 +1,128 @@
+import importlib.util
+import json
+import logging
+from typing import Callable, TypedDict
+
+from app.core.config import JSON_DECODER
+
+logger = logging.getLogger(__name__)
+
+
+# The parts of a flight-offers response that app.api.flights.helpers reads.
+# With msgspec everything else (dictionaries, pricingOptions, aircraft, ...)
+# is skipped while decoding; keys missing from the response stay missing,
+# so the helpers' own fallbacks apply as with plain json.
+
+class Place(TypedDict, total=False):
+    iataCode: str
+    at: str
+
+
+class Segment(TypedDict, total=False):
+    carrierCode: str
+    number: str
+    departure: Place
+    arrival: Place
+
+
+class Itinerary(TypedDict, total=False):
+    duration: str
+    segments: list[Segment]
+
+
+class Bags(TypedDict, total=False):
+    quantity: int
+
+
+class FareDetails(TypedDict, total=False):
+    brandedFareLabel: str
+    includedCheckedBags: Bags
+    includedCabinBags: Bags
+
+
+class TravelerPricing(TypedDict, total=False):
+    fareDetailsBySegment: list[FareDetails]
+
+
+class Price(TypedDict, total=False):
+    total: str
+    base: str
+    currency: str
+
+
+class Offer(TypedDict, total=False):
+    validatingAirlineCodes: list[str]
+    numberOfBookableSeats: int
+    price: Price
+    itineraries: list[Itinerary]
+    travelerPricings: list[TravelerPricing]
+
+
+class OffersResponse(TypedDict, total=False):
+    data: list[Offer]
+
+
+def _msgspec_decoder() -> Callable[[bytes], dict]:
+    import msgspec
+
+    decoder = msgspec.json.Decoder(OffersResponse)
+
+    def decode(content: bytes) -> dict:
+        try:
+            return decoder.decode(content)
+        except msgspec.ValidationError as e:
+            # A field of an unexpected type; not worth failing the search over
+            logger.warning("Amadeus response doesn't match OffersResponse (%s); decoding it in full", e)
+            return json.loads(content)
+
+    return decode
+
+
+def _orjson_decoder() -> Callable[[bytes], dict]:
+    # No schema: decodes everything, but still well ahead of json
+    import orjson
+
+    return orjson.loads
+
+
+def _json_decoder() -> Callable[[bytes], dict]:
+    return json.loads
+
+
+# Fastest first
+DECODERS = {
+    "msgspec": _msgspec_decoder,
+    "orjson": _orjson_decoder,
+    "json": _json_decoder,
+}
+
+
+def installed(name: str) -> bool:
+    return name == "json" or importlib.util.find_spec(name) is not None
+
+
+def resolve_decoder(name: str = JSON_DECODER) -> str:
+    """
+    The backend to use for `name`: "auto" picks the fastest installed one,
+    and a named backend that isn't installed falls back to stdlib json.
+    """
+    if name == "auto":
+        return next(backend for backend in DECODERS if installed(backend))
+    if name not in DECODERS:
+        raise ValueError(f"Unknown JSON decoder: {name}")
+    if not installed(name):
+        logger.warning("%s is not installed; decoding Amadeus responses with json", name)
+        return "json"
+    return name
+
+
+decoder_name = resolve_decoder()
+_decode = DECODERS[decoder_name]()
+
+
+def decode_offers(content: bytes) -> dict:
+    """
+    Decodes a flight-offers response body into plain dicts and lists, the
+    same shape `r.json()` gives.
+    """
+    return _decode(content)
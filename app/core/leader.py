@@ -0,0 +1,125 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from app.core.config import LEADER_LEASE_SECONDS
+from app.core.database import get_connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """
+    Advisory lease in the `leases` table that at most one process holds at
+    a time. A heartbeat thread renews it every third of `ttl`; if the holder
+    dies, another process takes it over once it expires. `on_acquire` and
+    `on_release` run on the heartbeat thread when this process gains or
+    loses the lease.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        on_acquire: Callable[[], None],
+        on_release: Callable[[], None],
+        ttl: int = LEADER_LEASE_SECONDS,
+    ):
+        self.name = name
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl
+        self._on_acquire = on_acquire
+        self._on_release = on_release
+        self._is_leader = False
+        self._expires_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def start(self) -> None:
+        # First attempt inline, so a lone process leads from startup
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops heartbeating and gives the lease up, so another process can
+        take over straight away instead of waiting for it to expire.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._is_leader:
+            self._set_leader(False)
+            try:
+                with transaction() as cur:
+                    cur.execute(
+                        "UPDATE leases SET expires_at = 0 WHERE name = ? AND holder = ?",
+                        (self.name, self.holder),
+                    )
+            except Exception:
+                logger.exception("Could not release the %s lease", self.name)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            self._beat()
+
+    def _beat(self) -> None:
+        now = time.time()
+        try:
+            held = self._try_acquire(now)
+        except Exception:
+            # Couldn't reach the database; we're still the leader until the
+            # lease we hold runs out
+            logger.exception("%s lease heartbeat failed", self.name)
+            held = self._is_leader and now < self._expires_at
+
+        if held:
+            self._expires_at = now + self.ttl
+        if held != self._is_leader:
+            self._set_leader(held)
+
+    def _try_acquire(self, now: float) -> bool:
+        # Take the lease if it's free, expired or already ours
+        with transaction() as cur:
+            cur.execute(
+                """
+                INSERT INTO leases (name, holder, acquired_at, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    holder = excluded.holder,
+                    acquired_at = CASE
+                        WHEN leases.holder = excluded.holder THEN leases.acquired_at
+                        ELSE excluded.acquired_at
+                    END,
+                    expires_at = excluded.expires_at
+                WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+                """,
+                (self.name, self.holder, now, now + self.ttl, now),
+            )
+            return cur.rowcount == 1
+
+    def _set_leader(self, leader: bool) -> None:
+        self._is_leader = leader
+        if leader:
+            logger.info("%s acquired the %s lease", self.holder, self.name)
+            self._on_acquire()
+        else:
+            logger.warning("%s lost the %s lease", self.holder, self.name)
+            self._on_release()
+
+
+def fetch_lease(name: str) -> Optional[dict]:
+    cur = get_connection().cursor()
+    cur.execute("SELECT holder, acquired_at, expires_at FROM leases WHERE name = ?", (name,))
+    row = cur.fetchone()
+    return dict(row) if row else None
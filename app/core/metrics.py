@@ -0,0 +1,278 @@
+import bisect
+import threading
+import time
+from typing import Callable, Iterator
+
+from app.core.config import METRICS_ENABLED
+
+# Seconds; from in-memory work (parsing one response) up to slow Amadeus
+# calls and whole watch runs
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+_metrics: list["Metric"] = []
+_metrics_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """
+    One named metric in this process's registry, with a fixed set of label
+    names. Values are kept per process: behind several uvicorn workers
+    each scrape sees the worker that answered it.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        with _metrics_lock:
+            _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if not self.labels and not labels:
+            return ()
+        try:
+            if len(labels) == len(self.labels):
+                return tuple([str(labels[name]) for name in self.labels])
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """
+    Read from `read` at scrape time, e.g. a queue depth or the current
+    Amadeus call rate, so keeping it current costs nothing.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        super().__init__(name, documentation)
+        self._read = read
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {_format_value(self._read())}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket (the last one +Inf), sum]
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def time(self, **labels) -> "Timer":
+        """
+        Context manager observing the seconds spent in its block.
+        """
+        return Timer(self, labels) if METRICS_ENABLED else _DISABLED_TIMER
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}"
+
+
+class Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class _DisabledTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_DisabledTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_DISABLED_TIMER = _DisabledTimer()
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    with _metrics_lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Amadeus client (app.core.amadeus)
+AMADEUS_TOKEN_SECONDS = Histogram(
+    "amadeus_token_seconds",
+    "Time callers waited for an access token (served from memory unless refreshing).",
+)
+AMADEUS_TOKEN_REFRESHES = Counter(
+    "amadeus_token_refreshes_total",
+    "Access token requests sent to Amadeus.",
+    ("outcome",),
+)
+AMADEUS_SEARCH_SECONDS = Histogram(
+    "amadeus_search_seconds",
+    "flight_offers_search calls end to end, including cache lookups, waits and retries.",
+    ("cache",),
+)
+AMADEUS_WAIT_SECONDS = Histogram(
+    "amadeus_wait_seconds",
+    "Time an Amadeus call waited for a connection slot and the rate limiter.",
+)
+AMADEUS_REQUEST_SECONDS = Histogram(
+    "amadeus_request_seconds",
+    "Amadeus HTTP round trips, by response status.",
+    ("status",),
+)
+AMADEUS_RETRIES = Counter(
+    "amadeus_retries_total",
+    "Amadeus calls retried, by reason.",
+    ("reason",),
+)
+AMADEUS_DECODE_SECONDS = Histogram(
+    "amadeus_decode_seconds",
+    "Decoding flight-offers response bodies.",
+)
+
+# Offer extraction (app.api.flights.service)
+OFFER_EXTRACT_SECONDS = Histogram(
+    "offer_extract_seconds",
+    "Filtering and parsing one response's offers for one rule.",
+)
+OFFERS = Counter(
+    "offers_total",
+    "Offers seen in Amadeus responses, by whether a rule kept them.",
+    ("result",),
+)
+
+# Watch runs (app.api.watches)
+WATCH_RUN_SECONDS = Histogram(
+    "watch_run_seconds",
+    "Watch runs end to end; a batch runs many watches sharing Amadeus calls.",
+    ("kind",),
+)
+WATCH_RUN_STAGE_SECONDS = Histogram(
+    "watch_run_stage_seconds",
+    "Stages of watch runs; a batch's collect overlaps its fetch.",
+    ("stage",),
+)
+WATCHES_RUN = Counter(
+    "watches_run_total",
+    "Watches run, by outcome.",
+    ("outcome",),
+)
+WATCHED_RESULT_WRITE_SECONDS = Histogram(
+    "watched_result_write_seconds",
+    "Transactions writing watch results to watched_results.",
+)
+WATCHED_RESULTS_WRITTEN = Counter(
+    "watched_results_written_total",
+    "Watch results written to watched_results.",
+)
+
+# Scheduler (app.core.scheduler)
+SCHEDULER_LAG_SECONDS = Histogram(
+    "scheduler_lag_seconds",
+    "How late scheduled jobs started after their scheduled time.",
+    ("job",),
+)
+SCHEDULER_MISSED = Counter(
+    "scheduler_missed_runs_total",
+    "Scheduled job runs skipped because they were too late.",
+    ("job",),
+)
@@ -0,0 +1,378 @@
+import logging
+import sqlite3
+from typing import Callable, Optional
+
+from app.core.database import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def _baseline(cur: sqlite3.Cursor) -> None:
+    # Tables as they existed before migrations were tracked; IF NOT EXISTS
+    # so databases created by older versions adopt version 1 as-is
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS amadeus_token (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            access_token TEXT NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS flight_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rule_name TEXT NOT NULL,
+            included_airline_codes TEXT,
+            non_stop INTEGER,
+            max_allowed_stops INTEGER NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watched_searches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+            rule_id INTEGER NOT NULL,
+            origin TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            depart_date TEXT NOT NULL,
+            return_date TEXT,
+            flex_days INTEGER NOT NULL,
+            adults INTEGER NOT NULL,
+            travel_class TEXT NOT NULL,
+            currency TEXT NOT NULL,
+
+            enabled INTEGER NOT NULL DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (rule_id) REFERENCES flight_rules(id)
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watched_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+            watch_id INTEGER NOT NULL,
+
+            total_price REAL NOT NULL,
+            base_price REAL NOT NULL,
+            currency TEXT NOT NULL,
+
+            carrier TEXT NOT NULL,
+            fare_brand TEXT NOT NULL,
+
+            outbound_flight_numbers TEXT NOT NULL,
+            inbound_flight_numbers TEXT,
+
+            num_stops INTEGER NOT NULL,
+            stop_airports_outbound TEXT NOT NULL,
+            stop_airports_inbound TEXT,
+
+            outbound_depart_time TEXT NOT NULL,
+            outbound_arrive_time TEXT NOT NULL,
+            outbound_duration TEXT,
+
+            inbound_depart_time TEXT,
+            inbound_arrive_time TEXT,
+            inbound_duration TEXT,
+
+            checked_bags INTEGER NOT NULL,
+            cabin_bags INTEGER NOT NULL,
+            seats_left INTEGER NOT NULL,
+
+            captured_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (watch_id) REFERENCES watched_searches(id)
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS offer_cache (
+            cache_key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            stored_at REAL NOT NULL
+        )
+        """
+    )
+
+
+def _add_lookup_indexes(cur: sqlite3.Cursor) -> None:
+    # fetch_watched_results: WHERE watch_id = ? ORDER BY captured_at
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_watched_results_watch_captured
+        ON watched_results (watch_id, captured_at)
+        """
+    )
+    # run_all_watches_service: WHERE enabled = 1
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_watched_searches_enabled
+        ON watched_searches (enabled)
+        """
+    )
+    # ResponseCache purge: WHERE stored_at <= ?
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_offer_cache_stored_at
+        ON offer_cache (stored_at)
+        """
+    )
+
+
+def _add_offer_snapshots(cur: sqlite3.Cursor) -> None:
+    # Every qualifying offer of every watch run, kept compact: repeated
+    # strings live once in snapshot_strings, prices are integer cents and
+    # times are epoch seconds / minutes (see app.api.watches.snapshots)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_strings (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_runs (
+            id INTEGER PRIMARY KEY,
+            watch_id INTEGER NOT NULL,
+            captured_at INTEGER NOT NULL,
+            offer_count INTEGER NOT NULL,
+
+            FOREIGN KEY (watch_id) REFERENCES watched_searches(id)
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_snapshot_runs_watch_captured
+        ON snapshot_runs (watch_id, captured_at)
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_offers (
+            run_id INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+
+            rule_name_id INTEGER NOT NULL,
+            total_cents INTEGER NOT NULL,
+            base_cents INTEGER NOT NULL,
+            currency_id INTEGER NOT NULL,
+
+            carrier_id INTEGER NOT NULL,
+            fare_brand_id INTEGER NOT NULL,
+            outbound_flights_id INTEGER NOT NULL,
+            inbound_flights_id INTEGER,
+
+            num_stops INTEGER NOT NULL,
+            outbound_stops_id INTEGER NOT NULL,
+            inbound_stops_id INTEGER,
+
+            outbound_depart INTEGER NOT NULL,
+            outbound_arrive INTEGER NOT NULL,
+            outbound_minutes INTEGER,
+            inbound_depart INTEGER,
+            inbound_arrive INTEGER,
+            inbound_minutes INTEGER,
+
+            checked_bags INTEGER NOT NULL,
+            cabin_bags INTEGER NOT NULL,
+            seats_left INTEGER NOT NULL,
+
+            PRIMARY KEY (run_id, ordinal)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _add_result_runs(cur: sqlite3.Cursor) -> None:
+    # watched_results becomes run-length encoded: a row stands for every
+    # consecutive run from captured_at to last_seen_at that returned the
+    # same cheapest offer (see insert_watched_results)
+    cur.execute("ALTER TABLE watched_results ADD COLUMN fingerprint TEXT")
+    cur.execute("ALTER TABLE watched_results ADD COLUMN last_seen_at DATETIME")
+    cur.execute("ALTER TABLE watched_results ADD COLUMN seen_count INTEGER NOT NULL DEFAULT 1")
+    cur.execute("UPDATE watched_results SET last_seen_at = captured_at")
+
+
+def _add_watch_schedule(cur: sqlite3.Cursor) -> None:
+    # Adaptive scheduler state, one row per watch once it has been scheduled
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watch_schedule (
+            watch_id INTEGER PRIMARY KEY,
+            interval_seconds INTEGER NOT NULL,
+            next_run_at REAL NOT NULL,
+            last_run_at REAL,
+            FOREIGN KEY (watch_id) REFERENCES watched_searches(id) ON DELETE CASCADE
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_watch_schedule_next_run
+        ON watch_schedule (next_run_at)
+        """
+    )
+
+
+def _add_watch_jobs(cur: sqlite3.Cursor) -> None:
+    # Queue of watch runs for app.worker (see app.api.watches.jobs)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watch_jobs (
+            id INTEGER PRIMARY KEY,
+            watch_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            enqueued_at REAL NOT NULL,
+            available_at REAL NOT NULL,
+            leased_by TEXT,
+            lease_expires_at REAL,
+            finished_at REAL,
+            result_id INTEGER,
+            error TEXT,
+            FOREIGN KEY (watch_id) REFERENCES watched_searches(id) ON DELETE CASCADE
+        )
+        """
+    )
+    # At most one pending job per watch, so it can't be queued (and run) twice
+    cur.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_watch_jobs_pending_watch
+        ON watch_jobs (watch_id) WHERE status IN ('queued', 'leased')
+        """
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_watch_jobs_status_available
+        ON watch_jobs (status, available_at)
+        """
+    )
+
+
+def _add_leases(cur: sqlite3.Cursor) -> None:
+    # Advisory leases between processes, e.g. which uvicorn worker runs the
+    # scheduler (see app.core.leader)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            acquired_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """
+    )
+
+
+def _add_watch_runs(cur: sqlite3.Cursor) -> None:
+    # One summary row per watch run, single or batch, with its stage
+    # timings (see app.api.watches.runs)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watch_runs (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            process TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            elapsed_seconds REAL NOT NULL,
+            watches INTEGER NOT NULL,
+            ran INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            planned_calls INTEGER,
+            issued_calls INTEGER,
+            plan_seconds REAL,
+            fetch_seconds REAL,
+            collect_seconds REAL,
+            store_seconds REAL
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_watch_runs_started_at
+        ON watch_runs (started_at)
+        """
+    )
+
+
+# Append only: never edit or reorder a migration once it has shipped
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "baseline schema", _baseline),
+    (2, "lookup indexes for results and enabled watches", _add_lookup_indexes),
+    (3, "compact per-run offer snapshots", _add_offer_snapshots),
+    (4, "run-length encoded watched results", _add_result_runs),
+    (5, "adaptive watch schedule", _add_watch_schedule),
+    (6, "watch job queue", _add_watch_jobs),
+    (7, "leader leases", _add_leases),
+    (8, "watch run summaries", _add_watch_runs),
+]
+
+
+def current_version() -> int:
+    cur = get_connection().cursor()
+    cur.execute("SELECT MAX(version) FROM schema_version")
+    return cur.fetchone()[0] or 0
+
+
+def migrate(target: Optional[int] = None) -> int:
+    """
+    Applies pending migrations in order, up to `target` (default: all), and
+    returns the resulting schema version.
+
+    Each migration runs in its own IMMEDIATE transaction together with its
+    schema_version row, so a failure leaves the previous version intact and
+    concurrent processes starting up apply each migration only once.
+    """
+    conn = get_connection()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+    for version, description, apply in MIGRATIONS:
+        if target is not None and version > target:
+            break
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+            if cur.fetchone():
+                conn.rollback()
+                continue
+
+            apply(cur)
+            cur.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        logger.info("Applied schema migration %s: %s", version, description)
+
+    return current_version()
@@ -0,0 +1,305 @@
+import contextvars
+import cProfile
+import functools
+import glob
+import importlib.util
+import inspect
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import (
+    PROFILER,
+    PROFILE_DIR,
+    PROFILE_KEEP,
+    PROFILE_REQUESTS,
+    PROFILE_REQUEST_SAMPLE_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Saved profile per profiler: cProfile stats load with pstats or snakeviz,
+# pyinstrument's HTML opens in a browser
+EXTENSIONS = {
+    "cprofile": ".prof",
+    "pyinstrument": ".html",
+}
+
+# <started, UTC>-<kind>-<run id>, e.g. 20260801T120000Z-watch-run-42
+PROFILE_NAME = re.compile(r"^\d{8}T\d{6}Z-[a-z-]+-[A-Za-z0-9]+$")
+
+# Both profilers hook the interpreter, so one profile runs at a time per
+# process; an execution that would overlap it just runs unprofiled
+_active = threading.Lock()
+
+
+def installed(name: str) -> bool:
+    return name == "cprofile" or importlib.util.find_spec(name) is not None
+
+
+def resolve_profiler(name: str = PROFILER) -> str:
+    """
+    The profiler to use for `name`: "auto" prefers pyinstrument (sampling,
+    so cheaper on deep call stacks) when installed, else cProfile.
+    """
+    if name == "auto":
+        return "pyinstrument" if installed("pyinstrument") else "cprofile"
+    if name not in EXTENSIONS:
+        raise ValueError(f"Unknown profiler: {name}")
+    if not installed(name):
+        logger.warning("%s is not installed; profiling with cProfile", name)
+        return "cprofile"
+    return name
+
+
+profiler_name = resolve_profiler()
+
+
+def sampled(rate: float) -> bool:
+    return rate > 0 and random.random() < rate
+
+
+class Profile:
+    """
+    One profiled execution on the calling thread. Work the thread hands
+    off (Amadeus calls on the client's loop, write-behind flushes) shows
+    up as time spent waiting for it.
+    """
+
+    def __init__(self, kind: str, label: str, profiler: str = profiler_name):
+        self.kind = kind
+        self.label = label
+        self.profiler = profiler
+        self.started_at = time.time()
+        self.elapsed_seconds: Optional[float] = None
+        if profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self._profiler = Profiler(async_mode="disabled")
+        else:
+            self._profiler = cProfile.Profile()
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        if self.profiler == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.profiler == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        self.elapsed_seconds = time.perf_counter() - self._started
+
+    def save(self, run_id=None) -> str:
+        """
+        Writes the profile and its metadata to PROFILE_DIR and returns the
+        profile's name. Without a run id, one is made up.
+        """
+        run_id = run_id if run_id is not None else uuid.uuid4().hex[:12]
+        started = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(self.started_at))
+        name = f"{started}-{self.kind}-{run_id}"
+        filename = name + EXTENSIONS[self.profiler]
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self.profiler == "pyinstrument":
+            with open(os.path.join(PROFILE_DIR, filename), "w") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
+
+        with open(os.path.join(PROFILE_DIR, name + ".json"), "w") as f:
+            json.dump({
+                "name": name,
+                "kind": self.kind,
+                "run_id": str(run_id),
+                "label": self.label,
+                "profiler": self.profiler,
+                "file": filename,
+                "started_at": self.started_at,
+                "elapsed_seconds": self.elapsed_seconds,
+            }, f)
+        _prune()
+        return name
+
+    def finish(self, run_id=None) -> Optional[str]:
+        """
+        Stops the profile started by `start_profile` and saves it; a failure
+        to save is logged rather than failing the execution profiled.
+        """
+        try:
+            self.stop()
+        finally:
+            _active.release()
+        try:
+            return self.save(run_id)
+        except OSError:
+            logger.exception("Could not save the profile of %s", self.label)
+            return None
+
+
+def start_profile(kind: str, label: str) -> Optional[Profile]:
+    """
+    Starts profiling the calling thread, or returns None if another profile
+    is running. Every started profile must be finished.
+    """
+    if not _active.acquire(blocking=False):
+        logger.info("Not profiling %s: another profile is running", label)
+        return None
+    profile = Profile(kind, label)
+    profile.start()
+    return profile
+
+
+def _prune() -> None:
+    # Keep the PROFILE_KEEP most recent
+    for meta in list_profiles()[PROFILE_KEEP:]:
+        for filename in (meta["file"], meta["name"] + ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, filename))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> list[dict]:
+    """
+    Metadata of the stored profiles, most recent first.
+    """
+    profiles = []
+    for path in glob.glob(os.path.join(PROFILE_DIR, "*.json")):
+        try:
+            with open(path) as f:
+                meta = json.load(f)
+            meta["size_bytes"] = os.path.getsize(os.path.join(PROFILE_DIR, meta["file"]))
+        except (OSError, ValueError, KeyError):
+            # Pruned or half written meanwhile
+            continue
+        profiles.append(meta)
+    profiles.sort(key=lambda meta: meta["started_at"], reverse=True)
+    return profiles
+
+
+def get_profile(name: str) -> Optional[dict]:
+    """
+    A stored profile's metadata, with `path` to its file; None if there is
+    no such profile.
+    """
+    if not PROFILE_NAME.match(name):
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, name + ".json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = os.path.join(PROFILE_DIR, meta["file"])
+    if not os.path.exists(path):
+        return None
+    return {**meta, "path": path}
+
+
+def profile_stats_text(path: str, sort: str = "cumulative", limit: int = 50) -> str:
+    """
+    The top `limit` functions of a cProfile profile, as `python -m pstats`
+    would print them.
+    """
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# Set by ProfilingMiddleware for requests to profile: {"id", "label",
+# "name"}, `name` filled in once the profile is saved
+_request_profile: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+
+def profile_requested(scope: Scope) -> bool:
+    if PROFILE_REQUESTS:
+        if Headers(scope=scope).get("x-profile", "").lower() in ("1", "true"):
+            return True
+        if QueryParams(scope["query_string"]).get("profile", "").lower() in ("1", "true"):
+            return True
+    return sampled(PROFILE_REQUEST_SAMPLE_RATE)
+
+
+class ProfilingMiddleware:
+    """
+    Marks requests to profile: asked for with an `X-Profile: 1` header or
+    `?profile=1`, or sampled at PROFILE_REQUEST_SAMPLE_RATE. The profile
+    itself is taken by ProfiledRoute, and its name returned in the
+    response's X-Profile header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request = {
+            "id": uuid.uuid4().hex[:12],
+            "label": f"{scope['method']} {scope['path']}",
+            "name": None,
+        }
+
+        async def send_with_name(message: Message) -> None:
+            if message["type"] == "http.response.start" and request["name"]:
+                MutableHeaders(scope=message).append("X-Profile", request["name"])
+            await send(message)
+
+        token = _request_profile.set(request)
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            _request_profile.reset(token)
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    if inspect.iscoroutinefunction(endpoint):
+        # A profile can't follow one coroutine across the event loop
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def run(*args, **kwargs):
+        request = _request_profile.get()
+        profile = start_profile("request", request["label"]) if request else None
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            request["name"] = profile.finish(request["id"])
+
+    return run
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route that profiles its endpoint for requests ProfilingMiddleware
+    marked. The profile starts in the endpoint itself because sync
+    endpoints run on a threadpool thread, which a profiler started in the
+    middleware wouldn't see. A streamed response's body is produced after
+    the endpoint returns, so it isn't in the profile.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
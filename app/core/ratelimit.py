@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    `rate` tokens are added per second, up to `capacity`. Callers reserve a
+    token up front and sleep for the returned delay, so concurrent callers
+    are spaced out evenly instead of all waking at once.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes one token and returns how many seconds the caller must wait
+        before using it (0.0 if a token was available).
+        """
+        with self._lock:
+            return self._take()
+
+    def _take(self) -> float:
+        # Caller holds the lock
+        self._refill(time.monotonic())
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    def _refill(self, now: float) -> None:
+        # Caller holds the lock
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def succeeded(self) -> None:
+        """
+        Feedback that a call went through; a fixed rate ignores it.
+        """
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """
+        Feedback that a call was answered 429; a fixed rate ignores it.
+        """
+
+    def stats(self) -> dict:
+        return {"adaptive": False, "rate": self.rate}
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate finds the quota by itself (AIMD): it is
+    multiplied by `decrease` on a 429, at most once per `cooldown` seconds
+    so one burst of throttled in-flight calls only counts once. A
+    Retry-After pushes the whole schedule back until it has passed:
+    callers already waiting, and those arriving meanwhile, keep their
+    spacing behind its end rather than all calling at once when it ends.
+
+    Until the first 429 the rate roughly doubles every second, like TCP
+    slow start. Past that it only grows by `increase` calls/s per second,
+    since the quota is known to be close. `ceiling` is a moving average of
+    the rates at which 429s came back, i.e. the observed quota.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        min_rate: float = 0.5,
+        max_rate: float = 100.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+        history: int = 100,
+    ):
+        super().__init__(rate, capacity)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.ceiling: Optional[float] = None
+        self._paused_until = 0.0
+        # Seconds the schedule has been pushed back by pauses so far;
+        # waiting callers sleep off whatever was added while they slept
+        self._pushed_back = 0.0
+        self._last_decrease = 0.0
+        self._history: "deque[tuple[float, float, str]]" = deque(maxlen=history)
+
+        self.successes = 0
+        self.throttles = 0
+
+    def _reserve(self) -> tuple[float, float]:
+        with self._lock:
+            return self._take(), self._pushed_back
+
+    def _pushed_back_since(self, pushed_back: float) -> tuple[float, float]:
+        with self._lock:
+            return self._pushed_back - pushed_back, self._pushed_back
+
+    def acquire(self) -> None:
+        delay, pushed_back = self._reserve()
+        while delay > 0:
+            time.sleep(delay)
+            delay, pushed_back = self._pushed_back_since(pushed_back)
+
+    async def acquire_async(self) -> None:
+        delay, pushed_back = self._reserve()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay, pushed_back = self._pushed_back_since(pushed_back)
+
+    def _pause(self, until: float) -> None:
+        # Caller holds the lock. Only the part of the pause not already
+        # covered counts, so a burst of 429s doesn't stack up
+        now = time.monotonic()
+        extra = until - max(now, self._paused_until)
+        if extra <= 0:
+            return
+        self._paused_until = until
+        self._pushed_back += extra
+        self._refill(now)
+        self._tokens = min(self._tokens, 0.0) - extra * self.rate
+
+    def _set_rate(self, rate: float, event: Optional[str] = None) -> None:
+        # Caller holds the lock; tokens so far accrued at the old rate
+        self._refill(time.monotonic())
+        old_rate, self.rate = self.rate, min(max(rate, self.min_rate), self.max_rate)
+        if self._tokens < 0:
+            # Reservations already handed out keep their times; new ones
+            # queue behind the last of them at the new rate
+            self._tokens *= self.rate / old_rate
+        if event:
+            self._history.append((time.time(), round(self.rate, 3), event))
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.successes += 1
+            if self.rate >= self.max_rate:
+                return
+            if self.ceiling is None:
+                # No quota seen yet: roughly double every second
+                step = 0.7
+            else:
+                # Probe past the quota slowly: +increase per second's worth
+                # of calls
+                step = self.increase / self.rate
+            # The ramp is sampled into the history once a minute
+            quiet = not self._history or time.time() - self._history[-1][0] >= 60
+            self._set_rate(self.rate + step, "increased" if quiet else None)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            if retry_after:
+                self._pause(now + retry_after)
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.ceiling = self.rate if self.ceiling is None else 0.7 * self.ceiling + 0.3 * self.rate
+            self._set_rate(self.rate * self.decrease, "throttled")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "adaptive": True,
+                "rate": round(self.rate, 3),
+                "ceiling": round(self.ceiling, 3) if self.ceiling is not None else None,
+                "min_rate": self.min_rate,
+                "max_rate": self.max_rate,
+                "successes": self.successes,
+                "throttles": self.throttles,
+                "paused_for_seconds": round(max(self._paused_until - time.monotonic(), 0.0), 3),
+                "history": [
+                    {"at": at, "rate": rate, "event": event}
+                    for at, rate, event in self._history
+                ],
+            }
@@ -0,0 +1,27 @@
+import importlib.util
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+if importlib.util.find_spec("orjson") is not None:
+    import orjson
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for content that is already in its response model's
+    shape, e.g. offers from ParsedOffer or rows read back from our own
+    tables. Returning it skips FastAPI's response_model validation (the
+    route's response_model still documents it), and it's serialized with
+    orjson when installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,19 +1,98 @@
+from datetime import datetime
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from app.api.watches.service import run_all_watches_service
+from apscheduler.triggers.interval import IntervalTrigger
+from app.api.watches.service import (
+    run_all_watches_service,
+    run_due_watches_service,
+    run_slot_service,
+)
+from app.core.config import SCHEDULER_MODE, SCHEDULER_TICK_SECONDS, SCHEDULER_SLOTS
+from app.core.leader import LeaderLease, fetch_lease
+from app.core.metrics import SCHEDULER_LAG_SECONDS, SCHEDULER_MISSED
 import logging
 
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler(timezone="EST")
 
+# Every uvicorn worker starts the scheduler paused; only the process
+# holding this lease resumes it
+scheduler_lease = LeaderLease(
+    "scheduler",
+    on_acquire=lambda: scheduler.resume(),
+    on_release=lambda: scheduler.pause(),
+)
+
+def _observe_job(event):
+    # Lag of the most recent due run (earlier ones were coalesced into it)
+    if event.code == EVENT_JOB_MISSED:
+        SCHEDULER_MISSED.inc(job=event.job_id)
+        return
+    if event.code == EVENT_JOB_MAX_INSTANCES:
+        SCHEDULER_MISSED.inc(job=event.job_id)
+        logger.warning("Skipped a run of %s: its earlier runs are still going", event.job_id)
+        return
+    scheduled = event.scheduled_run_times[-1]
+    lag = (datetime.now(scheduled.tzinfo) - scheduled).total_seconds()
+    SCHEDULER_LAG_SECONDS.observe(max(lag, 0.0), job=event.job_id)
+
+scheduler.add_listener(_observe_job, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
 def start_scheduler():
-    scheduler.add_job(
-        func=run_all_watches_service,
-        trigger=CronTrigger(minute=0),  # every hour on the dot
-        id="run_all_watches_hourly",
-        replace_existing=True,
-        max_instances=1,
+    if SCHEDULER_MODE == "adaptive":
+        scheduler.add_job(
+            func=run_due_watches_service,
+            trigger=IntervalTrigger(seconds=SCHEDULER_TICK_SECONDS),
+            id="run_due_watches",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        description = f"adaptive, tick every {SCHEDULER_TICK_SECONDS}s"
+    elif SCHEDULER_MODE == "spread":
+        if 60 % SCHEDULER_SLOTS:
+            raise ValueError("SCHEDULER_SLOTS must divide 60")
+        scheduler.add_job(
+            func=run_slot_service,
+            trigger=CronTrigger(minute=f"*/{60 // SCHEDULER_SLOTS}"),
+            id="run_watch_slot",
+            replace_existing=True,
+            # A slot that overruns its window must not cost the next slot
+            # its run; the overrun shows in the slot's timing
+            max_instances=2,
+        )
+        description = f"spread over {SCHEDULER_SLOTS} slots an hour"
+    else:
+        scheduler.add_job(
+            func=run_all_watches_service,
+            trigger=CronTrigger(minute=0),  # every hour on the dot
+            id="run_all_watches_hourly",
+            replace_existing=True,
+            max_instances=1,
+        )
+        description = "hourly"
+
+    scheduler.start(paused=True)
+    scheduler_lease.start()
+    logger.info(
+        "Watch scheduler started (%s), %s",
+        description,
+        "leading" if scheduler_lease.is_leader else "standing by",
     )
-    scheduler.start()
-    logger.info("Watch scheduler started (hourly)")
+
+def stop_scheduler():
+    scheduler_lease.stop()
+    scheduler.shutdown()
+
+def scheduler_status() -> dict:
+    lease = fetch_lease(scheduler_lease.name) or {}
+    return {
+        "mode": SCHEDULER_MODE,
+        "leader": lease.get("holder"),
+        "leader_since": lease.get("acquired_at"),
+        "lease_expires_at": lease.get("expires_at"),
+        "this_process": scheduler_lease.holder,
+        "is_leader": scheduler_lease.is_leader,
+    }
@@ -0,0 +1,147 @@
+import bisect
+import hashlib
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Optional
+
+from app.core.config import (
+    SCHEDULER_MIN_INTERVAL_SECONDS,
+    SCHEDULER_MAX_INTERVAL_SECONDS,
+)
+
+# Base polling interval by days to departure, nearest first; fares move
+# most in the last weeks before a flight
+INTERVAL_TIERS = [
+    (3, 30 * 60),
+    (14, 60 * 60),
+    (45, 3 * 60 * 60),
+    (120, 6 * 60 * 60),
+]
+FAR_INTERVAL = 12 * 60 * 60
+
+# Share of runs in which the cheapest offer changed
+VOLATILE_CHANGE_RATE = 0.5
+STABLE_CHANGE_RATE = 0.1
+
+
+def polling_interval(days_to_departure: float, change_rate: Optional[float] = None) -> int:
+    """
+    Seconds between runs of one watch: a base interval from how close the
+    departure is, halved for volatile prices and doubled for stable ones.
+    `change_rate` is None while there isn't enough history to tell.
+    """
+    if days_to_departure < 0:
+        return SCHEDULER_MAX_INTERVAL_SECONDS
+
+    interval = next(
+        (seconds for days, seconds in INTERVAL_TIERS if days_to_departure <= days),
+        FAR_INTERVAL,
+    )
+    if change_rate is not None:
+        if change_rate >= VOLATILE_CHANGE_RATE:
+            interval /= 2
+        elif change_rate < STABLE_CHANGE_RATE:
+            interval *= 2
+
+    return int(min(max(interval, SCHEDULER_MIN_INTERVAL_SECONDS), SCHEDULER_MAX_INTERVAL_SECONDS))
+
+
+def phase_offset(watch_id: int, period: int) -> int:
+    """
+    Stable offset of a watch within `period` seconds, so watches sharing an
+    interval are spread across it rather than all due at once.
+    """
+    return zlib.crc32(str(watch_id).encode()) % max(period, 1)
+
+
+class HashRing:
+    """
+    Consistent hashing of watch ids onto `slots` slots. Each slot owns
+    `replicas` points on the ring, which keeps slots evenly loaded and means
+    changing the slot count only moves the watches whose arc changed owner.
+    """
+
+    def __init__(self, slots: int, replicas: int = 64):
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.slots = slots
+        points = sorted(
+            (self._hash(f"slot-{slot}-{replica}"), slot)
+            for slot in range(slots)
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._owners = [slot for _, slot in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def slot_for(self, watch_id: int) -> int:
+        i = bisect.bisect(self._keys, self._hash(f"watch-{watch_id}")) % len(self._keys)
+        return self._owners[i]
+
+
+class SlotTimings:
+    """
+    Thread-safe timing of the most recent and slowest run of each slot.
+    """
+
+    def __init__(self):
+        self._slots: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, slot: int, started_at: float, seconds: float, watches: int, calls: int, overran: bool) -> None:
+        with self._lock:
+            stats = self._slots.setdefault(slot, {
+                "runs": 0,
+                "overruns": 0,
+                "max_seconds": 0.0,
+                "total_seconds": 0.0,
+            })
+            stats["runs"] += 1
+            stats["overruns"] += int(overran)
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["total_seconds"] += seconds
+            stats.update(
+                last_started_at=started_at,
+                last_seconds=seconds,
+                last_watches=watches,
+                last_calls=calls,
+            )
+
+    def snapshot(self) -> dict[int, dict]:
+        with self._lock:
+            return {slot: dict(stats) for slot, stats in self._slots.items()}
+
+
+class CallBudget:
+    """
+    Thread-safe sliding-window count of API calls; `limit` per `window`
+    seconds, or unlimited when `limit` is 0.
+    """
+
+    def __init__(self, limit: int, window: float = 3600):
+        self.limit = limit
+        self.window = window
+        self._spent: "deque[tuple[float, int]]" = deque()
+        self._lock = threading.Lock()
+
+    def spent(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._spent and self._spent[0][0] <= now - self.window:
+                self._spent.popleft()
+            return sum(calls for _, calls in self._spent)
+
+    def remaining(self, now: Optional[float] = None) -> Optional[int]:
+        if not self.limit:
+            return None
+        return max(self.limit - self.spent(now), 0)
+
+    def spend(self, calls: int, now: Optional[float] = None) -> None:
+        if calls > 0:
+            with self._lock:
+                self._spent.append((time.time() if now is None else now, calls))
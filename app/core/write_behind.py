@@ -0,0 +1,130 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from app.core.config import WRITE_BEHIND_MAX_BATCH
+
+logger = logging.getLogger(__name__)
+
+_queues: list["WriteBehindQueue"] = []
+_queues_lock = threading.Lock()
+
+
+class WriteBehindQueue:
+    """
+    Hands writes to a background thread that flushes whatever has queued up
+    in one call to `flush(items) -> results` (one transaction), so callers
+    don't wait on disk. Each submitted item gets a Future for its result.
+    """
+
+    def __init__(self, flush: Callable[[list], list], name: str, max_batch: int = WRITE_BEHIND_MAX_BATCH):
+        self._flush = flush
+        self.name = name
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[tuple[list, list[Future]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+
+        with _queues_lock:
+            _queues.append(self)
+
+    def submit(self, item: Any) -> Future:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: list) -> list[Future]:
+        """
+        Queues `items` together; they are always flushed in the same batch.
+        """
+        futures = [Future() for _ in items]
+        if items:
+            self._ensure_thread()
+            self._queue.put((list(items), futures))
+        return futures
+
+    def join(self) -> None:
+        """
+        Blocks until everything queued so far has been flushed.
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+        }
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"write-behind-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                self._queue.task_done()
+                return
+
+            # Coalesce everything already waiting, without splitting a
+            # submit_many() group
+            entries = [entry]
+            size = len(entry[0])
+            stop = False
+            while size < self.max_batch:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                entries.append(entry)
+                size += len(entry[0])
+
+            items = [item for batch, _ in entries for item in batch]
+            futures = [f for _, batch_futures in entries for f in batch_futures]
+            try:
+                results = self._flush(items)
+            except Exception as e:
+                logger.exception("Write-behind flush of %d %s item(s) failed", len(items), self.name)
+                for f in futures:
+                    f.set_exception(e)
+            else:
+                self.batches += 1
+                self.items += len(items)
+                for f, result in zip(futures, results):
+                    f.set_result(result)
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+            if stop:
+                self._queue.task_done()
+                return
+
+
+def close_write_behind() -> None:
+    """
+    Flushes and stops every write-behind thread; call before
+    close_connections() at shutdown.
+    """
+    with _queues_lock:
+        queues = list(_queues)
+    for q in queues:
+        q.close()
@@ -5,8 +5,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.flights.router import router as flights_router
 from app.api.rules.router import router as rules_router
 from app.api.watches.router import router as watches_router
+from app.api.metrics.router import router as metrics_router
+from app.api.profiles.router import router as profiles_router
 
-from app.core.scheduler import start_scheduler, scheduler
+from app.core.scheduler import start_scheduler, stop_scheduler
+from app.core.amadeus import close_client
+from app.core.database import init_db, close_connections
+from app.core.write_behind import close_write_behind
+from app.core.compression import CompressionMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.config import RESPONSE_COMPRESSION
 
 import logging
 
@@ -18,10 +26,14 @@ logging.basicConfig(
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- startup ---
+    init_db()
     start_scheduler()
     yield
     # --- shutdown ---
-    scheduler.shutdown()
+    stop_scheduler()
+    close_client()
+    close_write_behind()
+    close_connections()
 
 app = FastAPI(title="Flights Watcher API", lifespan=lifespan)
 
@@ -37,6 +49,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+app.add_middleware(ProfilingMiddleware)
+
 app.include_router(flights_router)
 app.include_router(rules_router)
 app.include_router(watches_router)
+app.include_router(metrics_router)
+app.include_router(profiles_router)
@@ -0,0 +1,159 @@
+"""
+Watch job worker: runs the watch runs the API process queues in the
+watch_jobs table (WATCH_EXECUTION=queue), so they don't compete with
+request handling. Any number of workers can share the queue; each job is
+leased to one of them, and jobs of a worker that dies are requeued once
+their lease expires.
+
+Usage:
+  python -m app.worker --threads 4
+  python -m app.worker --processes 2 --threads 2
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from app.core.config import JOB_LEASE_SECONDS, WORKER_BATCH_SIZE, WORKER_POLL_SECONDS
+from app.core.amadeus import close_client
+from app.core.database import init_db, close_connections
+from app.core.write_behind import close_write_behind
+from app.api.watches.jobs import (
+    claim_jobs,
+    renew_leases,
+    complete_job,
+    fail_job,
+    recover_expired_leases,
+)
+from app.api.watches.service import run_watches_service
+
+logger = logging.getLogger("app.worker")
+
+
+def run_jobs(worker_id: str, jobs: list) -> None:
+    """
+    Runs a batch of claimed jobs together (sharing Amadeus queries across
+    watches), renewing their leases until it finishes.
+    """
+    job_ids = [job["id"] for job in jobs]
+    finished = threading.Event()
+
+    def heartbeat():
+        while not finished.wait(JOB_LEASE_SECONDS / 3):
+            renew_leases(worker_id, job_ids)
+
+    beat = threading.Thread(target=heartbeat, name=f"{worker_id}-heartbeat", daemon=True)
+    beat.start()
+    try:
+        result = run_watches_service([job["watch_id"] for job in jobs])
+    except Exception as e:
+        logger.exception("%s: batch of %d jobs failed", worker_id, len(jobs))
+        result = {"results": [], "failures": [{"watch_id": job["watch_id"], "error": str(e)} for job in jobs]}
+    finally:
+        finished.set()
+        beat.join()
+
+    result_ids = {r["watch_id"]: r["result_id"] for r in result["results"]}
+    errors = {f["watch_id"]: f["error"] for f in result["failures"]}
+    for job in jobs:
+        if job["watch_id"] in errors:
+            kept = fail_job(job["id"], worker_id, errors[job["watch_id"]])
+        else:
+            # Watches disabled or deleted since they were queued just finish
+            kept = complete_job(job["id"], worker_id, result_ids.get(job["watch_id"]))
+        if not kept:
+            logger.warning("%s: lost the lease on job %d before finishing it", worker_id, job["id"])
+
+
+def work(worker_id: str, stop: threading.Event, batch_size: int) -> None:
+    logger.info("%s: started", worker_id)
+    while not stop.is_set():
+        try:
+            recover_expired_leases()
+            jobs = claim_jobs(worker_id, batch_size)
+        except Exception:
+            logger.exception("%s: could not claim jobs", worker_id)
+            jobs = []
+
+        if not jobs:
+            stop.wait(WORKER_POLL_SECONDS)
+            continue
+        run_jobs(worker_id, jobs)
+    logger.info("%s: stopped", worker_id)
+
+
+def serve(threads: int, batch_size: int) -> None:
+    """
+    Runs `threads` workers in this process until SIGINT/SIGTERM, letting
+    each finish its current batch.
+    """
+    init_db()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    workers = [
+        threading.Thread(target=work, args=(f"{prefix}:{n}", stop, batch_size), name=f"worker-{n}")
+        for n in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=1)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    finally:
+        close_write_behind()
+        close_client()
+        close_connections()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=1, help="worker threads per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=WORKER_BATCH_SIZE, help="jobs claimed at a time")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:\t%(message)s")
+
+    if args.processes == 1:
+        serve(args.threads, args.batch_size)
+        return
+
+    processes = [
+        multiprocessing.Process(target=serve, args=(args.threads, args.batch_size), name=f"worker-process-{n}")
+        for n in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # SIGTERM lets each process finish its current batches
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+
+def _interrupt(*_) -> None:
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Latency of the GET /watches query (fetch_watches) with and without the
+shared connection layer, while a writer thread inserts watched_results the
+way the hourly scheduler does.
+
+  legacy:  new connection per call, rollback journal
+  shared:  per-thread connection, WAL and tuned pragmas
+
+Usage:
+  python bench/bench_db.py --watches 200 --reads 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WATCHES_SQL = """
+    SELECT
+        w.id, w.rule_id, r.rule_name, w.origin, w.destination, w.depart_date,
+        w.return_date, w.flex_days, w.adults, w.travel_class, w.currency,
+        w.enabled, w.created_at
+    FROM watched_searches w
+    JOIN flight_rules r ON r.id = w.rule_id
+    ORDER BY w.id DESC
+"""
+
+RESULT_SQL = """
+    INSERT INTO watched_results (
+        watch_id, total_price, base_price, currency, carrier, fare_brand,
+        outbound_flight_numbers, num_stops, stop_airports_outbound,
+        outbound_depart_time, outbound_arrive_time, checked_bags, cabin_bags,
+        seats_left
+    ) VALUES (?, 1234.5, 1000.0, 'CAD', 'AC', 'FLEX', '["AC890"]', 0, '[]',
+              '2026-08-10T17:00:00', '2026-08-11T08:00:00', 1, 1, 4)
+"""
+
+
+def legacy_fetch_watches(path: str) -> list:
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(WATCHES_SQL).fetchall()
+    conn.close()
+    return rows
+
+
+def legacy_writer(path: str, stop: threading.Event, n_watches: int, interval: float) -> None:
+    i = 0
+    while not stop.wait(interval):
+        conn = sqlite3.connect(path)
+        conn.execute(RESULT_SQL, (i % n_watches + 1,))
+        conn.commit()
+        conn.close()
+        i += 1
+
+
+def shared_writer(stop: threading.Event, n_watches: int, interval: float) -> None:
+    from app.core.database import transaction
+
+    i = 0
+    while not stop.wait(interval):
+        with transaction() as cur:
+            cur.execute(RESULT_SQL, (i % n_watches + 1,))
+        i += 1
+
+
+def measure(fetch, reads: int, writer) -> dict:
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(stop,), daemon=True)
+    thread.start()
+    timings = []
+    errors = 0
+    for _ in range(reads):
+        started = time.perf_counter()
+        try:
+            fetch()
+        except sqlite3.OperationalError:
+            errors += 1
+        timings.append((time.perf_counter() - started) * 1000)
+    stop.set()
+    thread.join()
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "max_ms": timings[-1],
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--watches", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--write-interval", type=float, default=0.002, help="seconds between result inserts")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="flightwatch-bench-"))
+
+    from app.core.database import init_db, transaction
+    from app.api.watches.helpers import fetch_watches
+
+    init_db()
+    with transaction() as cur:
+        cur.execute(
+            "INSERT INTO flight_rules (rule_name, included_airline_codes, max_allowed_stops) VALUES ('AC', 'AC', 1)"
+        )
+        for _ in range(args.watches):
+            cur.execute(
+                """
+                INSERT INTO watched_searches (rule_id, origin, destination, depart_date, return_date,
+                                              flex_days, adults, travel_class, currency)
+                VALUES (1, 'YYZ', 'SUF', '2026-08-10', '2026-08-24', 3, 2, 'ECONOMY', 'CAD')
+                """
+            )
+
+    # Same data in a rollback-journal database for the legacy path
+    legacy = sqlite3.connect("legacy.db")
+    sqlite3.connect("flights.db").backup(legacy)
+    legacy.execute("PRAGMA journal_mode = DELETE")
+    legacy.close()
+
+    results = {
+        "legacy": measure(
+            lambda: legacy_fetch_watches("legacy.db"),
+            args.reads,
+            lambda stop: legacy_writer("legacy.db", stop, args.watches, args.write_interval),
+        ),
+        "shared": measure(
+            fetch_watches,
+            args.reads,
+            lambda stop: shared_writer(stop, args.watches, args.write_interval),
+        ),
+    }
+
+    print(f"{'':8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:8} {r['p50_ms']:8.3f} {r['p95_ms']:8.3f} {r['max_ms']:8.3f} {r['errors']:7}")
+
+
+if __name__ == "__main__":
+    main()
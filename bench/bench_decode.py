@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Decode time and peak memory of flight-offers responses under each
+installed backend of app.core.decoding (msgspec decodes only the fields
+the offer parser reads; orjson and json decode everything). Checks every
+backend yields the same filtered offers as json.
+
+Payloads are read from --recorded (a directory of Amadeus JSON response
+bodies, one per file) or generated by the stub.
+
+Usage:
+  python bench/bench_decode.py --responses 500
+  python bench/bench_decode.py --recorded recordings/
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RULES = [
+    {"rule_name": "AC direct", "included_airline_codes": "AC", "non_stop": 1, "max_allowed_stops": 0},
+    {"rule_name": "Any", "included_airline_codes": None, "non_stop": 0, "max_allowed_stops": 2},
+]
+
+
+def recorded_payloads(path: str) -> list[bytes]:
+    payloads = []
+    for name in sorted(glob.glob(os.path.join(path, "*.json"))):
+        with open(name, "rb") as f:
+            payloads.append(f.read())
+    return payloads
+
+
+def stub_payloads(count: int) -> list[bytes]:
+    from stub_amadeus import make_offers
+
+    depart = date(2026, 8, 10)
+    payloads = []
+    for i in range(count):
+        shift = timedelta(days=i % 60)
+        params = {
+            "originLocationCode": "YYZ",
+            "destinationLocationCode": "SUF",
+            "departureDate": (depart + shift).isoformat(),
+            "returnDate": (depart + shift + timedelta(days=14)).isoformat(),
+            "adults": str(1 + i % 3),
+            "currencyCode": "CAD",
+            "max": "50",
+            "run": str(i),
+        }
+        payloads.append(json.dumps(make_offers(params)).encode())
+    return payloads
+
+
+def decode_seconds(decode, payloads: list[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for payload in payloads:
+            decode(payload)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def peak_bytes(decode, payloads: list[bytes]) -> tuple[int, int]:
+    # (peak while decoding one payload, size of all decoded payloads kept
+    # alive, as the offer cache keeps them)
+    gc.collect()
+    tracemalloc.start()
+    decode(payloads[0])
+    _, one = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = [decode(payload) for payload in payloads]
+    retained = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del kept
+    return one, retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recorded", help="directory of recorded Amadeus responses (*.json)")
+    parser.add_argument("--responses", type=int, default=500, help="stub responses to generate without --recorded")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.core.decoding import DECODERS, installed
+    from app.api.flights.service import _filter_offers
+
+    payloads = recorded_payloads(args.recorded) if args.recorded else stub_payloads(args.responses)
+    if not payloads:
+        sys.exit("no payloads to decode")
+
+    backends = {name: make() for name, make in reversed(DECODERS.items()) if installed(name)}
+
+    expected = [[_filter_offers(json.loads(p), rule) for rule in RULES] for p in payloads]
+    # Keep the expected offers out of the collector's way while timing
+    gc.collect()
+    gc.freeze()
+    total = sum(len(p) for p in payloads)
+    print(f"{len(payloads):,} payloads, {total / len(payloads) / 1024:,.0f} KiB each on average")
+    print(f"{'decoder':8} {'ms/payload':>11} {'MB/s':>8} {'peak KiB':>9} {'kept KiB':>9} {'same offers':>12}")
+
+    baseline = None
+    for name, decode in backends.items():
+        seconds = decode_seconds(decode, payloads, args.repeat)
+        one, retained = peak_bytes(decode, payloads)
+        same = all(
+            [_filter_offers(decode(p), rule) for rule in RULES] == offers
+            for p, offers in zip(payloads, expected)
+        )
+        baseline = baseline or seconds
+        print(
+            f"{name:8} {seconds / len(payloads) * 1000:11.3f} {total / seconds / 1e6:8.1f}"
+            f" {one / 1024:9,.0f} {retained / len(payloads) / 1024:9,.0f} {str(same):>12}"
+            f"  ({baseline / seconds:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Query times for the watch history lookups before and after the index
+migration, on a year of hourly results for 200 watches (~1.75M rows).
+
+Usage:
+  python bench/bench_indexes.py --watches 200 --days 365
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed(cur, watches: int, days: int) -> int:
+    cur.execute(
+        "INSERT INTO flight_rules (rule_name, included_airline_codes, max_allowed_stops) VALUES ('AC', 'AC', 1)"
+    )
+    for i in range(watches):
+        cur.execute(
+            """
+            INSERT INTO watched_searches (rule_id, origin, destination, depart_date, return_date,
+                                          flex_days, adults, travel_class, currency, enabled)
+            VALUES (1, 'YYZ', 'SUF', '2026-08-10', '2026-08-24', 3, 2, 'ECONOMY', 'CAD', ?)
+            """,
+            (1 if i % 4 else 0,),
+        )
+
+    start = datetime(2025, 8, 1)
+    rng = random.Random(1)
+    rows = 0
+    # Hour by hour across all watches, as the scheduler would have written
+    for hour in range(days * 24):
+        captured_at = (start + timedelta(hours=hour)).strftime("%Y-%m-%d %H:%M:%S")
+        cur.executemany(
+            """
+            INSERT INTO watched_results (
+                watch_id, total_price, base_price, currency, carrier, fare_brand,
+                outbound_flight_numbers, num_stops, stop_airports_outbound,
+                outbound_depart_time, outbound_arrive_time, checked_bags, cabin_bags,
+                seats_left, captured_at
+            ) VALUES (?, ?, ?, 'CAD', 'AC', 'FLEX', '["AC890"]', 0, '[]',
+                      '2026-08-10T17:00:00', '2026-08-11T08:00:00', 1, 1, 4, ?)
+            """,
+            [
+                (w, price, price * 0.85, captured_at)
+                for w in range(1, watches + 1)
+                for price in (round(rng.uniform(900, 1900), 2),)
+            ],
+        )
+        rows += watches
+    return rows
+
+
+def timed(cur, sql: str, params: tuple = (), repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+QUERIES = {
+    "fetch_watched_results": (
+        """
+        SELECT wr.*, ws.adults
+        FROM watched_results wr
+        JOIN watched_searches ws ON ws.id = wr.watch_id
+        WHERE wr.watch_id = ?
+        ORDER BY wr.captured_at DESC
+        """,
+        (117,),
+    ),
+    "latest result per watch": (
+        """
+        SELECT * FROM watched_results
+        WHERE watch_id = ?
+        ORDER BY captured_at DESC
+        LIMIT 1
+        """,
+        (117,),
+    ),
+    "enabled watches": (
+        "SELECT id FROM watched_searches WHERE enabled = 1",
+        (),
+    ),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--watches", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="flightwatch-bench-"))
+
+    from app.core.database import get_connection, transaction
+    from app.core.migrations import migrate
+
+    migrate(target=1)
+    started = time.perf_counter()
+    with transaction() as cur:
+        rows = seed(cur, args.watches, args.days)
+    print(f"seeded {rows:,} results in {time.perf_counter() - started:.1f} s")
+
+    cur = get_connection().cursor()
+    before = {name: timed(cur, sql, params) for name, (sql, params) in QUERIES.items()}
+
+    started = time.perf_counter()
+    version = migrate()
+    print(f"migrated to version {version} in {time.perf_counter() - started:.1f} s")
+    after = {name: timed(cur, sql, params) for name, (sql, params) in QUERIES.items()}
+
+    print(f"{'query':28} {'before ms':>10} {'after ms':>10}")
+    for name in QUERIES:
+        print(f"{name:28} {before[name]:10.2f} {after[name]:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Overhead of app.core.metrics: the cost of one timed block and one counter
+increment with metrics on and off, then offer extraction (_filter_offers,
+timed and counted on every call) over stub responses both ways.
+
+Metrics are switched by flipping app.core.metrics.METRICS_ENABLED, as
+METRICS_ENABLED=0 in the environment would at startup. For whole watch
+runs, compare two run_suite.py runs:
+
+  METRICS_ENABLED=0 python bench/run_suite.py --out /tmp/off.json
+  METRICS_ENABLED=1 python bench/run_suite.py --out /tmp/on.json
+  python bench/run_suite.py --compare /tmp/off.json /tmp/on.json
+
+Usage:
+  python bench/bench_metrics.py --responses 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RULES = [
+    {"rule_name": "AC direct", "included_airline_codes": "AC", "non_stop": 1, "max_allowed_stops": 0},
+    {"rule_name": "Any", "included_airline_codes": None, "non_stop": 0, "max_allowed_stops": 2},
+]
+
+
+def stub_responses(count: int) -> list[dict]:
+    from stub_amadeus import make_offers
+
+    depart = date(2026, 8, 10)
+    return [
+        json.loads(json.dumps(make_offers({
+            "originLocationCode": "YYZ",
+            "destinationLocationCode": "SUF",
+            "departureDate": (depart + timedelta(days=i % 60)).isoformat(),
+            "returnDate": (depart + timedelta(days=i % 60 + 14)).isoformat(),
+            "adults": str(1 + i % 3),
+            "currencyCode": "CAD",
+            "max": "50",
+        })))
+        for i in range(count)
+    ]
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--responses", type=int, default=200)
+    parser.add_argument("--loops", type=int, default=200_000, help="timed blocks per micro benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.core import metrics
+    from app.api.flights.service import _filter_offers
+
+    histogram = metrics.Histogram("bench_seconds", "Benchmark timer.", ("case",))
+    counter = metrics.Counter("bench_total", "Benchmark counter.", ("case",))
+
+    def timed_blocks():
+        for _ in range(args.loops):
+            with histogram.time(case="bench"):
+                pass
+
+    def increments():
+        for _ in range(args.loops):
+            counter.inc(case="bench")
+
+    def empty_blocks():
+        for _ in range(args.loops):
+            pass
+
+    baseline = best_of(args.repeat, empty_blocks)
+    print(f"{'':16} {'metrics on':>12} {'metrics off':>12}")
+    for name, fn in (("timed block", timed_blocks), ("counter inc", increments)):
+        costs = []
+        for enabled in (True, False):
+            metrics.METRICS_ENABLED = enabled
+            costs.append((best_of(args.repeat, fn) - baseline) / args.loops * 1e9)
+        print(f"{name:16} {costs[0]:9.0f} ns {costs[1]:9.0f} ns")
+
+    responses = stub_responses(args.responses)
+    offers = sum(len(r["data"]) for r in responses)
+
+    def extract():
+        for data in responses:
+            for rule in RULES:
+                _filter_offers(data, rule)
+
+    seconds = {}
+    for enabled in (False, True):
+        metrics.METRICS_ENABLED = enabled
+        seconds[enabled] = best_of(args.repeat, extract)
+    calls = len(responses) * len(RULES)
+    print(
+        f"\n_filter_offers, {calls:,} calls over {offers:,} offers:"
+        f"\n  metrics off: {seconds[False] * 1000:8.2f} ms ({seconds[False] / calls * 1e6:.1f} us/call)"
+        f"\n  metrics on:  {seconds[True] * 1000:8.2f} ms ({seconds[True] / calls * 1e6:.1f} us/call)"
+        f"  {(seconds[True] - seconds[False]) / seconds[False] * 100:+.1f}%"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Throughput of the offer parser: runs a few thousand Amadeus responses
+through the old per-field helpers (each re-walking itineraries, segments
+and travelerPricings) and the single-pass ParsedOffer, under several
+rules, and checks both produce the same offers.
+
+Responses are read from --recorded (a directory of Amadeus JSON response
+bodies, one per file) or generated by the stub.
+
+Usage:
+  python bench/bench_parse.py --responses 3000
+  python bench/bench_parse.py --recorded recordings/
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RULES = [
+    {"rule_name": "AC direct", "included_airline_codes": "AC", "non_stop": 1, "max_allowed_stops": 0},
+    {"rule_name": "Star", "included_airline_codes": "AC,LH,UA", "non_stop": 0, "max_allowed_stops": 1},
+    {"rule_name": "Any", "included_airline_codes": None, "non_stop": 0, "max_allowed_stops": 2},
+]
+
+
+# The helpers as they were before the single-pass parser
+
+def extract_flight_numbers(offer):
+    itineraries = offer.get("itineraries", [])
+
+    def extract(itinerary):
+        nums = []
+        for segment in itinerary.get("segments", []):
+            carrier = segment.get("carrierCode")
+            number = segment.get("number")
+            if carrier and number:
+                nums.append(f"{carrier}{number}")
+        return nums
+
+    outbound = extract(itineraries[0]) if len(itineraries) >= 1 else []
+    inbound = extract(itineraries[1]) if len(itineraries) >= 2 else None
+    return outbound, inbound
+
+
+def count_stops(offer):
+    max_stops = 0
+    for it in offer.get("itineraries", []):
+        max_stops = max(max_stops, len(it.get("segments", [])) - 1)
+    return max_stops
+
+
+def extract_stops_by_itinerary(offer):
+    itineraries = offer.get("itineraries", [])
+
+    def stops_for_itinerary(itinerary):
+        segments = itinerary.get("segments", [])
+        return [
+            seg["arrival"]["iataCode"]
+            for seg in segments[:-1]
+            if "arrival" in seg and "iataCode" in seg["arrival"]
+        ]
+
+    return {
+        "stop_airports_outbound": stops_for_itinerary(itineraries[0]) if len(itineraries) >= 1 else [],
+        "stop_airports_inbound": stops_for_itinerary(itineraries[1]) if len(itineraries) >= 2 else None,
+    }
+
+
+def get_total_duration(offer):
+    return offer["itineraries"][0]["duration"]
+
+
+def extract_itinerary_times(offer):
+    itineraries = offer.get("itineraries", [])
+
+    def block(itinerary):
+        segments = itinerary.get("segments", [])
+        if not segments:
+            return None
+        return {
+            "depart_time": segments[0]["departure"]["at"],
+            "arrive_time": segments[-1]["arrival"]["at"],
+            "duration": itinerary.get("duration"),
+        }
+
+    return {
+        "outbound": block(itineraries[0]) if len(itineraries) >= 1 else None,
+        "inbound": block(itineraries[1]) if len(itineraries) >= 2 else None,
+    }
+
+
+def get_baggage_info(offer):
+    fares = offer.get("travelerPricings", [{}])[0].get("fareDetailsBySegment", [])
+    if not fares:
+        return 0, 0
+    return (
+        fares[0].get("includedCheckedBags", {}).get("quantity", 0),
+        fares[0].get("includedCabinBags", {}).get("quantity", 0),
+    )
+
+
+def get_fare_brand(offer):
+    fares = offer.get("travelerPricings", [{}])[0].get("fareDetailsBySegment", [])
+    return fares[0].get("brandedFareLabel", "UNKNOWN") if fares else "UNKNOWN"
+
+
+def legacy_filter_offers(data, rule):
+    from app.utils.formatting import parse_valid_carriers
+
+    valid_carriers = parse_valid_carriers(rule["included_airline_codes"])
+    results = []
+    for offer in data.get("data", []):
+        carrier = offer["validatingAirlineCodes"][0]
+        num_stops = count_stops(offer)
+        if valid_carriers and carrier not in valid_carriers:
+            continue
+        if num_stops > rule["max_allowed_stops"]:
+            continue
+        if rule["non_stop"] == 1 and num_stops > 0:
+            continue
+
+        outbound_flight_numbers, inbound_flight_numbers = extract_flight_numbers(offer)
+        stops = extract_stops_by_itinerary(offer)
+        timing = extract_itinerary_times(offer)
+        checked_bags, cabin_bags = get_baggage_info(offer)
+        results.append({
+            "rule_name": rule["rule_name"],
+            "total_price": float(offer["price"]["total"]),
+            "base_price": float(offer["price"]["base"]),
+            "currency": offer["price"]["currency"],
+            "carrier": carrier,
+            "outbound_flight_numbers": outbound_flight_numbers,
+            "inbound_flight_numbers": inbound_flight_numbers,
+            "fare_brand": get_fare_brand(offer),
+            "num_stops": num_stops,
+            "total_duration": get_total_duration(offer),
+            "stop_airports_outbound": stops["stop_airports_outbound"],
+            "stop_airports_inbound": stops["stop_airports_inbound"],
+            "outbound": timing["outbound"],
+            "inbound": timing["inbound"],
+            "checked_bags": checked_bags,
+            "cabin_bags": cabin_bags,
+            "seats_left": offer.get("numberOfBookableSeats", 0),
+        })
+    return results
+
+
+def recorded_responses(path: str) -> list[dict]:
+    responses = []
+    for name in sorted(glob.glob(os.path.join(path, "*.json"))):
+        with open(name) as f:
+            responses.append(json.load(f))
+    return responses
+
+
+def stub_responses(count: int) -> list[dict]:
+    from stub_amadeus import make_offers
+
+    depart = date(2026, 8, 10)
+    responses = []
+    for i in range(count):
+        shift = timedelta(days=i % 60)
+        params = {
+            "originLocationCode": "YYZ",
+            "destinationLocationCode": "SUF",
+            "departureDate": (depart + shift).isoformat(),
+            "adults": str(1 + i % 3),
+            "currencyCode": "CAD",
+            "max": "50",
+            "run": str(i),
+        }
+        if i % 4:
+            params["returnDate"] = (depart + shift + timedelta(days=14)).isoformat()
+        responses.append(make_offers(params))
+    return responses
+
+
+def measure(filter_offers, responses: list[dict], repeat: int) -> float:
+    # Offers are dropped as they're made, as a search drops each response
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for data in responses:
+            for rule in RULES:
+                filter_offers(data, rule)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recorded", help="directory of recorded Amadeus responses (*.json)")
+    parser.add_argument("--responses", type=int, default=3000, help="stub responses to generate without --recorded")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.api.flights.service import _filter_offers
+
+    responses = recorded_responses(args.recorded) if args.recorded else stub_responses(args.responses)
+    if not responses:
+        sys.exit("no responses to parse")
+    raw = sum(len(data.get("data", [])) for data in responses)
+    # Keep the loaded corpus out of the collector's way; a live process
+    # only holds one response at a time
+    gc.collect()
+    gc.freeze()
+
+    old_seconds = measure(legacy_filter_offers, responses, args.repeat)
+    new_seconds = measure(_filter_offers, responses, args.repeat)
+    kept = identical = 0
+    for data in responses:
+        for rule in RULES:
+            offers = _filter_offers(data, rule)
+            kept += len(offers)
+            identical += offers == legacy_filter_offers(data, rule)
+
+    print(f"{len(responses):,} responses, {raw:,} offers x {len(RULES)} rules, {kept:,} kept")
+    print(f"per-field:    {old_seconds:8.3f} s  {raw * len(RULES) / old_seconds:12,.0f} offers/s")
+    print(
+        f"single-pass:  {new_seconds:8.3f} s  {raw * len(RULES) / new_seconds:12,.0f} offers/s"
+        f"  ({old_seconds / new_seconds:.2f}x)"
+    )
+    print(f"identical:    {identical == len(responses) * len(RULES)}")
+
+
+if __name__ == "__main__":
+    main()
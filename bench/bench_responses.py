@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Serialization time and wire size of the two largest API responses: a
+2,000-offer /flights/search and a 10,000-row /watches/{id}/results.
+
+Compares the response_model path (pydantic models built in the service,
+validated again and serialized by FastAPI) with FastJSONResponse (plain
+dicts straight to JSON), then gzip and Brotli sizes of the body. Finishes
+with a request through the app to check the Content-Encoding negotiation.
+
+Usage:
+  python bench/bench_responses.py --offers 2000 --results 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RULE = {"rule_name": "Any", "included_airline_codes": None, "non_stop": 0, "max_allowed_stops": 2}
+
+
+def search_offers(count: int) -> list[dict]:
+    from app.api.flights.service import _filter_offers
+    from stub_amadeus import make_offers
+
+    depart = date(2026, 8, 10)
+    offers: list[dict] = []
+    shift = 0
+    while len(offers) < count:
+        params = {
+            "originLocationCode": "YYZ",
+            "destinationLocationCode": "SUF",
+            "departureDate": (depart + timedelta(days=shift)).isoformat(),
+            "returnDate": (depart + timedelta(days=shift + 14)).isoformat(),
+            "adults": "2",
+            "currencyCode": "CAD",
+            "max": "50",
+        }
+        offers.extend(_filter_offers(make_offers(params), RULE))
+        shift += 1
+    return offers[:count]
+
+
+def store_results(offers: list[dict], count: int) -> int:
+    from app.core.database import transaction
+    from app.api.watches.helpers import insert_watched_results
+
+    with transaction() as cur:
+        cur.execute("INSERT INTO flight_rules (rule_name, max_allowed_stops) VALUES ('Any', 2)")
+        cur.execute(
+            """
+            INSERT INTO watched_searches (rule_id, origin, destination, depart_date, return_date,
+                                          flex_days, adults, travel_class, currency)
+            VALUES (1, 'YYZ', 'SUF', '2026-08-10', '2026-08-24', 3, 2, 'ECONOMY', 'CAD')
+            """
+        )
+        watch_id = cur.lastrowid
+
+    # Distinct prices so change detection stores every one as a new row
+    items = [
+        (watch_id, dict(offers[i % len(offers)], total_price=1000.0 + i / 100))
+        for i in range(count)
+    ]
+    for start in range(0, count, 1000):
+        insert_watched_results(items[start:start + 1000])
+    return watch_id
+
+
+def best_of(repeat: int, fn) -> tuple[float, bytes]:
+    best, out = float("inf"), b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, out
+
+
+def report(name: str, before: tuple[float, bytes], after: tuple[float, bytes], repeat: int) -> None:
+    from app.core.compression import BROTLI_AVAILABLE
+    from app.core.config import GZIP_LEVEL, BROTLI_QUALITY
+
+    (old_seconds, old_body), (new_seconds, body) = before, after
+    print(f"\n{name}")
+    print(f"  response_model:    {old_seconds * 1000:8.1f} ms  {len(old_body) / 1024:8,.0f} KiB")
+    print(
+        f"  FastJSONResponse:  {new_seconds * 1000:8.1f} ms  {len(body) / 1024:8,.0f} KiB"
+        f"  ({old_seconds / new_seconds:.1f}x, same JSON: {json.loads(old_body) == json.loads(body)})"
+    )
+
+    seconds, compressed = best_of(repeat, lambda: gzip.compress(body, GZIP_LEVEL))
+    print(f"  gzip -{GZIP_LEVEL}:           {seconds * 1000:8.1f} ms  {len(compressed) / 1024:8,.0f} KiB"
+          f"  ({len(body) / len(compressed):.1f}:1)")
+    if BROTLI_AVAILABLE:
+        import brotli
+
+        seconds, compressed = best_of(repeat, lambda: brotli.compress(body, quality=BROTLI_QUALITY))
+        print(f"  brotli q{BROTLI_QUALITY}:         {seconds * 1000:8.1f} ms  {len(compressed) / 1024:8,.0f} KiB"
+              f"  ({len(body) / len(compressed):.1f}:1)")
+    else:
+        print("  brotli:            not installed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=2000)
+    parser.add_argument("--results", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="flightwatch-bench-"))
+
+    from pydantic import TypeAdapter
+    from fastapi.testclient import TestClient
+    from app.core.database import init_db
+    from app.core.responses import FastJSONResponse
+    from app.api.flights.schemas import FlightSearchResponse
+    from app.api.watches.schemas import WatchedResult
+    from app.api.watches.helpers import fetch_watched_results
+    from app.api.watches.service import _watched_result_dict, _to_watched_result
+
+    init_db()
+    offers = search_offers(args.offers)
+    watch_id = store_results(offers, args.results)
+
+    # What FastAPI does with a response_model: validate, then dump JSON
+    search_model = TypeAdapter(FlightSearchResponse)
+    results_model = TypeAdapter(list[WatchedResult])
+    content = {"offers": offers}
+    report(
+        f"/flights/search, {len(offers):,} offers",
+        best_of(args.repeat, lambda: search_model.dump_json(search_model.validate_python(content))),
+        best_of(args.repeat, lambda: FastJSONResponse(content).body),
+        args.repeat,
+    )
+
+    rows = fetch_watched_results(watch_id)
+    report(
+        f"/watches/{{id}}/results, {len(rows):,} rows (row conversion included)",
+        best_of(args.repeat, lambda: results_model.dump_json(
+            results_model.validate_python([_to_watched_result(row) for row in rows])
+        )),
+        best_of(args.repeat, lambda: FastJSONResponse([_watched_result_dict(row) for row in rows]).body),
+        args.repeat,
+    )
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        print("\nthrough the app, /watches/{id}/results:")
+        for accept in ("identity", "gzip", "br, gzip"):
+            r = client.get(f"/watches/{watch_id}/results", headers={"Accept-Encoding": accept})
+            wire = int(r.headers.get("content-length", len(r.content)))
+            print(
+                f"  Accept-Encoding: {accept:10} -> {r.headers.get('content-encoding', 'identity'):8}"
+                f" {wire / 1024:8,.0f} KiB  rows: {len(r.json()):,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Wall-clock benchmark for search_flights_service against the local stub.
+
+Compares the old serial loop (one call at a time plus a fixed 1.1 s sleep)
+with the concurrent fan-out, and checks both return the same offers.
+
+Usage:
+  python bench/bench_search.py --flex-days 7 --rules 4 --latency 0.4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_amadeus import start_stub  # noqa: E402
+
+RULES = [
+    ("Air Canada", "AC", None, 1),
+    ("ITA Airways", "AZ", None, 1),
+    ("Air Transat", "TS", 1, 0),
+    ("Anything", None, None, 2),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flex-days", type=int, default=7)
+    parser.add_argument("--rules", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--serial-delay", type=float, default=1.1)
+    parser.add_argument("--merge", action="store_true", help="merge compatible rules into one query")
+    args = parser.parse_args()
+
+    server, state = start_stub(latency=args.latency)
+    os.environ["AMADEUS_BASE"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["MERGE_RULE_QUERIES"] = "1" if args.merge else "0"
+    os.chdir(tempfile.mkdtemp(prefix="flightwatch-bench-"))
+
+    from app.core.database import init_db
+    from app.api.rules.helpers import insert_rule, fetch_active_rules
+    from app.api.flights.schemas import FlightSearchRequest
+    from app.api.flights.service import search_flights_service, collect_offers
+    from app.api.flights.planner import plan_search, execute_queries
+    from app.core.amadeus import get_token
+    from app.core.cache import offer_cache
+
+    init_db()
+    for name, codes, non_stop, max_stops in (RULES * 4)[: args.rules]:
+        insert_rule({
+            "rule_name": name,
+            "included_airline_codes": codes,
+            "non_stop": non_stop,
+            "max_allowed_stops": max_stops,
+        })
+
+    req = FlightSearchRequest(
+        origin="YYZ",
+        destination="SUF",
+        depart="2026-08-10",
+        return_date="2026-08-24",
+        flex_days=args.flex_days,
+    )
+
+    # Old behaviour: one call at a time, fixed sleep after each
+    token = get_token()
+    offer_cache.clear()
+    state.reset()
+    started = time.perf_counter()
+    serial = []
+    for cell in plan_search(req, fetch_active_rules(), merge=False):
+        serial.extend(collect_offers([cell], execute_queries(token, [cell.query])))
+        time.sleep(args.serial_delay)
+    serial_elapsed = time.perf_counter() - started
+    serial_calls = state.search_calls
+
+    offer_cache.clear()
+    state.reset()
+    started = time.perf_counter()
+    concurrent = search_flights_service(req)["offers"]
+    concurrent_elapsed = time.perf_counter() - started
+
+    print(f"calls:       {serial_calls} serial / {state.search_calls} concurrent")
+    print(f"serial:      {serial_elapsed:8.2f} s")
+    print(f"concurrent:  {concurrent_elapsed:8.2f} s  ({serial_elapsed / concurrent_elapsed:.1f}x faster)")
+    # Merged queries return a different (larger) offer set by design
+    print(f"identical:   {serial == concurrent} ({len(serial)} / {len(concurrent)} offers)")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
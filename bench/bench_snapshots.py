@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+On-disk cost of the per-run offer snapshots: simulates hourly runs of one
+watch (flex window x rules, every filtered offer kept) and reports bytes
+per run and per offer, against the same offers stored as JSON text.
+
+Usage:
+  python bench/bench_snapshots.py --runs 720 --flex-days 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RULES = [
+    {"rule_name": "AC direct", "included_airline_codes": "AC", "non_stop": 1, "max_allowed_stops": 0},
+    {"rule_name": "Star", "included_airline_codes": "AC,LH,UA", "non_stop": 0, "max_allowed_stops": 1},
+    {"rule_name": "Any", "included_airline_codes": None, "non_stop": 0, "max_allowed_stops": 2},
+]
+
+
+def run_offers(run: int, flex_days: int) -> list[dict]:
+    from app.api.flights.service import _filter_offers
+    from stub_amadeus import make_offers
+
+    depart, ret = date(2026, 8, 10), date(2026, 8, 24)
+    offers = []
+    for shift in range(-flex_days, flex_days + 1):
+        for rule in RULES:
+            params = {
+                "originLocationCode": "YYZ",
+                "destinationLocationCode": "SUF",
+                "departureDate": (depart + timedelta(days=shift)).isoformat(),
+                "returnDate": (ret + timedelta(days=shift)).isoformat(),
+                "adults": "2",
+                "currencyCode": "CAD",
+                "max": "50",
+                # Vary prices between runs like a live fare feed would
+                "run": str(run),
+            }
+            if rule["included_airline_codes"]:
+                params["includedAirlineCodes"] = rule["included_airline_codes"]
+            offers.extend(_filter_offers(make_offers(params), rule))
+    return offers
+
+
+def table_bytes(conn: sqlite3.Connection, tables: tuple[str, ...]) -> int:
+    placeholders = ",".join("?" * len(tables))
+    return conn.execute(
+        f"""
+        SELECT SUM(s.pgsize) FROM dbstat s
+        JOIN sqlite_schema m ON m.name = s.name
+        WHERE m.tbl_name IN ({placeholders})
+        """,
+        tables,
+    ).fetchone()[0] or 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=720, help="hourly runs to simulate (720 = 30 days)")
+    parser.add_argument("--flex-days", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "bench"))
+    os.chdir(tempfile.mkdtemp(prefix="flightwatch-bench-"))
+
+    from app.core.database import get_connection, init_db, transaction
+    from app.api.watches.snapshots import insert_snapshot, fetch_snapshot_offers, snapshot_storage
+
+    init_db()
+    with transaction() as cur:
+        cur.execute(
+            "INSERT INTO flight_rules (rule_name, included_airline_codes, max_allowed_stops) VALUES ('AC', 'AC', 1)"
+        )
+        cur.execute(
+            """
+            INSERT INTO watched_searches (rule_id, origin, destination, depart_date, return_date,
+                                          flex_days, adults, travel_class, currency)
+            VALUES (1, 'YYZ', 'SUF', '2026-08-10', '2026-08-24', 3, 2, 'ECONOMY', 'CAD')
+            """
+        )
+
+    conn = get_connection()
+    conn.execute("CREATE TABLE json_runs (id INTEGER PRIMARY KEY, watch_id INTEGER, captured_at TEXT, offers TEXT)")
+
+    insert_seconds = 0.0
+    last_offers: list[dict] = []
+    last_run = None
+    for run in range(args.runs):
+        offers = run_offers(run, args.flex_days)
+        started = time.perf_counter()
+        last_run = insert_snapshot(1, offers)
+        insert_seconds += time.perf_counter() - started
+        last_offers = offers
+        with transaction() as cur:
+            cur.execute(
+                "INSERT INTO json_runs (watch_id, captured_at, offers) VALUES (1, datetime('now'), ?)",
+                (json.dumps(offers),),
+            )
+
+    # Round trip: decoded run matches what was written, cheapest first
+    decoded = fetch_snapshot_offers(1, last_run)
+    expected = sorted(last_offers, key=lambda o: o["total_price"])
+    assert [o["total_price"] for o in decoded] == [o["total_price"] for o in expected]
+    assert [o["outbound_flight_numbers"] for o in decoded] == [o["outbound_flight_numbers"] for o in expected]
+
+    stats = snapshot_storage()
+    json_bytes = table_bytes(conn, ("json_runs",))
+    print(f"runs: {stats['runs']}, offers: {stats['offers']:,} ({stats['offers'] / stats['runs']:.0f}/run)")
+    print(f"insert: {insert_seconds / args.runs * 1000:.2f} ms/run")
+    print(f"{'':10} {'total MB':>9} {'B/run':>9} {'B/offer':>8}")
+    print(f"{'snapshot':10} {stats['total_bytes'] / 1e6:9.2f} {stats['bytes_per_run']:9.0f} {stats['bytes_per_offer']:8.1f}")
+    print(f"{'json':10} {json_bytes / 1e6:9.2f} {json_bytes / args.runs:9.0f} {json_bytes / stats['offers']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Throughput of watched_results writes, and a leak check: 10k inserts one
+row per transaction, batched many rows per transaction, and through the
+write-behind queue, counting open SQLite connections and file descriptors
+around each. Exits non-zero if any case leaves either count changed, or if
+no-offer runs don't end the run before them.
+
+Usage:
+  python bench/bench_writes.py --inserts 10000 --batch 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+OFFER = {
+    "total_price": 1234.5,
+    "base_price": 1000.0,
+    "currency": "CAD",
+    "carrier": "AC",
+    "fare_brand": "FLEX",
+    "outbound_flight_numbers": ["AC890"],
+    "inbound_flight_numbers": ["AC891"],
+    "num_stops": 0,
+    "stop_airports_outbound": [],
+    "stop_airports_inbound": [],
+    "outbound": {"depart_time": "2026-08-10T17:00:00", "arrive_time": "2026-08-11T08:00:00", "duration": "PT9H"},
+    "inbound": {"depart_time": "2026-08-24T10:00:00", "arrive_time": "2026-08-24T13:00:00", "duration": "PT9H"},
+    "checked_bags": 1,
+    "cabin_bags": 1,
+    "seats_left": 4,
+}
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else -1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inserts", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=200, help="rows per batched transaction")
+    parser.add_argument("--watches", type=int, default=200)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="flightwatch-bench-"))
+
+    from app.core import database
+    from app.core.database import init_db, transaction
+    from app.api.watches.helpers import insert_watched_result, insert_watched_results, result_writer
+
+    init_db()
+    with transaction() as cur:
+        cur.execute(
+            "INSERT INTO flight_rules (rule_name, included_airline_codes, max_allowed_stops) VALUES ('AC', 'AC', 1)"
+        )
+        for _ in range(args.watches):
+            cur.execute(
+                """
+                INSERT INTO watched_searches (rule_id, origin, destination, depart_date, return_date,
+                                              flex_days, adults, travel_class, currency)
+                VALUES (1, 'YYZ', 'SUF', '2026-08-10', '2026-08-24', 3, 2, 'ECONOMY', 'CAD')
+                """
+            )
+
+    # Distinct prices so change detection stores every one as a new row
+    items = [(i % args.watches + 1, dict(OFFER, total_price=1000.0 + i)) for i in range(args.inserts)]
+
+    def per_row() -> list[int]:
+        return [insert_watched_result(watch_id, offer) for watch_id, offer in items]
+
+    def batched() -> list[int]:
+        ids = []
+        for start in range(0, len(items), args.batch):
+            ids.extend(insert_watched_results(items[start:start + args.batch]))
+        return ids
+
+    def write_behind() -> list[int]:
+        futures = [result_writer.submit(item) for item in items]
+        return [f.result() for f in futures]
+
+    # Start the write-behind thread and its connection up front, so every
+    # case should leave the connection and fd counts where it found them
+    result_writer.submit((items[0][0], None)).result()
+
+    leaks = []
+    print(f"{'':14} {'seconds':>8} {'rows/s':>9} {'conns':>6} {'fds':>5} {'threads':>8}")
+    for name, run in (("per-row", per_row), ("batched", batched), ("write-behind", write_behind)):
+        conns, fds = len(database._connections), open_fds()
+        started = time.perf_counter()
+        ids = run()
+        elapsed = time.perf_counter() - started
+
+        assert len(ids) == len(set(ids)) == args.inserts
+        with transaction() as cur:
+            rows = cur.execute(
+                f"SELECT COUNT(*) FROM watched_results WHERE id IN ({','.join('?' * len(ids[:900]))})",
+                ids[:900],
+            ).fetchone()[0]
+        assert rows == len(ids[:900]), "returned ids don't match stored rows"
+
+        conns, fds = len(database._connections) - conns, open_fds() - fds
+        print(
+            f"{name:14} {elapsed:8.3f} {args.inserts / elapsed:9.0f}"
+            f" {conns:+6} {fds:+5} {threading.active_count():8}"
+        )
+        if conns or fds:
+            leaks.append(name)
+
+    print(f"write-behind: {result_writer.stats()}")
+    if leaks:
+        sys.exit(f"Leaked connections or file descriptors: {', '.join(leaks)}")
+
+    check_runs(insert_watched_results, transaction)
+
+
+def check_runs(insert_watched_results, transaction) -> None:
+    # Run-length encoding on a fresh watch: a no-offer run ends the run
+    # before it, also when both are in one batch (as write-behind merges
+    # several runs' submissions)
+    with transaction() as cur:
+        cur.execute(
+            """
+            INSERT INTO watched_searches (rule_id, origin, destination, depart_date, return_date,
+                                          flex_days, adults, travel_class, currency)
+            VALUES (1, 'YYZ', 'SUF', '2026-08-10', '2026-08-24', 3, 2, 'ECONOMY', 'CAD')
+            """
+        )
+        watch_id = cur.lastrowid
+
+    first = insert_watched_results([(watch_id, OFFER), (watch_id, OFFER), (watch_id, None)])
+    second = insert_watched_results([(watch_id, OFFER), (watch_id, None), (watch_id, OFFER)])
+    third = insert_watched_results([(watch_id, OFFER)])
+    with transaction() as cur:
+        rows = cur.execute(
+            "SELECT id, seen_count, fingerprint IS NULL FROM watched_results WHERE watch_id = ? ORDER BY id",
+            (watch_id,),
+        ).fetchall()
+
+    # Rows: X seen twice then ended, X ended within the batch, X seen twice
+    ids = [row[0] for row in rows]
+    expected = (
+        [tuple(row)[1:] for row in rows] == [(2, 1), (1, 1), (2, 0)]
+        and [first, second, third] == [[ids[0], ids[0], None], [ids[1], None, ids[2]], [ids[2]]]
+    )
+    print(f"run-length encoding: {'ok' if expected else 'WRONG'}")
+    if not expected:
+        sys.exit(f"Unexpected runs: {first} {second} {third} {[tuple(row) for row in rows]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite against the local Amadeus stub, no credentials
+needed. At each scale (number of watches) it times:
+
+  flights_search        POST /flights/search through the app
+  run_watch_service     one watch at a time, over a sample of watches
+  run_all_watches       run_all_watches_service over every watch
+  list_watched_results  every watch's result history
+
+with the offer cache cleared before each, and writes the results as JSON
+(by default to bench/results/<commit>.json) so runs on different commits
+can be compared with --compare.
+
+Each scale runs in its own process on a fresh database.
+
+Usage:
+  python bench/run_suite.py --watches 10 100 1000
+  python bench/run_suite.py --latency 0.2 --jitter 0.1 --throttle-rate 0.02
+  python bench/run_suite.py --compare bench/results/abc123.json bench/results/def456.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ORIGINS = ["YYZ", "YUL", "YVR", "YYC", "YOW"]
+DESTINATIONS = ["SUF", "FCO", "LHR", "CDG", "FRA", "AMS", "MUC"]
+# A month out, so every watched date is still ahead whenever the suite runs
+FIRST_DEPARTURE = date.today() + timedelta(days=30)
+RULES = [
+    {"rule_name": "Star", "included_airline_codes": "AC,LH,UA", "non_stop": 0, "max_allowed_stops": 1},
+    {"rule_name": "Any", "included_airline_codes": None, "non_stop": 0, "max_allowed_stops": 2},
+]
+
+
+def timings(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "total_s": round(sum(samples), 6),
+        "p50_s": round(statistics.median(samples), 6),
+        "p95_s": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 6),
+        "max_s": round(samples[-1], 6),
+    }
+
+
+def stub_call(path: str, method: str = "GET") -> dict:
+    import httpx
+
+    return httpx.request(method, os.environ["AMADEUS_BASE"] + path).json()
+
+
+def measured(fn) -> tuple[float, dict, object]:
+    """
+    Runs `fn` on a cold offer cache; returns seconds, stub calls and its
+    result.
+    """
+    from app.core.cache import offer_cache
+
+    offer_cache.clear()
+    stub_call("/__reset", "POST")
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, stub_call("/__stats"), result
+
+
+def create_watches(count: int, flex_days: int) -> list[int]:
+    from app.api.rules.helpers import insert_rule
+    from app.api.watches.helpers import insert_watch
+    from app.api.watches.schemas import WatchCreate
+
+    rule_ids = [insert_rule(rule) for rule in RULES]
+
+    routes = [(origin, destination) for origin in ORIGINS for destination in DESTINATIONS]
+    ids = []
+    for i in range(count):
+        # Spread routes and dates so (up to a few thousand) watches each
+        # need their own queries
+        origin, destination = routes[i % len(routes)]
+        depart = FIRST_DEPARTURE + timedelta(days=i % 300)
+        ids.append(insert_watch(WatchCreate(
+            rule_id=rule_ids[i % len(rule_ids)],
+            origin=origin,
+            destination=destination,
+            depart_date=depart.isoformat(),
+            return_date=(depart + timedelta(days=7 + i % 14)).isoformat(),
+            flex_days=flex_days,
+            adults=1 + i % 2,
+        )))
+    return ids
+
+
+def run_scale(watches: int, flex_days: int, sample: int) -> dict:
+    """
+    One scale of the suite, on a fresh database in a temporary directory.
+    """
+    os.chdir(tempfile.mkdtemp(prefix="flightwatch-suite-"))
+
+    from fastapi.testclient import TestClient
+    from app.core.database import init_db
+    from app.core.amadeus import get_token
+    from app.main import app
+    from app.api.watches.service import run_watch_service, run_all_watches_service, list_watched_results
+
+    init_db()
+    watch_ids = create_watches(watches, flex_days)
+    get_token()
+    results = {"watches": watches}
+
+    search = {
+        "origin": "YYZ",
+        "destination": "SUF",
+        "depart": (FIRST_DEPARTURE + timedelta(days=40)).isoformat(),
+        "return_date": (FIRST_DEPARTURE + timedelta(days=54)).isoformat(),
+        "flex_days": flex_days,
+    }
+    # Not entered as a context manager, so the app's lifespan (scheduler,
+    # shutdown hooks) stays out of the way
+    client = TestClient(app, raise_server_exceptions=False)
+    samples, failed, throttled, calls, offers = [], 0, 0, 0, 0
+    for _ in range(5):
+        seconds, stats, r = measured(lambda: client.post("/flights/search", json=search))
+        calls += stats["search_calls"]
+        throttled += stats["throttled"]
+        if r.status_code != 200:
+            failed += 1
+            continue
+        samples.append(seconds)
+        offers = len(r.json()["offers"])
+    results["flights_search"] = {
+        **(timings(samples) if samples else {"n": 0}),
+        "failed": failed,
+        "calls": calls,
+        "throttled": throttled,
+        "offers": offers,
+    }
+
+    samples, failed, throttled, calls = [], 0, 0, 0
+    for watch_id in watch_ids[:sample]:
+        try:
+            seconds, stats, _ = measured(lambda: run_watch_service(watch_id))
+        except Exception:
+            failed += 1
+            continue
+        samples.append(seconds)
+        calls += stats["search_calls"]
+        throttled += stats["throttled"]
+    results["run_watch_service"] = {
+        **(timings(samples) if samples else {"n": 0}),
+        "failed": failed,
+        "calls": calls,
+        "throttled": throttled,
+    }
+
+    seconds, stats, summary = measured(run_all_watches_service)
+    results["run_all_watches"] = {
+        "seconds": round(seconds, 4),
+        "watches_per_s": round(watches / seconds, 2),
+        "ran": summary["ran"],
+        "failed": summary["failed"],
+        "calls": stats["search_calls"],
+        "throttled": stats["throttled"],
+    }
+
+    samples, rows = [], 0
+    for watch_id in watch_ids:
+        started = time.perf_counter()
+        rows += len(list_watched_results(watch_id))
+        samples.append(time.perf_counter() - started)
+    results["list_watched_results"] = {**timings(samples), "rows": rows}
+    return results
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{old['commit']} -> {new['commit']}")
+    print(f"{'watches':>7} {'case':22} {'metric':14} {'old':>10} {'new':>10} {'change':>8}")
+    for scale, cases in new["scales"].items():
+        for case, metrics in cases.items():
+            if not isinstance(metrics, dict):
+                continue
+            for metric, value in metrics.items():
+                before = old["scales"].get(scale, {}).get(case, {}).get(metric)
+                if not metric.endswith(("_s", "seconds")) or before is None:
+                    continue
+                change = f"{(value - before) / before * 100:+.0f}%" if before else ""
+                print(f"{scale:>7} {case:22} {metric:14} {before:10.4f} {value:10.4f} {change:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--watches", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--flex-days", type=int, default=0)
+    parser.add_argument("--sample", type=int, default=20, help="watches timed one at a time with run_watch_service")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-calls-per-second", type=float, default=0.0, help="stub-side 429 limit (0: none)")
+    parser.add_argument("--calls-per-second", type=float, default=200, help="the app's own API_MAX_CALLS_PER_SECOND")
+    parser.add_argument("--recordings", help="replay the *.json response bodies in this directory")
+    parser.add_argument("--out", help="results file (default: bench/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.scale is not None:
+        # Child process: one scale, JSON on the last line of stdout
+        print(json.dumps(run_scale(args.scale, args.flex_days, args.sample)))
+        return
+
+    from stub_amadeus import start_stub, load_recordings
+
+    server, _ = start_stub(
+        latency=args.latency,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        max_calls_per_second=args.max_calls_per_second,
+        recordings=load_recordings(args.recordings) if args.recordings else None,
+    )
+    env = dict(
+        os.environ,
+        AMADEUS_BASE=f"http://127.0.0.1:{server.server_address[1]}",
+        CLIENT_ID="bench",
+        CLIENT_SECRET="bench",
+        API_MAX_CALLS_PER_SECOND=str(args.calls_per_second),
+        API_BURST=str(max(int(args.calls_per_second), 1)),
+        WATCH_EXECUTION="inline",
+    )
+
+    commit = current_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "settings": {
+            key: getattr(args, key)
+            for key in ("flex_days", "sample", "latency", "jitter", "throttle_rate",
+                        "max_calls_per_second", "calls_per_second", "recordings")
+        },
+        "scales": {},
+    }
+    for watches in args.watches:
+        print(f"{watches} watches...", file=sys.stderr)
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--scale", str(watches),
+             "--flex-days", str(args.flex_days), "--sample", str(args.sample)],
+            env=env, capture_output=True, text=True,
+        )
+        if child.returncode != 0:
+            sys.exit(f"{watches} watches failed:\n{child.stderr}")
+        report["scales"][str(watches)] = json.loads(child.stdout.strip().splitlines()[-1])
+    server.shutdown()
+
+    out = args.out or os.path.join(ROOT, "bench", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'watches':>7} {'search s':>9} {'run one p50':>12} {'run all s':>10} {'watches/s':>10} {'list p50':>9}")
+    for watches, r in report["scales"].items():
+        print(
+            f"{watches:>7} {r['flights_search'].get('p50_s', 0):9.3f} {r['run_watch_service'].get('p50_s', 0):12.3f}"
+            f" {r['run_all_watches']['seconds']:10.2f} {r['run_all_watches']['watches_per_s']:10.1f}"
+            f" {r['list_watched_results']['p50_s'] * 1000:7.2f}ms"
+        )
+    print(f"written to {out}")
+
+
+if __name__ == "__main__":
+    main()
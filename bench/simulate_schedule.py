@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Replays hourly price history through the hourly and adaptive scheduling
+policies and reports API calls against price changes missed.
+
+History comes from watched_results in an existing database (--db, the
+run-length encoded rows are expanded back into hourly runs) or, without
+--db, from a synthetic random walk per watch whose prices move more often
+as departure approaches. A change counts as missed when the price it
+changed to was never seen by any poll before the next change.
+
+Usage:
+  python bench/simulate_schedule.py --watches 200 --days 60
+  python bench/simulate_schedule.py --db flights.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import math
+import os
+import random
+import sqlite3
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HOUR = 3600
+DAY = 86400
+START = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+@dataclass
+class WatchHistory:
+    watch_id: int
+    depart_at: float
+    calls_per_run: int
+    # Hourly (time, price) runs, oldest first
+    times: list[float] = field(default_factory=list)
+    prices: list[float] = field(default_factory=list)
+
+
+def synthetic_history(watches: int, days: int, calls_per_run: int, seed: int) -> list[WatchHistory]:
+    rng = random.Random(seed)
+    histories = []
+    for watch_id in range(1, watches + 1):
+        depart_at = START + rng.uniform(10, 200) * DAY
+        base_rate = rng.uniform(0.01, 0.3)
+        price = rng.uniform(500, 2000)
+        h = WatchHistory(watch_id, depart_at, calls_per_run)
+        t = START
+        while t < min(START + days * DAY, depart_at):
+            days_left = (depart_at - t) / DAY
+            if rng.random() < min(base_rate * (1 + 3 * math.exp(-days_left / 14)), 0.9):
+                price = round(price * rng.uniform(0.93, 1.08), 2)
+            h.times.append(t)
+            h.prices.append(price)
+            t += HOUR
+        histories.append(h)
+    return histories
+
+
+def stored_history(path: str, calls_per_run: int | None) -> list[WatchHistory]:
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rules = conn.execute("SELECT COUNT(*) FROM flight_rules WHERE enabled = 1").fetchone()[0] or 1
+
+    def epoch(ts: str) -> float:
+        return datetime.fromisoformat(ts).replace(tzinfo=timezone.utc).timestamp()
+
+    histories: dict[int, WatchHistory] = {}
+    for row in conn.execute(
+        """
+        SELECT w.id, w.depart_date, w.flex_days, wr.captured_at,
+               COALESCE(wr.last_seen_at, wr.captured_at) AS last_seen_at,
+               COALESCE(wr.seen_count, 1) AS seen_count, wr.total_price
+        FROM watched_results wr
+        JOIN watched_searches w ON w.id = wr.watch_id
+        ORDER BY w.id, wr.captured_at, wr.id
+        """
+    ):
+        h = histories.get(row["id"])
+        if h is None:
+            h = histories[row["id"]] = WatchHistory(
+                row["id"],
+                epoch(row["depart_date"]) - row["flex_days"] * DAY,
+                calls_per_run or (2 * row["flex_days"] + 1) * rules,
+            )
+        # Same even spread as the price-history queries
+        first, last, n = epoch(row["captured_at"]), epoch(row["last_seen_at"]), row["seen_count"]
+        for k in range(n):
+            h.times.append(first + (k * (last - first) / (n - 1) if n > 1 else 0))
+            h.prices.append(row["total_price"])
+    conn.close()
+    return [h for h in histories.values() if h.times]
+
+
+def segments(h: WatchHistory) -> list[tuple[float, float]]:
+    # (start, end) of each stretch of unchanged price
+    starts = [0] + [i for i in range(1, len(h.prices)) if h.prices[i] != h.prices[i - 1]]
+    ends = starts[1:] + [len(h.times)]
+    return [(h.times[s], h.times[e] if e < len(h.times) else math.inf) for s, e in zip(starts, ends)]
+
+
+def simulate_hourly(h: WatchHistory) -> list[float]:
+    return list(h.times)
+
+
+def simulate_adaptive(h: WatchHistory, volatility_days: int, min_runs: int) -> list[float]:
+    from app.core.scheduling import phase_offset, polling_interval
+
+    polls: list[float] = []
+    seen: list[float] = []
+
+    def change_rate(now: float):
+        # What the scheduler would measure from its own stored results
+        lo = bisect.bisect_left(polls, now - volatility_days * DAY)
+        window = seen[lo:]
+        if len(window) < min_runs:
+            return None
+        return sum(a != b for a, b in zip(window, window[1:])) / (len(window) - 1)
+
+    def days_left(t: float) -> float:
+        return (h.depart_at - t) / DAY
+
+    first = h.times[0]
+    t = first + phase_offset(h.watch_id, polling_interval(days_left(first)))
+    while t <= h.times[-1]:
+        price = h.prices[bisect.bisect_right(h.times, t) - 1]
+        polls.append(t)
+        seen.append(price)
+        t += polling_interval(days_left(t), change_rate(t))
+    return polls
+
+
+def score(h: WatchHistory, polls: list[float]) -> tuple[int, int, list[float]]:
+    # (changes, missed, detection delays in hours)
+    stretches = segments(h)
+    missed, delays = 0, []
+    for start, end in stretches[1:]:
+        i = bisect.bisect_left(polls, start)
+        if i < len(polls) and polls[i] < end:
+            delays.append((polls[i] - start) / HOUR)
+        else:
+            missed += 1
+    return len(stretches) - 1, missed, delays
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="replay watched_results from this database instead of synthetic history")
+    parser.add_argument("--watches", type=int, default=200)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--calls-per-run", type=int, help="Amadeus calls per watch run (default: flex window x rules)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from app.core.config import SCHEDULER_VOLATILITY_DAYS
+    from app.api.watches.service import MIN_RUNS_FOR_VOLATILITY
+
+    if args.db:
+        histories = stored_history(args.db, args.calls_per_run)
+    else:
+        histories = synthetic_history(args.watches, args.days, args.calls_per_run or 7, args.seed)
+    if not histories:
+        sys.exit("no history to replay")
+
+    policies = {
+        "hourly": simulate_hourly,
+        "adaptive": lambda h: simulate_adaptive(h, SCHEDULER_VOLATILITY_DAYS, MIN_RUNS_FOR_VOLATILITY),
+    }
+
+    print(f"{len(histories)} watches, {sum(len(h.times) for h in histories):,} hourly runs of history")
+    print(f"{'policy':10} {'calls':>10} {'peak/h':>8} {'changes':>8} {'missed':>7} {'missed %':>9} {'delay h p50':>12}")
+    for name, simulate in policies.items():
+        calls = changes = missed = 0
+        delays: list[float] = []
+        per_hour: Counter = Counter()
+        for h in histories:
+            polls = simulate(h)
+            calls += len(polls) * h.calls_per_run
+            for t in polls:
+                per_hour[int(t // HOUR)] += h.calls_per_run
+            c, m, d = score(h, polls)
+            changes, missed = changes + c, missed + m
+            delays.extend(d)
+        delays.sort()
+        print(
+            f"{name:10} {calls:10,} {max(per_hour.values()):8,} {changes:8,} {missed:7,}"
+            f" {missed / changes * 100 if changes else 0:8.1f}% {delays[len(delays) // 2] if delays else 0:12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the two Amadeus endpoints the app uses:
+  POST /v1/security/oauth2/token
+  GET  /v2/shopping/flight-offers
+
+Offers are synthetic but deterministic: the same query always returns the
+same offers, so results from different code paths can be compared. With
+--recordings the stub replays recorded response bodies instead, one per
+query (picked by a hash of its parameters, so not matching its route or
+dates). Latency can jitter, and calls can be answered 429 with a
+Retry-After, at random or above a rate.
+
+GET /__stats returns the call counters and POST /__reset zeroes them.
+
+Usage:
+  python bench/stub_amadeus.py --port 8765 --latency 0.4
+  python bench/stub_amadeus.py --latency 0.3 --jitter 0.2 --throttle-rate 0.05
+  python bench/stub_amadeus.py --recordings recordings/ --max-calls-per-second 10
+  AMADEUS_BASE=http://127.0.0.1:8765 uvicorn app.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+CARRIERS = ["AC", "AZ", "TS", "LH", "AF", "KL", "BA", "UA"]
+HUBS = ["FCO", "FRA", "CDG", "AMS", "LHR", "MUC", "YUL", "EWR"]
+BRANDS = ["BASIC", "STANDARD", "FLEX", "COMFORT", "LATITUDE"]
+
+
+def _itinerary(rng: random.Random, origin: str, destination: str, day: str, carrier: str, stops: int) -> dict:
+    at = datetime.fromisoformat(day) + timedelta(hours=rng.randint(6, 22))
+    airports = [origin] + rng.sample(HUBS, stops) + [destination]
+    segments = []
+    total_minutes = 0
+    for i in range(len(airports) - 1):
+        minutes = rng.randint(60, 540)
+        arrive = at + timedelta(minutes=minutes)
+        segments.append({
+            "departure": {"iataCode": airports[i], "at": at.isoformat()},
+            "arrival": {"iataCode": airports[i + 1], "at": arrive.isoformat()},
+            "carrierCode": carrier,
+            "number": str(rng.randint(100, 1999)),
+            "aircraft": {"code": rng.choice(["321", "333", "77W", "789"])},
+            "duration": f"PT{minutes // 60}H{minutes % 60}M",
+            "numberOfStops": 0,
+        })
+        layover = rng.randint(45, 240)
+        total_minutes += minutes + layover
+        at = arrive + timedelta(minutes=layover)
+    total_minutes -= layover
+    return {
+        "duration": f"PT{total_minutes // 60}H{total_minutes % 60}M",
+        "segments": segments,
+    }
+
+
+def make_offers(params: dict, max_results: Optional[int] = None) -> dict:
+    origin = params["originLocationCode"]
+    destination = params["destinationLocationCode"]
+    depart = params["departureDate"]
+    ret = params.get("returnDate")
+    currency = params.get("currencyCode", "CAD")
+    adults = int(params.get("adults", 1))
+    non_stop = params.get("nonStop") == "true"
+    carriers = (
+        params["includedAirlineCodes"].split(",")
+        if params.get("includedAirlineCodes")
+        else CARRIERS
+    )
+    count = int(params.get("max", 50)) if max_results is None else max_results
+
+    rng = random.Random(json.dumps(params, sort_keys=True))
+    offers = []
+    for i in range(count):
+        carrier = rng.choice(carriers)
+        stops = 0 if non_stop else rng.choice([0, 1, 1, 2])
+        itineraries = [_itinerary(rng, origin, destination, depart, carrier, stops)]
+        if ret:
+            itineraries.append(_itinerary(rng, destination, origin, ret, carrier, stops))
+        base = round(rng.uniform(400, 2400) * adults, 2)
+        total = round(base * 1.18, 2)
+        n_segments = sum(len(it["segments"]) for it in itineraries)
+        offers.append({
+            "type": "flight-offer",
+            "id": str(i + 1),
+            "source": "GDS",
+            "numberOfBookableSeats": rng.randint(1, 9),
+            "itineraries": itineraries,
+            "price": {
+                "currency": currency,
+                "total": f"{total:.2f}",
+                "base": f"{base:.2f}",
+                "grandTotal": f"{total:.2f}",
+            },
+            "pricingOptions": {"fareType": ["PUBLISHED"], "includedCheckedBagsOnly": False},
+            "validatingAirlineCodes": [carrier],
+            "travelerPricings": [
+                {
+                    "travelerId": str(t + 1),
+                    "fareOption": "STANDARD",
+                    "travelerType": "ADULT",
+                    "price": {"currency": currency, "total": f"{total / adults:.2f}"},
+                    "fareDetailsBySegment": [
+                        {
+                            "segmentId": str(s + 1),
+                            "cabin": params.get("travelClass", "ECONOMY"),
+                            "brandedFareLabel": rng.choice(BRANDS),
+                            "includedCheckedBags": {"quantity": rng.choice([0, 1, 2])},
+                            "includedCabinBags": {"quantity": 1},
+                        }
+                        for s in range(n_segments)
+                    ],
+                }
+                for t in range(adults)
+            ],
+        })
+
+    offers.sort(key=lambda o: float(o["price"]["total"]))
+    return {
+        "meta": {"count": len(offers)},
+        "data": offers,
+        "dictionaries": {
+            "carriers": {c: c for c in CARRIERS},
+            "locations": {h: {"cityCode": h} for h in HUBS},
+        },
+    }
+
+
+def load_recordings(path: str) -> list[bytes]:
+    """
+    Recorded flight-offers response bodies, one JSON file each.
+    """
+    bodies = []
+    for name in sorted(glob.glob(os.path.join(path, "*.json"))):
+        with open(name, "rb") as f:
+            bodies.append(f.read())
+    if not bodies:
+        raise ValueError(f"No recorded responses (*.json) in {path}")
+    return bodies
+
+
+class StubState:
+    """
+    Stub behaviour and counters. Each flight-offers call waits `latency`
+    seconds give or take up to `jitter`, and is answered 429 with
+    Retry-After when over `max_calls_per_second` or, at random, for a
+    `throttle_rate` share of calls.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        throttle_rate: float = 0.0,
+        max_calls_per_second: float = 0.0,
+        retry_after: int = 1,
+        recordings: Optional[list[bytes]] = None,
+        seed: int = 1,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.max_calls_per_second = max_calls_per_second
+        self.retry_after = retry_after
+        self.recordings = recordings
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self._recent: "deque[float]" = deque()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.token_calls = 0
+            self.search_calls = 0
+            self.throttled = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "token_calls": self.token_calls,
+                "search_calls": self.search_calls,
+                "throttled": self.throttled,
+            }
+
+    def admit(self) -> tuple[bool, float]:
+        """
+        Counts a flight-offers call; returns whether to serve it (False
+        means 429) and how long to wait before answering.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.search_calls += 1
+            delay = max(self.latency + self.rng.uniform(-self.jitter, self.jitter), 0.0)
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            over_rate = self.max_calls_per_second and len(self._recent) >= self.max_calls_per_second
+            if over_rate or self.rng.random() < self.throttle_rate:
+                self.throttled += 1
+                return False, delay
+            self._recent.append(now)
+            return True, delay
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState
+
+    def log_message(self, *args):
+        pass
+
+    def _send_body(self, status: int, payload: bytes, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+        self._send_body(status, json.dumps(body).encode(), headers)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        path = urlparse(self.path).path
+        if path == "/__reset":
+            self.state.reset()
+            self._send_json(200, {"status": "ok"})
+            return
+        if path != "/v1/security/oauth2/token":
+            self._send_json(404, {"error": "not found"})
+            return
+        with self.state.lock:
+            self.state.token_calls += 1
+            n = self.state.token_calls
+        self._send_json(200, {
+            "access_token": f"stub-token-{n}",
+            "expires_in": 1799,
+            "token_type": "Bearer",
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/__stats":
+            self._send_json(200, self.state.stats())
+            return
+        if url.path != "/v2/shopping/flight-offers":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        served, delay = self.state.admit()
+        if delay:
+            time.sleep(delay)
+        if not served:
+            # Amadeus' error body for its rate limit
+            self._send_json(
+                429,
+                {"errors": [{"status": 429, "code": 38194, "title": "Too many requests"}]},
+                {"Retry-After": str(self.state.retry_after)},
+            )
+            return
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        recordings = self.state.recordings
+        if recordings:
+            # The same query always replays the same recording
+            key = json.dumps(params, sort_keys=True).encode()
+            self._send_body(200, recordings[zlib.crc32(key) % len(recordings)])
+        else:
+            self._send_json(200, make_offers(params))
+
+
+def start_stub(port: int = 0, latency: float = 0.0, **behaviour) -> tuple[ThreadingHTTPServer, StubState]:
+    """
+    Starts the stub on a background thread. Returns the server (use
+    server.server_address for the bound port) and its state; `behaviour`
+    is passed on to StubState.
+    """
+    state = StubState(latency, **behaviour)
+    handler = type("Handler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Amadeus stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds per flight-offers call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency varies by up to this many seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of calls answered 429 at random")
+    parser.add_argument("--max-calls-per-second", type=float, default=0.0, help="answer 429 above this rate (0: no limit)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--recordings", help="replay the *.json response bodies in this directory")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server, _ = start_stub(
+        args.port,
+        args.latency,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        max_calls_per_second=args.max_calls_per_second,
+        retry_after=args.retry_after,
+        recordings=load_recordings(args.recordings) if args.recordings else None,
+        seed=args.seed,
+    )
+    print(f"Amadeus stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
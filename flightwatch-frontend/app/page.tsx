@@ -237,7 +237,7 @@ export default function Home() {
     setSearching(true);
     setSearchResults([]);
     try {
-      const res = await fetch(`${API_BASE}/flights/search`, {
+      const res = await fetch(`${API_BASE}/flights/search/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -250,9 +250,29 @@ export default function Home() {
           currency: "CAD",
         }),
       });
-      if (!res.ok) throw new Error(await res.text());
-      const data = await res.json();
-      setSearchResults(data.offers || []);
+      if (!res.ok || !res.body) throw new Error(await res.text());
+
+      // NDJSON: one line per (date pair, rule) as it completes
+      setOpenSearchDrawer(false);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop() ?? "";
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event = JSON.parse(line);
+          if (event.type === "offers") {
+            setSearchResults((prev) => [...prev, ...event.offers]);
+          } else if (event.type === "error") {
+            throw new Error(event.detail);
+          }
+        }
+      }
     } catch (e: any) {
       alert(e.message);
     } finally {
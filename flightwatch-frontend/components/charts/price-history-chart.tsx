@@ -42,11 +42,24 @@ export default function PriceHistoryChart({ results }: Props) {
 
   const currency = results[0].currency;
 
+  // Each result covers a run of identical captures; plot both ends so flat
+  // stretches stay flat instead of being interpolated to the next change
+  const points = [...results]
+    .sort((a, b) => a.captured_at.localeCompare(b.captured_at))
+    .flatMap((r) =>
+      r.last_seen_at && r.last_seen_at !== r.captured_at
+        ? [
+            { captured_at: r.captured_at, total_price: r.total_price },
+            { captured_at: r.last_seen_at, total_price: r.total_price },
+          ]
+        : [{ captured_at: r.captured_at, total_price: r.total_price }]
+    );
+
   return (
     <div className="w-full h-[260px]">
       <ResponsiveContainer width="100%" height="100%">
         <LineChart
-          data={results}
+          data={points}
           margin={{ top: 10, right: 20, bottom: 10, left: 0 }}
         >
           <CartesianGrid strokeDasharray="3 3" opacity={0.3} />
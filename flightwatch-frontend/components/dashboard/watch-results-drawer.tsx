@@ -145,6 +145,11 @@ export default function WatchResultsDrawer({
                       <TableRow key={r.id}>
                         <TableCell>
                           {formatDateTime(r.captured_at)}
+                          {r.seen_count > 1 && r.last_seen_at && (
+                            <span className="block text-xs text-muted-foreground">
+                              unchanged until {formatDateTime(r.last_seen_at)} ({r.seen_count} runs)
+                            </span>
+                          )}
                         </TableCell>
 
                         <TableCell>{r.adults}</TableCell>
@@ -31,4 +31,7 @@ export type WatchResult = {
   seats_left: number;
   adults: number;
   captured_at: string;
+  // Same cheapest offer on every run from captured_at through last_seen_at
+  last_seen_at: string | null;
+  seen_count: number;
 };